@@ -3,8 +3,17 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import sys
 import numpy as np
 
+# Make the pipeline modules in src/ importable when run via `streamlit run dashboard/app.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.dashboard_data import DashboardData
+from src.forecast_service import ForecastService
+from src.instrumentation import load_metrics
+from src.matrix_view import TEXT_MAX_CELLS, heatmap_layout, heatmap_tile, n_pages
+from src.series_index import SeriesIndex
+
 # --- Page Config ---
 st.set_page_config(page_title="Ethiopia FI Forecast 2027", layout="wide", page_icon="🇪🇹")
 
@@ -21,51 +30,46 @@ div.stMetric {
 """, unsafe_allow_html=True)
 
 # --- Data Loading Helper ---
-@st.cache_data
-def load_data():
-    # Use the processed data from previous tasks
-    data_path = 'data/processed/ethiopia_fi_enriched.csv'
-    forecast_path = 'data/processed/forecasting_results.csv' # using the one generated by task4
-    matrix_path = 'data/processed/event_indicator_matrix.csv'
-    
-    # Check if files exist - forecast might be named differently in previous steps
-    # Task 4 saved to 'data/processed/forecasting_results.csv'
-    
-    if not os.path.exists(data_path):
-        return None, None, None
-
-    # 1. Load the main enriched dataset
-    df = pd.read_csv(data_path)
-    if 'year' not in df.columns:
-        df['observation_date'] = pd.to_datetime(df['observation_date'], errors='coerce')
-        df['year'] = df['observation_date'].dt.year
-    df = df.dropna(subset=['year', 'value_numeric'])
-    df['year'] = df['year'].astype(int)
-
-    # 2. Load Forecast
-    if os.path.exists(forecast_path):
-        df_forecast = pd.read_csv(forecast_path)
-    else:
-        df_forecast = pd.DataFrame()
+@st.cache_resource
+def get_data_loader():
+    # One loader per server: reads the artifacts concurrently, then re-reads
+    # whichever one the pipeline rewrites (see src/dashboard_data.py)
+    return DashboardData().start()
 
-    # 3. Load Matrix
-    if os.path.exists(matrix_path):
-        df_matrix = pd.read_csv(matrix_path, index_col=0)
-    else:
-        df_matrix = pd.DataFrame()
-    
-    return df, df_forecast, df_matrix
+# Taken once per run, so every page of this run sees the same artifact versions
+snapshot = get_data_loader().snapshot()
+
+def data_version():
+    """Versions of the model inputs; a change rebuilds the forecast service and derived caches."""
+    return snapshot.versions['records'], snapshot.versions['model_records'], snapshot.versions['matrix']
+
+@st.cache_resource(max_entries=2)
+def get_forecast_service(version, _records, _matrix):
+    # The service keeps the trend fit and shock index in memory, plus an LRU of slider results
+    return ForecastService(_records, _matrix)
+
+@st.cache_resource(max_entries=2)
+def get_series_index(version, _df):
+    # Per-indicator (and per-pillar) sorted arrays, so widgets slice instead of scanning df
+    return SeriesIndex.build(_df), SeriesIndex.build(_df, key='pillar')
 
-df, df_forecast, df_matrix = load_data()
+@st.cache_data(max_entries=16)
+def get_heatmap_layout(version, k_events, k_indicators, cluster, _matrix):
+    # Top-k selection and clustering order, recomputed only when k or the matrix changes
+    return heatmap_layout(_matrix, k_events, k_indicators, cluster)
+
+df, df_forecast, impact_matrix = snapshot.records, snapshot.forecasts, snapshot.matrix
 
 if df is None:
     st.error("⚠️ Missing 'ethiopia_fi_enriched.csv'. Please run the pipeline.")
     st.stop()
 
+series_index, pillar_index = get_series_index(data_version(), df)
+
 # --- Sidebar ---
 st.sidebar.title("Navigation")
 st.sidebar.image("https://img.icons8.com/color/96/ethiopia.png", width=100)
-page = st.sidebar.radio("Go to", ["Overview", "Forecast Scenarios", "Event Analysis"])
+page = st.sidebar.radio("Go to", ["Overview", "Forecast Scenarios", "Event Analysis", "Diagnostics"])
 
 # --- Page 1: Overview ---
 if page == "Overview":
@@ -78,18 +82,18 @@ if page == "Overview":
         latest_year = df['year'].max()
         
         # Access
-        acc_vals = df[df['indicator_code'] == 'ACC_OWNERSHIP'].sort_values('year')
-        current_acc = acc_vals.iloc[-1]['value_numeric'] if not acc_vals.empty else 0
-        delta_acc = current_acc - acc_vals.iloc[-2]['value_numeric'] if len(acc_vals) > 1 else 0
+        acc_vals = series_index.latest('ACC_OWNERSHIP')
+        current_acc = acc_vals[-1] if len(acc_vals) else 0
+        delta_acc = current_acc - acc_vals[-2] if len(acc_vals) > 1 else 0
         
         # Usage (Digital Payments)
-        usg_vals = df[df['indicator_code'] == 'USG_DIGITAL_ADOPTION'].sort_values('year')
+        usg_vals = series_index.latest('USG_DIGITAL_ADOPTION')
         # If USG_DIGITAL_ADOPTION not found, try finding something else or 0
-        if usg_vals.empty:
-             usg_vals = df[df['pillar'] == 'usage'].sort_values('year')
+        if not len(usg_vals):
+             usg_vals = pillar_index.latest('usage')
              
-        current_usg = usg_vals.iloc[-1]['value_numeric'] if not usg_vals.empty else 0
-        delta_usg = current_usg - usg_vals.iloc[-2]['value_numeric'] if len(usg_vals) > 1 else 0
+        current_usg = usg_vals[-1] if len(usg_vals) else 0
+        delta_usg = current_usg - usg_vals[-2] if len(usg_vals) > 1 else 0
         
     except Exception as e:
         current_acc, delta_acc = 0, 0
@@ -105,20 +109,28 @@ if page == "Overview":
     
     # Simple Trend Chart
     st.subheader("Trends at a Glance")
-    indicators = st.multiselect("Select Indicators", df['indicator_code'].unique(), default=['ACC_OWNERSHIP'])
+    indicators = st.multiselect("Select Indicators", series_index.keys,
+                                default=[c for c in ['ACC_OWNERSHIP'] if c in series_index])
     if indicators:
-        temp_df = df[df['indicator_code'].isin(indicators)]
+        # Long series are LTTB-downsampled to at most MAX_POINTS per indicator
+        temp_df = series_index.frame(indicators)
         fig = px.line(temp_df, x='year', y='value_numeric', color='indicator_code', markers=True)
         st.plotly_chart(fig, use_container_width=True)
 
 # --- Page 2: Forecast Scenarios ---
 elif page == "Forecast Scenarios":
     st.title("🔮 2027 Forecasting & Scenarios")
+
+    service = get_forecast_service(data_version(), snapshot.model_records, impact_matrix)
     
     col_settings, col_viz = st.columns([1, 3])
     
     with col_settings:
         st.subheader("Scenario Settings")
+
+        options = list(service.indicators)
+        default = options.index('ACC_OWNERSHIP') if 'ACC_OWNERSHIP' in options else 0
+        indicator = st.selectbox("Indicator", options, index=default)
         
         # Scenario Logic
         # 1. Select Base Scenario
@@ -130,76 +142,47 @@ elif page == "Forecast Scenarios":
         elif scenario_mode == "Pessimistic":
             multiplier = 0.5
         elif scenario_mode == "Custom":
-            multiplier = st.slider("Event Impact Multiplier", 0.0, 2.0, 1.0, 0.1)
+            multiplier = st.slider("Event Impact Multiplier", 0.0, 2.0, 1.0, 0.05)
             
         st.caption(f"Applied Multiplier: **{multiplier}x**")
         st.info("Adjusts the impact of upcoming events (Interoperability, Digital ID) on the baseline trend.")
 
     with col_viz:
-        # Check if we have pre-computed forecasts
-        if df_forecast.empty:
-             st.warning("No pre-computed forecasts found. Using dynamic simulation.")
-             # Dynamic Simulation Logic (Simple implementation for demo)
-             years = [2024, 2025, 2026, 2027]
-             
-             # Start from last actual
-             start_val = df[df['indicator_code'] == 'ACC_OWNERSHIP']['value_numeric'].max()
-             if pd.isna(start_val): start_val = 50
-             
-             trend_growth = 1.5 # base organic growth
-             shock_impact = 3.0 * multiplier # annual shock impact
-             
-             forecast_vals = []
-             curr = start_val
-             for y in years:
-                 if y > 2024:
-                     curr += trend_growth + shock_impact
-                 forecast_vals.append(curr)
-                 
-             viz_df = pd.DataFrame({'Year': years, 'Access_Rate': forecast_vals})
-             
-        else:
-            # Filter existing forecast if available, or just modify 'Base'
-            # Note: The task said "toggle between Optimistic and Pessimistic".
-            # If Custom, we might need to interpolate.
-            # Simplified: Display the selected pre-computed one or interpolate.
-            
-            if scenario_mode in ["Base", "Optimistic", "Pessimistic"]:
-                viz_df = df_forecast[df_forecast['Scenario'] == scenario_mode].copy()
-            else:
-                # Custom: Scaled version of Base
-                base = df_forecast[df_forecast['Scenario'] == 'Base'].copy()
-                # Simple logic: Scale the growth from 2024
-                # This is an approximation since we don't have the raw model here
-                 # But it highlights "Interactivity"
-                base['growth'] = base['Predicted_Ownership'].diff().fillna(0)
-                # Apply multiplier to growth (assuming growth = trend + shock)
-                # This is a bit hacky but works for UI demo
-                base.loc[base['Year'] > 2024, 'Predicted_Ownership'] = \
-                    base.loc[base['Year'] == 2024, 'Predicted_Ownership'].values[0] + \
-                    (base['Predicted_Ownership'] - base.loc[base['Year'] == 2024, 'Predicted_Ownership'].values[0]) * multiplier
-                viz_df = base
-        
-        # Plot
-        fig = px.line(viz_df, x="Year", y="Predicted_Ownership", markers=True, 
-                      title=f"Forecasted Account Ownership ({scenario_mode})",
-                      range_y=[0, 100])
+        # Re-run the trend + shock model for the chosen settings (cached per quantized multiplier)
+        viz_df = service.forecast(indicator, multiplier, scenario_mode)
+
+        fig = go.Figure([
+            go.Scatter(x=viz_df['Year'], y=viz_df['Upper_CI'], line=dict(width=0), showlegend=False, hoverinfo='skip'),
+            go.Scatter(x=viz_df['Year'], y=viz_df['Lower_CI'], line=dict(width=0), fill='tonexty',
+                       fillcolor='rgba(31, 119, 180, 0.2)', name='95% CI'),
+            go.Scatter(x=viz_df['Year'], y=viz_df['Predicted_Value'], mode='lines+markers', name='Forecast'),
+        ])
+        fig.update_layout(title=f"Forecasted {indicator} ({scenario_mode})", xaxis_title="Year",
+                          yaxis_title="Predicted_Value")
+        if viz_df['Upper_CI'].max() <= 100 and viz_df['Lower_CI'].min() >= 0:
+            fig.update_yaxes(range=[0, 100])
         st.plotly_chart(fig, use_container_width=True)
+
+        if not df_forecast.empty and scenario_mode != "Custom":
+            with st.expander("Pipeline forecast (task4_forecasting output)"):
+                st.dataframe(df_forecast[(df_forecast['Scenario'] == scenario_mode) &
+                                         (df_forecast['Indicator'] == indicator)], hide_index=True)
         
-        # Policy Recommendation Logic
-        final_val = viz_df.iloc[-1]['Predicted_Ownership'] if 'Predicted_Ownership' in viz_df.columns else viz_df.iloc[-1]['Access_Rate']
-        target = 60.0
-        
-        st.subheader("Policy Recommendation")
-        if final_val >= target:
-            st.success(f"✅ **On Track:** Projected {final_val:.1f}% exceeds the 60% target.")
-            st.write("Maintain current rollout momentum. Focus on **Quality of Usage** (depth) rather than just access.")
-        else:
-            gap = target - final_val
-            st.error(f"🚨 **Off Track:** Projected {final_val:.1f}% misses the 60% target by {gap:.1f}pp.")
-            st.markdown("### ⚠️ Interventions Needed:")
-            st.markdown("- **Accelerate Fayda ID:** Ensure rural enrollment centers are active.")
-            st.markdown("- **Stimulate Usage:** Introduce tax incentives for merchant digital payments.")
+        # Policy Recommendation Logic (NFIS-II targets account ownership)
+        if indicator == 'ACC_OWNERSHIP':
+            final_val = viz_df.iloc[-1]['Predicted_Value']
+            target = 60.0
+            
+            st.subheader("Policy Recommendation")
+            if final_val >= target:
+                st.success(f"✅ **On Track:** Projected {final_val:.1f}% exceeds the 60% target.")
+                st.write("Maintain current rollout momentum. Focus on **Quality of Usage** (depth) rather than just access.")
+            else:
+                gap = target - final_val
+                st.error(f"🚨 **Off Track:** Projected {final_val:.1f}% misses the 60% target by {gap:.1f}pp.")
+                st.markdown("### ⚠️ Interventions Needed:")
+                st.markdown("- **Accelerate Fayda ID:** Ensure rural enrollment centers are active.")
+                st.markdown("- **Stimulate Usage:** Introduce tax incentives for merchant digital payments.")
 
 # --- Page 3: Event Analysis ---
 elif page == "Event Analysis":
@@ -207,12 +190,89 @@ elif page == "Event Analysis":
     
     st.write("Heatmap showing the estimated impact of key events on financial indicators.")
     
-    if not df_matrix.empty:
-        fig_heat = px.imshow(df_matrix, 
+    if not impact_matrix.empty:
+        n_events, n_indicators = impact_matrix.shape
+        col1, col2, col3 = st.columns(3)
+        k_events = col1.number_input("Top Events (by |impact|)", 1, n_events, min(n_events, 100))
+        k_indicators = col2.number_input("Top Indicators (by |impact|)", 1, n_indicators, min(n_indicators, 100))
+        page_size = col3.select_slider("Cells per Page", [10, 20, 50, 100, 200, 500], value=50)
+        cluster = st.checkbox("Order by clustering (similar impact profiles together)", value=True)
+
+        rows, cols = get_heatmap_layout(data_version(), k_events, k_indicators, cluster, impact_matrix)
+        col1, col2 = st.columns(2)
+        row_page = col1.number_input("Event Page", 1, n_pages(len(rows), page_size), 1) - 1
+        col_page = col2.number_input("Indicator Page", 1, n_pages(len(cols), page_size), 1) - 1
+
+        # Large pages arrive aggregated into blocks (strongest impact per block)
+        tile = heatmap_tile(impact_matrix, rows, cols, row_page, col_page, page_size)
+        fig_heat = px.imshow(tile,
                             labels=dict(x="Indicator", y="Event", color="Impact"),
-                            text_auto=True,
+                            text_auto=tile.size <= TEXT_MAX_CELLS,
                             aspect="auto",
-                            color_continuous_scale="RdBu_r") # Red to Blue (Negative to Positive)
+                            color_continuous_scale="RdBu_r", # Red to Blue (Negative to Positive)
+                            color_continuous_midpoint=0)
         st.plotly_chart(fig_heat, use_container_width=True)
+        if tile.shape != (min(page_size, len(rows) - row_page * page_size),
+                          min(page_size, len(cols) - col_page * page_size)):
+            st.caption("Showing blocks of events / indicators with their strongest impact; "
+                       "lower the cells per page to see individual links.")
     else:
-        st.warning("Matrix data not found.")
\ No newline at end of file
+        st.warning("Matrix data not found.")
+
+# --- Page 4: Diagnostics ---
+elif page == "Diagnostics":
+    st.title("🩺 Pipeline Diagnostics")
+
+    # Read on every visit, so new runs show up without a restart
+    metrics = load_metrics()
+    if metrics.empty:
+        st.info("No metrics yet. Run the pipeline (`python -m src pipeline`) to record some.")
+        st.stop()
+
+    latest = metrics[metrics['run_id'] == metrics.sort_values('started')['run_id'].iloc[-1]]
+    st.subheader(f"Latest Run: {latest['run_id'].iloc[0]}")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Stages", latest['stage'].nunique())
+    col2.metric("Stage Time (s)", f"{latest.loc[latest['parent'].isna(), 'seconds'].sum():.2f}")
+    peak = latest['peak_mb'].max()
+    col3.metric("Peak Memory (MB)", "n/a" if pd.isna(peak) else f"{peak:.1f}")
+
+    by_stage = latest.groupby('stage', as_index=False).agg(seconds=('seconds', 'sum'), calls=('stage', 'size'),
+                                                           peak_mb=('peak_mb', 'max'))
+    fig_time = px.bar(by_stage.sort_values('seconds'), x='seconds', y='stage', orientation='h',
+                      hover_data=['calls', 'peak_mb'], title="Wall Time per Stage (latest run)")
+    st.plotly_chart(fig_time, use_container_width=True)
+
+    st.subheader("Across Runs")
+    stages = sorted(metrics['stage'].unique())
+    selected = st.multiselect("Stages", stages, default=[s for s in stages if not s.startswith('pipeline.')][:6])
+    history = metrics[metrics['stage'].isin(selected)]
+    if not history.empty:
+        runs = history.groupby(['run_id', 'stage'], as_index=False).agg(
+            started=('started', 'min'), seconds=('seconds', 'sum'), peak_mb=('peak_mb', 'max'))
+        tab_time, tab_mem = st.tabs(["Wall Time", "Peak Memory"])
+        with tab_time:
+            st.plotly_chart(px.line(runs.sort_values('started'), x='started', y='seconds', color='stage',
+                                    markers=True, hover_data=['run_id']), use_container_width=True)
+        with tab_mem:
+            st.plotly_chart(px.line(runs.sort_values('started'), x='started', y='peak_mb', color='stage',
+                                    markers=True, hover_data=['run_id']), use_container_width=True)
+
+    hit_cols = [c for c in metrics.columns if c.endswith('_hit_rate')]
+    if hit_cols:
+        st.subheader("Cache Hit Rates")
+        caches = []
+        for col in hit_cols:
+            name = col[:-len('_hit_rate')]
+            counts = metrics.groupby('stage')[[name + '_hits', name + '_misses']].sum()
+            counts = counts[counts.sum(axis=1) > 0]
+            caches.append(pd.DataFrame({'cache': name, 'stage': counts.index, 'hits': counts.iloc[:, 0].to_numpy(),
+                                        'misses': counts.iloc[:, 1].to_numpy()}))
+        caches = pd.concat(caches, ignore_index=True)
+        caches['hit_rate'] = caches['hits'] / (caches['hits'] + caches['misses'])
+        fig_cache = px.bar(caches, x='hit_rate', y='stage', color='cache', barmode='group', orientation='h',
+                           hover_data=['hits', 'misses'], range_x=[0, 1])
+        st.plotly_chart(fig_cache, use_container_width=True)
+
+    with st.expander("Raw Metrics"):
+        st.dataframe(metrics.sort_values('started', ascending=False), use_container_width=True)
@@ -0,0 +1,115 @@
+# Command-line entry point: python -m src <command> [options]
+#
+# Only the standard library is imported up front. Each command imports its
+# module (and with it pandas, pyarrow, scipy, matplotlib...) when it runs,
+# so `--help` and light commands start fast enough for cron and CI hooks.
+import argparse
+import importlib
+import sys
+
+# Forecast run function per --kind
+FORECASTS = {
+    'annual': 'src.task4_forecasting:run_forecasting_scenarios',
+    'monthly': 'src.monthly_forecast:run_monthly_forecast',
+    'hierarchical': 'src.hierarchical_forecast:run_hierarchical_forecast',
+}
+
+def _call(target, *args):
+    module_name, func_name = target.split(':')
+    return getattr(importlib.import_module(module_name), func_name)(*args)
+
+def _forward(target):
+    """Handler passing the command's own arguments to a module's main(argv)."""
+    return lambda args: _call(target, args.argv)
+
+def _run(target):
+    """Handler calling a module's argument-less run function."""
+    def handler(args):
+        _call(target)
+        return 0
+    return handler
+
+def _forecast(args):
+    _call(FORECASTS[args.kind])
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src',
+                                     description="Ethiopia financial inclusion forecasting toolkit.")
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    # Commands with their own CLI declare their options here (so --help
+    # needs no heavy imports) and receive the raw arguments
+    validate = commands.add_parser('validate', help="Validate unified-format data files.")
+    validate.add_argument('files', nargs='*', help="CSV, Parquet or XLSX files (default: the starter workbook).")
+    validate.add_argument('--output', help="Write the JSON report to this path.")
+    validate.add_argument('--chunksize', type=int)
+    validate.add_argument('--workers', type=int)
+    validate.set_defaults(handler=_forward('src.validate_data:main'))
+
+    enrich = commands.add_parser('enrich', help="Build the enriched dataset and typed Parquet store.")
+    enrich.set_defaults(handler=_run('src.task1_enrichment:run_enrichment'))
+
+    ingest = commands.add_parser('ingest', help="Append JSONL / CSV drop files to the Parquet store.")
+    ingest.add_argument('files', nargs='*', help="Files to ingest (default: everything in data/incoming).")
+    ingest.add_argument('--chunksize', type=int)
+    ingest.set_defaults(handler=_forward('src.ingest_stream:main'))
+
+    matrix = commands.add_parser('matrix', help="Build the sparse event-indicator matrix.")
+    matrix.set_defaults(handler=_run('src.generate_matrix:generate_matrix'))
+
+    forecast = commands.add_parser('forecast', help="Run the trend + event shock forecasts.")
+    forecast.add_argument('--kind', choices=list(FORECASTS), default='annual',
+                          help="Annual scenarios (default), monthly trajectories or reconciled breakdowns.")
+    forecast.set_defaults(handler=_forecast)
+
+    eda = commands.add_parser('eda', help="Render the deep-dive EDA chart.")
+    eda.set_defaults(handler=_run('src.eda_deep_dive:main'))
+
+    charts = commands.add_parser('charts', help="Render the chart of every indicator pair (only changed ones).")
+    charts.add_argument('--output')
+    charts.add_argument('--format', choices=['png', 'svg'])
+    charts.add_argument('--dpi', type=int)
+    charts.add_argument('--workers', type=int)
+    charts.add_argument('--force', action='store_true')
+    charts.set_defaults(handler=_forward('src.chart_pack:main'))
+
+    leadlag = commands.add_parser('leadlag', help="Rank lagged cross-correlations between indicator pairs.")
+    leadlag.add_argument('--freq', choices=['annual', 'monthly'])
+    leadlag.add_argument('--max-lag', type=int)
+    leadlag.add_argument('--diff', action='store_true')
+    leadlag.add_argument('--output')
+    leadlag.set_defaults(handler=_forward('src.lead_lag:main'))
+
+    bench = commands.add_parser('bench', help="Benchmark the pipeline stages on synthetic data.")
+    bench.add_argument('--scale', help="tiny, small, medium or large (default: small).")
+    bench.add_argument('--stages', nargs='*')
+    bench.add_argument('--repeat', type=int)
+    bench.add_argument('--seed', type=int)
+    bench.add_argument('--output')
+    bench.add_argument('--baseline')
+    bench.add_argument('--update-baseline', action='store_true')
+    bench.add_argument('--time-tolerance', type=float)
+    bench.add_argument('--memory-tolerance', type=float)
+    bench.set_defaults(handler=_forward('src.benchmarks:main'))
+
+    results = commands.add_parser('results', help="List (or clear) the cached forecast results.")
+    results.add_argument('--clear', action='store_true')
+    results.set_defaults(handler=_forward('src.result_store:main'))
+
+    pipeline = commands.add_parser('pipeline', help="Run the pipeline incrementally.")
+    pipeline.add_argument('stages', nargs='*')
+    pipeline.add_argument('--force', action='store_true')
+    pipeline.add_argument('--jobs', type=int)
+    pipeline.set_defaults(handler=_forward('src.pipeline:main'))
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = build_parser().parse_args(argv)
+    # Forwarded commands re-parse everything after the command name
+    args.argv = argv[argv.index(args.command) + 1:]
+    return args.handler(args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
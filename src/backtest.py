@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.shock_index import ShockIndex
+from src.task4_forecasting import (MODEL_CACHE, MODELS, add_year_column, fit_models, indicator_caps, load_data,
+                                   national_series)
+
+# Forecast origins: the Findex rounds before the latest one
+CUTOFFS = (2014, 2017, 2021)
+
+def observed_points(df):
+    """National observations averaged per indicator and year ('indicator_code', 'year', 'value_numeric')."""
+    history = national_series(add_year_column(df)).dropna(subset=['indicator_code', 'year', 'value_numeric'])
+    history = history.assign(indicator_code=history['indicator_code'].astype(str),
+                             year=history['year'].astype(int))
+    return history.groupby(['indicator_code', 'year'], as_index=False)['value_numeric'].mean()
+
+def backtest_cutoff(points, shock_index, cutoff, models=None, selection='aic', caps=None, workers=None,
+                    cache_path=MODEL_CACHE):
+    """
+    Replays the trend + shock forecast from one cutoff: a trend is chosen
+    among `models` on the points up to `cutoff` (as forecast_scenarios does
+    on the full history) and every later point of the same indicator is
+    forecast with the Base scenario's cumulative event shocks since the cutoff.
+
+    Returns:
+        pd.DataFrame: One row per forecast point with 'Cutoff', 'Indicator',
+        'Year', 'Horizon', 'Actual', 'Predicted', 'Lower_CI', 'Upper_CI'.
+    """
+    history = points[points['year'] <= cutoff]
+    future = points[points['year'] > cutoff]
+    years = np.sort(future['year'].unique()) if len(future) else np.array([cutoff + 1])
+    fit = fit_models(history, years, list(models or MODELS), selection, caps=caps, workers=workers,
+                     cache_path=cache_path)
+    series = pd.Index(fit['series'])
+
+    pos = series.get_indexer(future['indicator_code'])
+    known = pos >= 0
+    future, pos = future[known], pos[known]
+
+    year_pos = np.searchsorted(years, future['year'].to_numpy())
+    horizon = future['year'].to_numpy() - cutoff
+    trend = fit['projections'][pos, year_pos]
+
+    # Cumulative shock of the events after the cutoff, per (horizon year, series)
+    shocks = shock_index.cumulative(np.arange(cutoff + 1, years.max() + 1), 'Base', series)
+    predicted = trend + shocks[horizon - 1, pos]
+
+    n_obs = fit['n_obs'][pos]
+    ci_95 = np.where(n_obs > 2, 1.96 * fit['rse'][pos], 2.0)
+
+    return pd.DataFrame({
+        'Cutoff': cutoff,
+        'Indicator': future['indicator_code'].to_numpy(),
+        'Year': future['year'].to_numpy(),
+        'Horizon': horizon,
+        'Actual': future['value_numeric'].to_numpy(dtype=float),
+        'Predicted': predicted,
+        'Lower_CI': predicted - ci_95,
+        'Upper_CI': predicted + ci_95,
+    })
+
+def add_error_metrics(results):
+    """Adds 'Error', 'Abs_Error', 'APE' (%, NaN for zero actuals) and 'Covered' columns."""
+    actual = results['Actual'].to_numpy(dtype=float)
+    error = results['Predicted'].to_numpy(dtype=float) - actual
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ape = np.where(actual != 0, np.abs(error) / np.abs(actual) * 100, np.nan)
+    return results.assign(
+        Error=error,
+        Abs_Error=np.abs(error),
+        APE=ape,
+        Covered=(results['Lower_CI'] <= results['Actual']) & (results['Actual'] <= results['Upper_CI']),
+    )
+
+def summarize_backtest(results, by=('Cutoff',)):
+    """MAE, MAPE, interval coverage and point count per group, plus an 'All' row."""
+    agg = {'MAE': ('Abs_Error', 'mean'), 'MAPE': ('APE', 'mean'),
+           'Coverage': ('Covered', 'mean'), 'N': ('Error', 'size')}
+    summary = results.groupby(list(by)).agg(**agg).reset_index()
+    total = pd.DataFrame([{name: results[col].agg(func) for name, (col, func) in agg.items()}])
+    for col in by:
+        total[col] = 'All'
+    return pd.concat([summary, total[summary.columns]], ignore_index=True)
+
+def run_backtest(df, matrix, cutoffs=CUTOFFS, models=None, selection='aic', workers=None,
+                 cache_path=MODEL_CACHE):
+    """
+    Rolling-origin backtest of the trend + shock forecast for every indicator.
+
+    Each cutoff selects and fits its trends with fit_models(), so series are
+    spread across its process pool and unchanged histories come from the
+    model fit cache.
+
+    Args:
+        df (pd.DataFrame): Enriched records.
+        matrix (ImpactMatrix or pd.DataFrame): Event-indicator matrix.
+        cutoffs (tuple): Last year of history of each replay.
+        models (list): Trend candidates (all of MODELS by default).
+        selection (str): 'aic' or 'backtest' (see select_model).
+        workers (int): Process pool size.
+        cache_path (str): Model fit cache; None disables it.
+
+    Returns:
+        pd.DataFrame: One row per forecast point with errors and coverage.
+    """
+    points = observed_points(df)
+    shock_index = ShockIndex.build(matrix, df)
+    caps = indicator_caps(national_series(add_year_column(df)))
+
+    parts = [backtest_cutoff(points, shock_index, cutoff, models, selection, caps, workers, cache_path)
+             for cutoff in cutoffs]
+    results = pd.concat(parts, ignore_index=True).sort_values(['Cutoff', 'Indicator', 'Year'], ignore_index=True)
+    return add_error_metrics(results)
+
+def run_backtesting(workers=None):
+    print("--- Starting Rolling-Origin Backtest ---")
+
+    try:
+        df, matrix = load_data()
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    results_df = run_backtest(df, matrix, workers=workers)
+    print(summarize_backtest(results_df).round(3).to_string(index=False))
+
+    output_path = 'data/processed/backtest_results.csv'
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    results_df.round(4).to_csv(output_path, index=False)
+    print(f"\nSaved {len(results_df)} forecast points to {output_path}")
+
+if __name__ == "__main__":
+    run_backtesting()
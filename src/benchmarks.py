@@ -0,0 +1,251 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.instrumentation import MODE_ENV
+from src.synthetic_data import generate_unified_dataset, write_synthetic_workspace
+
+BASELINE_PATH = 'benchmarks/baseline.json'
+RESULTS_PATH = 'benchmarks/results.json'
+
+# Synthetic dataset sizes; 'large' is the target scale of the project
+SCALES = {
+    'tiny': {'n_observations': 2000, 'n_events': 20, 'n_indicators': 10},
+    'small': {'n_observations': 20000, 'n_events': 200, 'n_indicators': 50},
+    'medium': {'n_observations': 200000, 'n_events': 2000, 'n_indicators': 200},
+    'large': {'n_observations': 1000000, 'n_events': 10000, 'n_indicators': 500},
+}
+
+# A stage regresses when it is this much slower (or hungrier) than the baseline
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+
+# Differences below these floors are timer / allocator noise
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 1.0
+
+# Scalar calculate_lag_effect calls per run (the batched API covers all links)
+LAG_EFFECT_CALLS = 1000
+
+def _enrich():
+    from src.processed_store import STORE_PATH
+    from src.task1_enrichment import run_enrichment
+    # Re-runs only append (nothing, once deduplicated); time the full build
+    shutil.rmtree(STORE_PATH, ignore_errors=True)
+    run_enrichment()
+
+def _matrix():
+    from src.generate_matrix import generate_matrix
+    generate_matrix()
+
+def _forecast():
+    from src.result_store import RESULTS_DIR
+    from src.task4_forecasting import run_forecasting_scenarios
+    # Time the forecast, not a lookup of the stored result. Model fits come
+    # from the fit cache, as on every production run with unchanged series
+    shutil.rmtree(RESULTS_DIR, ignore_errors=True)
+    run_forecasting_scenarios()
+
+def _impact_links():
+    from src.generate_matrix import LINK_COLUMNS, prepare_impact_links
+    from src.processed_store import load_enriched
+    return prepare_impact_links(load_enriched(columns=LINK_COLUMNS, record_types=['event', 'impact_link']))
+
+def _lag_effect():
+    from src.impact_modeling import calculate_lag_effect
+    links = _impact_links().head(LAG_EFFECT_CALLS)
+    for date, impact, lag in zip(links['event_date'], links['impact_magnitude'], links['lag_months']):
+        calculate_lag_effect(date, impact, max(int(lag), 1), 'sigmoid')
+
+def _lag_effects():
+    from src.impact_modeling import calculate_lag_effects
+    links = _impact_links().dropna(subset=['event_date'])
+    calculate_lag_effects(links['event_date'], links['impact_magnitude'],
+                          links['lag_months'].clip(lower=1).astype(int), 'sigmoid')
+
+def _dashboard_load():
+    from src.dashboard_data import load_dashboard_data
+    load_dashboard_data()
+
+# Benchmarked stages, in run order (later stages read the outputs of earlier ones)
+BENCHMARKS = {
+    'enrich': _enrich,
+    'matrix': _matrix,
+    'forecast': _forecast,
+    'lag_effect': _lag_effect,
+    'lag_effects': _lag_effects,
+    'dashboard_load': _dashboard_load,
+}
+
+# Stages run once untimed before measuring, to fill the caches production keeps warm
+WARM_UP = ['forecast']
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def measure(func, repeat=3):
+    """
+    Times `func` (best of `repeat` runs) and records its peak traced memory
+    in one extra run, so tracemalloc overhead does not skew the timing.
+    Stage output is silenced.
+
+    Returns:
+        dict: 'seconds', 'runs' (all timings) and 'peak_mb'.
+    """
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': round(min(timings), 4), 'runs': [round(t, 4) for t in timings],
+            'peak_mb': round(peak / 1e6, 2)}
+
+def run_benchmarks(scale='small', stages=None, repeat=3, seed=0, workdir=None):
+    """
+    Generates a synthetic dataset, lays it out as a project tree in a
+    scratch directory and benchmarks each stage there.
+
+    Args:
+        scale (str): Key of SCALES.
+        stages (list): Stage names (all of BENCHMARKS by default).
+        repeat (int): Timed runs per stage.
+        seed (int): Dataset seed.
+        workdir (str): Scratch directory (a temporary one by default).
+
+    Returns:
+        dict: Scale, dataset sizes, environment and per-stage results.
+    """
+    sizes = SCALES[scale]
+    names = [name for name in BENCHMARKS if stages is None or name in stages]
+
+    print(f"Generating '{scale}' synthetic dataset: {sizes}")
+    df = generate_unified_dataset(seed=seed, **sizes)
+    root = workdir or tempfile.mkdtemp(prefix='fi_bench_')
+    # Stages are timed without their own metrics tracing (see src/instrumentation.py)
+    previous_mode = os.environ.get(MODE_ENV)
+    os.environ[MODE_ENV] = 'off'
+    try:
+        write_synthetic_workspace(root, df)
+        del df
+
+        results = {}
+        with working_directory(root):
+            for name in names:
+                if name in WARM_UP:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        BENCHMARKS[name]()
+                results[name] = measure(BENCHMARKS[name], repeat)
+                print(f"  {name:<15} {results[name]['seconds']:>9.3f} s  {results[name]['peak_mb']:>9.1f} MB")
+    finally:
+        if previous_mode is None:
+            os.environ.pop(MODE_ENV, None)
+        else:
+            os.environ[MODE_ENV] = previous_mode
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        'scale': scale,
+        'sizes': sizes,
+        'seed': seed,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'stages': results,
+    }
+
+def compare_to_baseline(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Lists the stages of `results` that regressed past the baseline of the same scale.
+
+    Returns:
+        list: (stage, metric, baseline value, current value) tuples.
+    """
+    reference = baseline.get(results['scale'], {}).get('stages', {})
+    regressions = []
+    for name, current in results['stages'].items():
+        if name not in reference:
+            continue
+        base = reference[name]
+        if current['seconds'] > base['seconds'] * (1 + time_tolerance) + MIN_SECONDS:
+            regressions.append((name, 'seconds', base['seconds'], current['seconds']))
+        if current['peak_mb'] > base['peak_mb'] * (1 + memory_tolerance) + MIN_PEAK_MB:
+            regressions.append((name, 'peak_mb', base['peak_mb'], current['peak_mb']))
+    return regressions
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_json(data, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--stages', nargs='*', choices=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store these results as the baseline for this scale.")
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.scale, args.stages, args.repeat, args.seed)
+    save_json(results, args.output)
+    print(f"Results saved to {args.output}")
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline:
+        baseline[args.scale] = results
+        save_json(baseline, args.baseline)
+        print(f"Baseline for '{args.scale}' updated in {args.baseline}")
+        return 0
+
+    if args.scale not in baseline:
+        print(f"Warning: no '{args.scale}' baseline in {args.baseline}, nothing to compare.")
+        return 0
+
+    regressions = compare_to_baseline(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if not regressions:
+        print("\n✅ No stage regressed past the baseline.")
+        return 0
+    print(f"\n❌ {len(regressions)} regression(s):")
+    for name, metric, base, current in regressions:
+        print(f"  {name}: {metric} {base} -> {current}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
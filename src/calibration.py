@@ -0,0 +1,294 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import least_squares
+
+from src.impact_modeling import lag_kernel, month_ordinal
+from src.instrumentation import register_cache
+from src.shock_index import from_percentage_points, to_percentage_points
+from src.task4_forecasting import load_data, national_series
+
+CALIBRATED_NPZ = 'data/processed/event_indicator_matrix_calibrated.npz'
+REPORT_PATH = 'data/processed/calibration_report.csv'
+
+# Candidate rollout curves per event
+EFFECT_TYPES = ('linear', 'sigmoid', 'decay')
+ROLLOUT_CANDIDATES = (6, 12, 24, 36)
+
+# Weight of the hand-set magnitude, relative to one observation (both in pp).
+# Keeps links that no observation can identify at their prior value.
+PRIOR_WEIGHT = 0.5
+
+# Rounds of (solve magnitudes, switch rollout curves)
+MAX_ROUNDS = 5
+
+@functools.lru_cache(maxsize=None)
+def rollout_curve(effect_type, rollout_months):
+    """Cumulative share of an impact reached by each month of its rollout (read-only)."""
+    curve = np.cumsum(lag_kernel(effect_type, int(rollout_months)))
+    curve.setflags(write=False)
+    return curve
+
+register_cache('rollout_curve', rollout_curve)
+
+def curve_at(offsets, effect_type, rollout_months):
+    """Share of the impact reached `offsets` months after the rollout start (0 before, 1 once complete)."""
+    curve = rollout_curve(effect_type, int(rollout_months))
+    return np.where(offsets < 0, 0.0, curve[np.clip(offsets, 0, len(curve) - 1)])
+
+def observation_points(df):
+    """National observations averaged per indicator and month ('indicator_code', 'month', 'value')."""
+    history = national_series(df).dropna(subset=['indicator_code', 'value_numeric', 'observation_date'])
+    points = pd.DataFrame({
+        'indicator_code': history['indicator_code'].astype(str).to_numpy(),
+        'month': np.asarray(month_ordinal(history['observation_date']), dtype=float),
+        'value': history['value_numeric'].to_numpy(dtype=float),
+    }).dropna()
+    points['month'] = points['month'].astype(np.int64)
+    return points.groupby(['indicator_code', 'month'], as_index=False)['value'].mean()
+
+def build_calibration_problem(df, matrix, prior_weight=PRIOR_WEIGHT):
+    """
+    Collects the arrays of the joint fit into a dict.
+
+    Every linked indicator with at least two observation months gets its
+    own linear trend; every impact link on such an indicator (with a dated
+    event) gets a free magnitude. Each (link, observation of its indicator)
+    pair is one non-zero of the sparse Jacobian.
+    """
+    points = observation_points(df)
+    n_points = points.groupby('indicator_code').size()
+    # Indicators without links would only add independent trend fits
+    linked = matrix.indicators[np.unique(matrix.links['indicator'].to_numpy(dtype=int))] if len(matrix.links) else []
+    indicators = pd.Index(n_points.index[(n_points >= 2) & n_points.index.isin(linked)])
+    points = points[points['indicator_code'].isin(indicators)].sort_values(['indicator_code', 'month'])
+
+    point_ind = indicators.get_indexer(points['indicator_code'])
+    counts = np.bincount(point_ind, minlength=len(indicators))
+    ind_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    month = points['month'].to_numpy()
+
+    links = matrix.links
+    event_month = np.asarray(month_ordinal(matrix.event_dates), dtype=float)
+    if len(links):
+        link_codes = matrix.indicators[links['indicator'].to_numpy()]
+        start = event_month[links['event'].to_numpy()] + links['lag_months'].fillna(0).to_numpy()
+        link_ind_all = indicators.get_indexer(link_codes)
+        calibrated = np.flatnonzero((link_ind_all >= 0) & ~np.isnan(start))
+    else:
+        start, link_ind_all, calibrated = np.array([]), np.array([], dtype=int), np.array([], dtype=int)
+
+    link_ind = link_ind_all[calibrated]
+    link_start = start[calibrated].astype(np.int64)
+    event_codes, events = pd.factorize(links['event'].to_numpy()[calibrated]) if len(calibrated) else (
+        np.array([], dtype=int), np.array([], dtype=int))
+
+    # (link, observation) pairs: every observation month of the link's indicator
+    per_link = counts[link_ind]
+    pair_link = np.repeat(np.arange(len(calibrated)), per_link)
+    first_pair = np.repeat(np.cumsum(per_link) - per_link, per_link)
+    pair_row = np.repeat(ind_start[link_ind], per_link) + np.arange(per_link.sum()) - first_pair
+
+    first = links.iloc[calibrated].drop_duplicates('event') if len(calibrated) else links
+    first = first.set_index('event').reindex(events)
+
+    return {
+        'indicators': indicators,
+        'point_ind': point_ind,
+        'point_t': (month - month.mean()) / 12.0 if len(month) else month.astype(float),
+        'point_value': points['value'].to_numpy(),
+        'link_rows': calibrated,
+        'link_event': event_codes,
+        'events': np.asarray(events),
+        'prior': to_percentage_points(links['impact_magnitude'].to_numpy(dtype=float)[calibrated]),
+        'pair_link': pair_link,
+        'pair_row': pair_row,
+        'pair_offset': month[pair_row] - link_start[pair_link],
+        'pair_event': event_codes[pair_link],
+        'effect': np.array([EFFECT_TYPES.index(e) for e in first['effect_type']], dtype=int),
+        'rollout': first['rollout_months'].to_numpy(dtype=int) if len(calibrated) else np.array([], dtype=int),
+        'prior_weight': prior_weight,
+    }
+
+def pair_curves(problem, effect, rollout):
+    """Rollout share of every (link, observation) pair, evaluated per distinct event curve."""
+    values = np.zeros(len(problem['pair_link']))
+    pair_effect = effect[problem['pair_event']]
+    pair_rollout = rollout[problem['pair_event']]
+    curves = pd.DataFrame({'effect': pair_effect, 'rollout': pair_rollout})
+    for (e, months), rows in curves.groupby(['effect', 'rollout']).indices.items():
+        values[rows] = curve_at(problem['pair_offset'][rows], EFFECT_TYPES[e], months)
+    return values
+
+def jacobian(problem, effect, rollout):
+    """
+    Sparse Jacobian of the (linear) residuals for all events at once:
+    observation rows [intercept, slope, link magnitudes], then one prior row per link.
+    """
+    n, k, n_links = len(problem['point_value']), len(problem['indicators']), len(problem['link_rows'])
+    sqrt_w = np.sqrt(problem['prior_weight'])
+    rows = np.concatenate([np.arange(n), np.arange(n), problem['pair_row'], n + np.arange(n_links)])
+    cols = np.concatenate([problem['point_ind'], k + problem['point_ind'],
+                           2 * k + problem['pair_link'], 2 * k + np.arange(n_links)])
+    data = np.concatenate([np.ones(n), problem['point_t'], pair_curves(problem, effect, rollout),
+                           np.full(n_links, sqrt_w)])
+    return sparse.csr_matrix((data, (rows, cols)), shape=(n + n_links, 2 * k + n_links))
+
+def solve_magnitudes(problem, jac, x0=None):
+    """Least-squares fit of the trends and link magnitudes for fixed rollout curves."""
+    target = np.concatenate([problem['point_value'], np.sqrt(problem['prior_weight']) * problem['prior']])
+    if x0 is None:
+        k = len(problem['indicators'])
+        means = np.bincount(problem['point_ind'], weights=problem['point_value'], minlength=k) / np.maximum(
+            np.bincount(problem['point_ind'], minlength=k), 1)
+        x0 = np.concatenate([means, np.zeros(k), problem['prior']])
+
+    result = least_squares(lambda x: jac @ x - target, x0, jac=lambda x: jac,
+                           method='trf', tr_solver='lsmr', x_scale='jac')
+    return result.x, 2 * result.cost
+
+def improve_curves(problem, x, effect, rollout, residuals):
+    """
+    Scores every candidate curve for every event at once, holding the
+    other events and all magnitudes fixed, and returns the best curve per
+    event with its change in squared error (negative = better).
+    """
+    n_events, n = len(problem['events']), len(problem['point_value'])
+    magnitude = x[2 * len(problem['indicators']):][problem['pair_link']]
+    current = pair_curves(problem, effect, rollout)
+
+    # Links of one event that hit the same observation combine before squaring
+    cells, cell_of_pair = np.unique(problem['pair_event'] * n + problem['pair_row'], return_inverse=True)
+    cell_event, cell_row = cells // n, cells % n
+
+    best_gain = np.zeros(n_events)
+    best_effect, best_rollout = effect.copy(), rollout.copy()
+    for e, effect_type in enumerate(EFFECT_TYPES):
+        for months in ROLLOUT_CANDIDATES:
+            delta = np.bincount(cell_of_pair, weights=magnitude * (
+                curve_at(problem['pair_offset'], effect_type, months) - current), minlength=len(cells))
+            gain = np.bincount(cell_event, weights=delta * (delta + 2 * residuals[cell_row]), minlength=n_events)
+            better = gain < best_gain - 1e-9
+            best_gain[better] = gain[better]
+            best_effect[better] = e
+            best_rollout[better] = months
+    return best_effect, best_rollout, best_gain
+
+def _prior_rmse(problem, jac):
+    """RMSE of the trends refitted with every link held at its hand-set magnitude."""
+    n, k = len(problem['point_value']), len(problem['indicators'])
+    if not n:
+        return float('nan')
+    observed = jac[:n]
+    target = problem['point_value'] - observed[:, 2 * k:] @ problem['prior']
+    trend_jac = observed[:, :2 * k]
+    result = least_squares(lambda x: trend_jac @ x - target, np.zeros(2 * k), jac=lambda x: trend_jac,
+                           method='trf', tr_solver='lsmr')
+    return float(np.sqrt(2 * result.cost / n))
+
+def calibrate(df, matrix, prior_weight=PRIOR_WEIGHT, max_rounds=MAX_ROUNDS):
+    """
+    Fits the magnitude of every identifiable impact link and the rollout
+    curve (effect_type, rollout_months) of every event jointly against the
+    national observation series.
+
+    Magnitudes are solved with scipy.optimize.least_squares on the sparse
+    residual Jacobian of all events; curves are then switched wherever a
+    candidate lowers the error, and both steps repeat until no curve changes.
+
+    Args:
+        df (pd.DataFrame): Enriched records.
+        matrix (ImpactMatrix): Sparse matrix with link metadata (the prior).
+        prior_weight (float): Pull of the hand-set magnitudes.
+        max_rounds (int): Maximum solve / switch rounds.
+
+    Returns:
+        tuple: (calibrated ImpactMatrix, per-link report DataFrame, summary dict).
+    """
+    problem = build_calibration_problem(df, matrix, prior_weight)
+    effect, rollout = problem['effect'].copy(), problem['rollout'].copy()
+    n, k = len(problem['point_value']), len(problem['indicators'])
+
+    jac = jacobian(problem, effect, rollout)
+    x, cost = solve_magnitudes(problem, jac)
+    prior_rmse = _prior_rmse(problem, jac)
+
+    for _ in range(max_rounds):
+        residuals = (jac @ x)[:n] - problem['point_value']
+        new_effect, new_rollout, gain = improve_curves(problem, x, effect, rollout, residuals)
+        changed = (new_effect != effect) | (new_rollout != rollout)
+        if not changed.any():
+            break
+
+        new_jac = jacobian(problem, new_effect, new_rollout)
+        new_x, new_cost = solve_magnitudes(problem, new_jac, x)
+        if new_cost >= cost - 1e-9:
+            # Simultaneous switches interfered; keep only the single best one
+            best = np.argmin(gain)
+            best_effect, best_rollout = new_effect[best], new_rollout[best]
+            new_effect, new_rollout = effect.copy(), rollout.copy()
+            new_effect[best], new_rollout[best] = best_effect, best_rollout
+            new_jac = jacobian(problem, new_effect, new_rollout)
+            new_x, new_cost = solve_magnitudes(problem, new_jac, x)
+            if new_cost >= cost - 1e-9:
+                break
+        effect, rollout, jac, x, cost = new_effect, new_rollout, new_jac, new_x, new_cost
+
+    magnitude = x[2 * k:]
+    residuals = (jac @ x)[:n] - problem['point_value']
+
+    links = matrix.links.copy()
+    rows = problem['link_rows']
+    links['impact_magnitude'] = links['impact_magnitude'].astype(float)
+    links.loc[links.index[rows], 'impact_magnitude'] = from_percentage_points(magnitude)
+    links.loc[links.index[rows], 'impact_direction'] = np.where(magnitude < 0, 'negative', 'positive')
+    links.loc[links.index[rows], 'effect_type'] = np.asarray(EFFECT_TYPES, dtype=object)[effect[problem['link_event']]]
+    links.loc[links.index[rows], 'rollout_months'] = rollout[problem['link_event']].astype(float)
+
+    report = pd.DataFrame({
+        'Event': matrix.events[links['event'].to_numpy()[rows]],
+        'Indicator': matrix.indicators[links['indicator'].to_numpy()[rows]],
+        'Prior_pp': problem['prior'].round(3),
+        'Calibrated_pp': magnitude.round(3),
+        'Effect_Type': links['effect_type'].to_numpy()[rows],
+        'Rollout_Months': links['rollout_months'].to_numpy()[rows].astype(int),
+    })
+    summary = {
+        'links': len(rows),
+        'events': len(problem['events']),
+        'indicators': k,
+        'observations': n,
+        'prior_rmse': prior_rmse,
+        'calibrated_rmse': float(np.sqrt(np.mean(residuals ** 2))) if n else float('nan'),
+    }
+    return matrix.with_links(links), report, summary
+
+def run_calibration(prior_weight=PRIOR_WEIGHT, output_path=CALIBRATED_NPZ):
+    print("--- Starting Impact Calibration ---")
+
+    try:
+        df, matrix = load_data()
+    except FileNotFoundError as e:
+        print(e)
+        return
+    if matrix.empty:
+        print("Warning: Event matrix not found. Nothing to calibrate.")
+        return
+
+    calibrated, report, summary = calibrate(df, matrix, prior_weight)
+    print(f"Calibrated {summary['links']} links of {summary['events']} events against "
+          f"{summary['observations']} observations of {summary['indicators']} indicators")
+    print(f"RMSE with hand-set impacts: {summary['prior_rmse']:.3f} -> calibrated: {summary['calibrated_rmse']:.3f}")
+    print(report.head(20).to_string(index=False))
+
+    calibrated.save(output_path)
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    report.to_csv(REPORT_PATH, index=False)
+    print(f"\nCalibrated matrix saved to {output_path}")
+    print(f"Report saved to {REPORT_PATH}")
+
+if __name__ == "__main__":
+    run_calibration()
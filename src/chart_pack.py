@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+
+from src.instrumentation import instrumented
+from src.processed_store import load_enriched
+
+PACK_DIR = 'reports/figures/pairs'
+MANIFEST_FILE = '_manifest.json'
+# Bump when the drawing code changes, so every chart is redrawn once
+CHART_VERSION = 1
+# Pairs need this many years where both indicators were observed
+MIN_SHARED_YEARS = 2
+# Smaller batches render in the current process; a worker pays ~1 s of matplotlib import
+MIN_PARALLEL_CHARTS = 16
+
+def build_panel(df):
+    """
+    Year x indicator panel of mean observed values, built once for the
+    whole chart pack (NaN where an indicator has no observation that year).
+    """
+    data = df[['year', 'indicator_code', 'value_numeric']].dropna()
+    panel = (data.assign(indicator_code=data['indicator_code'].astype(str))
+             .groupby(['year', 'indicator_code'])['value_numeric'].mean().unstack())
+    panel.index = panel.index.astype(int)
+    return panel.sort_index().sort_index(axis=1)
+
+def indicator_labels(df):
+    """Axis label per indicator code: its name and unit where known."""
+    labels = {}
+    columns = [c for c in ['indicator_code', 'indicator', 'unit'] if c in df.columns]
+    for row in df[columns].drop_duplicates('indicator_code').itertuples(index=False):
+        code = str(row.indicator_code)
+        name = getattr(row, 'indicator', None)
+        unit = getattr(row, 'unit', None)
+        label = name if isinstance(name, str) and name else code
+        labels[code] = f"{label} ({unit})" if isinstance(unit, str) and unit else label
+    return labels
+
+def indicator_pairs(panel, min_shared_years=MIN_SHARED_YEARS):
+    """Every (left, right) pair of indicators observed together in at least min_shared_years years."""
+    observed = panel.notna().to_numpy(dtype=np.int64)
+    shared = observed.T @ observed
+    codes = panel.columns
+    return [(codes[i], codes[j]) for i, j in combinations(range(len(codes)), 2)
+            if shared[i, j] >= min_shared_years]
+
+def chart_hash(spec, years, left, right):
+    """Content hash of one chart: its spec (labels, format, version) and the plotted series."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(spec, sort_keys=True).encode())
+    for values in (years, left, right):
+        digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return digest.hexdigest()
+
+def chart_name(left, right, fmt):
+    return f"{left}__{right}.{fmt}"
+
+def draw_dual_axis(spec, years, left, right, path):
+    """
+    Draws one dual-axis line chart and saves it to `path`.
+
+    Uses a bare Figure on the Agg canvas rather than pyplot, so no GUI
+    backend or global figure state is involved (safe in pool workers).
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax1 = fig.add_subplot()
+
+    color = 'tab:blue'
+    ax1.set_xlabel('Year')
+    ax1.set_ylabel(spec['left_label'], color=color)
+    shown = ~np.isnan(left)
+    ax1.plot(years[shown], left[shown], color=color, marker='o', label=spec['left'])
+    ax1.tick_params(axis='y', labelcolor=color)
+    ax1.grid(True, linestyle='--', alpha=0.7)
+
+    ax2 = ax1.twinx()
+    color = 'tab:orange'
+    ax2.set_ylabel(spec['right_label'], color=color)
+    shown = ~np.isnan(right)
+    ax2.plot(years[shown], right[shown], color=color, marker='s', linestyle='--', label=spec['right'])
+    ax2.tick_params(axis='y', labelcolor=color)
+
+    ax1.set_title(f"{spec['left']} vs {spec['right']}")
+    # Fixed margins: tight_layout would cost a second full draw of every chart
+    fig.subplots_adjust(left=0.1, right=0.9, bottom=0.1, top=0.93)
+    fig.savefig(path, format=spec['format'], dpi=spec['dpi'])
+    return path
+
+def _draw_task(task):
+    return draw_dual_axis(*task)
+
+def plan_charts(panel, pairs, labels=None, fmt='png', dpi=100):
+    """
+    One task per pair: (name, hash, (spec, years, left, right)). Only the
+    two columns of each pair are shipped to a worker, not the panel.
+    """
+    labels = labels or {}
+    years = panel.index.to_numpy(dtype=float)
+    tasks = []
+    for left, right in pairs:
+        spec = {'left': left, 'right': right, 'left_label': labels.get(left, left),
+                'right_label': labels.get(right, right), 'format': fmt, 'dpi': dpi, 'version': CHART_VERSION}
+        both = panel[[left, right]].to_numpy(dtype=float)
+        # Years where neither is observed would change the hash without changing the chart
+        keep = ~np.isnan(both).all(axis=1)
+        series = (years[keep], both[keep, 0], both[keep, 1])
+        tasks.append((chart_name(left, right, fmt), chart_hash(spec, *series), (spec, *series)))
+    return tasks
+
+def load_manifest(pack_dir=PACK_DIR):
+    """Hash each chart file in the pack was drawn from, by file name."""
+    path = os.path.join(pack_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(pack_dir, manifest):
+    path = os.path.join(pack_dir, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+@instrumented('chart_pack')
+def render_chart_pack(df=None, pairs=None, pack_dir=PACK_DIR, fmt='png', dpi=100, workers=None, force=False):
+    """
+    Renders a dual-axis chart for every indicator pair.
+
+    The year x indicator panel is built once. Each chart is keyed by the
+    hash of its series and spec, and a chart whose file already matches
+    its hash is skipped, so a re-run only redraws pairs whose data changed.
+    Charts of pairs that are no longer eligible are deleted.
+
+    Args:
+        df (pd.DataFrame): Observations (default: the enriched store).
+        pairs (list): (left, right) indicator codes (default: every pair
+            sharing MIN_SHARED_YEARS observed years).
+        pack_dir (str): Output directory; holds the manifest of hashes.
+        fmt (str): 'png' or 'svg'.
+        dpi (int): Resolution of PNG charts.
+        workers (int): Process pool size (workers=1, or fewer than
+            MIN_PARALLEL_CHARTS charts to draw, renders in this process).
+        force (bool): Redraw every chart.
+
+    Returns:
+        dict: Counts of 'charts', 'drawn', 'cached' and 'removed' files.
+    """
+    if df is None:
+        df = load_enriched(columns=['indicator_code', 'indicator', 'unit', 'year', 'value_numeric'],
+                           record_types=['observation'])
+    panel = build_panel(df)
+    if pairs is None:
+        pairs = indicator_pairs(panel)
+    tasks = plan_charts(panel, pairs, indicator_labels(df), fmt, dpi)
+
+    os.makedirs(pack_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(pack_dir)
+    todo = [(name, digest, (*args, os.path.join(pack_dir, name))) for name, digest, args in tasks
+            if manifest.get(name) != digest or not os.path.exists(os.path.join(pack_dir, name))]
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(todo) < MIN_PARALLEL_CHARTS:
+        for _, _, args in todo:
+            draw_dual_axis(*args)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            list(pool.map(_draw_task, [args for _, _, args in todo],
+                          chunksize=max(len(todo) // (4 * workers), 1)))
+
+    current = {name: digest for name, digest, _ in tasks}
+    removed = 0
+    for name in set(load_manifest(pack_dir)) - set(current):
+        try:
+            os.remove(os.path.join(pack_dir, name))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    _save_manifest(pack_dir, current)
+    return {'charts': len(tasks), 'drawn': len(todo), 'cached': len(tasks) - len(todo), 'removed': removed}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the dual-axis chart of every indicator pair.")
+    parser.add_argument('--output', default=PACK_DIR, help="Chart directory.")
+    parser.add_argument('--format', choices=['png', 'svg'], default='png')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--force', action='store_true', help="Redraw charts whose inputs did not change.")
+    args = parser.parse_args(argv)
+
+    print("🎨 Rendering indicator-pair chart pack...")
+    counts = render_chart_pack(pack_dir=args.output, fmt=args.format, dpi=args.dpi,
+                               workers=args.workers, force=args.force)
+    print(f"✅ {counts['charts']} charts in {args.output}: {counts['drawn']} drawn, "
+          f"{counts['cached']} unchanged, {counts['removed']} removed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
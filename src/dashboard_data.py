@@ -0,0 +1,264 @@
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.forecast_service import SERVICE_COLUMNS
+from src.impact_matrix import MATRIX_CSV, MATRIX_NPZ, ImpactMatrix, load_impact_matrix
+from src.instrumentation import instrumented, stage as metrics_stage
+from src.processed_store import ENRICHED_CSV, STORE_PATH, load_enriched
+from src.task4_forecasting import FORECAST_PATH, cached_forecast_results
+
+# Columns of the enriched data used by the dashboard pages
+DASHBOARD_COLUMNS = ['record_type', 'pillar', 'indicator_code', 'year', 'value_numeric']
+
+# Seconds without further changes before a changed artifact is re-read, so
+# a writer that is still busy (e.g. a pipeline stage) is not read half-way
+RELOAD_DELAY = 1.0
+# Re-reads of an artifact that keeps changing or fails to parse before giving up until its next change
+MAX_RELOAD_ATTEMPTS = 5
+
+def load_records():
+    """The enriched records shown by the dashboard, or None when the dataset is missing."""
+    try:
+        df = load_enriched(columns=DASHBOARD_COLUMNS)
+    except FileNotFoundError:
+        return None
+    df = df.dropna(subset=['year', 'value_numeric'])
+    df['year'] = df['year'].astype(int)
+    return df
+
+def load_model_records():
+    """The observation and event records the forecast service is built from, or None when missing."""
+    try:
+        # Per-record-type columns keep e.g. the observations' unique record_id strings out of memory
+        frames = [load_enriched(columns=columns, record_types=[record_type])
+                  for record_type, columns in SERVICE_COLUMNS.items()]
+    except FileNotFoundError:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+def load_forecasts():
+    """The stored forecast result for the current inputs, else the last written CSV, else empty."""
+    df_forecast = cached_forecast_results(compute=False)
+    if df_forecast is None:
+        df_forecast = pd.read_csv(FORECAST_PATH) if os.path.exists(FORECAST_PATH) else pd.DataFrame()
+    return df_forecast
+
+def load_matrix():
+    """The sparse event matrix (empty when it has not been built)."""
+    matrix = load_impact_matrix()
+    if matrix is None:
+        matrix = ImpactMatrix.from_frame(pd.DataFrame())
+    return matrix
+
+# name: (loader, files / directories it is read from). The result store is
+# not watched: looking a result up rewrites its index, and every forecast
+# run that stores a result also rewrites FORECAST_PATH
+ARTIFACTS = {
+    'records': (load_records, [STORE_PATH, ENRICHED_CSV]),
+    'model_records': (load_model_records, [STORE_PATH, ENRICHED_CSV]),
+    'forecasts': (load_forecasts, [FORECAST_PATH]),
+    'matrix': (load_matrix, [MATRIX_NPZ, MATRIX_CSV]),
+}
+# The stored forecast is looked up by the data and matrix versions
+DEPENDENTS = {'records': ['forecasts'], 'matrix': ['forecasts']}
+
+def read_artifacts(artifacts=ARTIFACTS):
+    """Runs every artifact's loader concurrently in a thread pool; returns the results by name."""
+    with ThreadPoolExecutor(max_workers=len(artifacts)) as pool:
+        futures = {name: pool.submit(loader) for name, (loader, _) in artifacts.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+@instrumented('dashboard_load')
+def load_dashboard_data():
+    """
+    Loads the pipeline artifacts shown by the dashboard, reading them
+    concurrently in a thread pool (the readers release the GIL in I/O,
+    Parquet and CSV parsing).
+
+    Returns:
+        tuple: (enriched records, forecasting results, ImpactMatrix);
+        all None when the enriched dataset is missing.
+    """
+    loaded = read_artifacts()
+    if loaded['records'] is None:
+        return None, None, None
+    return loaded['records'], loaded['forecasts'], loaded['matrix']
+
+def path_state(paths):
+    """(mtime, size) of every file in `paths` (directories walked), to tell if they changed while read."""
+    state = []
+    for path in paths:
+        if os.path.isfile(path):
+            files = [path]
+        else:
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        for name in files:
+            try:
+                info = os.stat(name)
+            except FileNotFoundError:
+                continue
+            state.append((name, info.st_mtime_ns, info.st_size))
+    return state
+
+# One consistent set of artifacts, plus a version number per artifact
+Snapshot = namedtuple('Snapshot', ['records', 'model_records', 'forecasts', 'matrix', 'versions'])
+
+class DashboardData:
+    """
+    The dashboard's artifacts, kept current by a file watcher.
+
+    load() reads every artifact concurrently. start() then watches their
+    files with watchdog: a change re-reads only the affected artifact (and
+    the ones derived from it) once its files have been quiet for
+    RELOAD_DELAY seconds and were not modified during the read. The new
+    version replaces the old one in a new Snapshot, swapped in with a
+    single assignment, so a page run that took a snapshot keeps a
+    consistent set of artifacts and never sees a half-written file. A
+    failed read keeps serving the previous version.
+    """
+
+    def __init__(self, reload_delay=RELOAD_DELAY, artifacts=None):
+        self.artifacts = dict(artifacts or ARTIFACTS)
+        self.reload_delay = reload_delay
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._attempts = {}
+        self._observer = None
+        self._snapshot = None
+
+    def load(self):
+        """Reads every artifact concurrently and swaps them in; returns the snapshot."""
+        states = {name: path_state(paths) for name, (_, paths) in self.artifacts.items()}
+        with metrics_stage('dashboard_load'):
+            loaded = read_artifacts(self.artifacts)
+        snapshot = Snapshot(*(loaded.get(name) for name in Snapshot._fields[:-1]),
+                            versions={name: 1 for name in self.artifacts})
+        with self._lock:
+            self._snapshot = snapshot
+        for name in self.artifacts:
+            # Changed while being read: read again once it settles
+            if path_state(self.artifacts[name][1]) != states[name]:
+                self.schedule(name)
+        return snapshot
+
+    def snapshot(self):
+        """The current artifacts; take it once per page run and use only that."""
+        if self._snapshot is None:
+            return self.load()
+        return self._snapshot
+
+    def version(self, *names):
+        """Version numbers of the named artifacts, for keying caches derived from them."""
+        versions = self.snapshot().versions
+        return tuple(versions[name] for name in names)
+
+    def artifacts_for(self, path):
+        """Names of the artifacts read from `path` (several may share a file)."""
+        path = os.path.abspath(path)
+        names = []
+        for name, (_, paths) in self.artifacts.items():
+            for watched in paths:
+                watched = os.path.abspath(watched)
+                if path == watched or path.startswith(watched + os.sep):
+                    names.append(name)
+                    break
+        return names
+
+    def schedule(self, name, retry=False):
+        """(Re)starts the quiet-period timer of an artifact."""
+        with self._lock:
+            if not retry:
+                # A new change earns a new round of attempts
+                self._attempts.pop(name, None)
+            timer = self._timers.get(name)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.reload_delay, self.reload, args=(name,))
+            timer.daemon = True
+            self._timers[name] = timer
+            timer.start()
+
+    def reload(self, name):
+        """
+        Re-reads one artifact and swaps in a snapshot holding its new
+        version; artifacts derived from it are re-read next. Returns True
+        if the new version was swapped in.
+        """
+        paths = self.artifacts[name][1]
+        before = path_state(paths)
+        try:
+            with metrics_stage('dashboard_reload', artifact=name):
+                value = self.artifacts[name][0]()
+            settled = path_state(paths) == before
+        except Exception as e:
+            print(f"⚠️ Could not reload {name}: {e}; keeping the previous version")
+            settled = False
+
+        if not settled:
+            attempts = self._attempts.get(name, 0) + 1
+            self._attempts[name] = attempts
+            if attempts < MAX_RELOAD_ATTEMPTS:
+                self.schedule(name, retry=True)
+            return False
+        self._attempts.pop(name, None)
+
+        with self._lock:
+            current = self._snapshot
+            if current is None:
+                return False
+            versions = dict(current.versions)
+            versions[name] = versions.get(name, 0) + 1
+            self._snapshot = current._replace(**{name: value, 'versions': versions})
+        for dependent in DEPENDENTS.get(name, []):
+            if dependent in self.artifacts:
+                self.reload(dependent)
+        return True
+
+    def start(self):
+        """Starts watching the artifacts' directories (idempotent)."""
+        if self._observer is not None:
+            return self
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        loader = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type in ('opened', 'closed_no_write'):
+                    return
+                for path in (event.src_path, getattr(event, 'dest_path', '')):
+                    for name in loader.artifacts_for(path) if path else []:
+                        loader.schedule(name)
+
+        # Watch the nearest existing parent of every path, so artifacts created later are seen too
+        roots = set()
+        for _, paths in self.artifacts.values():
+            for path in paths:
+                parent = os.path.dirname(os.path.abspath(path))
+                while not os.path.isdir(parent):
+                    parent = os.path.dirname(parent)
+                roots.add(parent)
+        observer = Observer()
+        for root in sorted(roots):
+            # Nested roots are covered by a recursive watch of their parent
+            if not any(root.startswith(other + os.sep) for other in roots):
+                observer.schedule(Handler(), root, recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return self
+
+    def stop(self):
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
@@ -2,25 +2,23 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 
+from src.processed_store import load_enriched
+
 def load_or_mock_data():
     """
     Attempts to load the enriched dataset. If not found, creates a mock DataFrame
     representing the expected structure for demonstration purposes.
     """
-    file_path = 'data/processed/ethiopia_fi_enriched.csv'
-    
-    if os.path.exists(file_path):
-        try:
-            df = pd.read_csv(file_path)
-            print("Successfully loaded enriched data.")
-            return df
-        except Exception as e:
-            print(f"Error reading file: {e}. Generating mock data.")
-    else:
+    try:
+        df = load_enriched(columns=['indicator_code', 'year', 'value_numeric'], record_types=['observation'])
+        print("Successfully loaded enriched data.")
+        return df
+    except FileNotFoundError:
         print("Enriched data not found at expected path. Generating mock data.")
+    except Exception as e:
+        print(f"Error reading file: {e}. Generating mock data.")
 
     # Mock Data Generation (2017-2024 trends)
     years = np.arange(2017, 2025)
@@ -68,7 +66,8 @@ def plot_dual_axis_chart(df):
             index='year', 
             columns='indicator_code', 
             values='value_numeric',
-            aggfunc='mean'
+            aggfunc='mean',
+            observed=True
         )
         
         # We need two specific columns. If they don't exist in the real data, 
@@ -126,11 +125,14 @@ def plot_dual_axis_chart(df):
     except Exception as e:
         print(f"An error occurred during plotting: {e}")
 
-if __name__ == "__main__":
-    # Ensure dependencies are installed (in your environment): pandas, matplotlib, seaborn
+def main():
+    # Ensure dependencies are installed (in your environment): pandas, matplotlib
     print("Starting Deep-Dive EDA Script...")
     df = load_or_mock_data()
     if df is not None and not df.empty:
         plot_dual_axis_chart(df)
     else:
         print("No data available to plot.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import pandas as pd
+from cachetools import LRUCache
+
+from src.instrumentation import count_cache
+from src.shock_index import ShockIndex
+from src.task4_forecasting import (MODEL_CACHE, MODELS, SCENARIO_ADJUSTMENTS, fit_national_baselines,
+                                  scenario_forecast)
+
+# Columns of the enriched data the service reads, by record type:
+# observations for the trend fits, events for the dates of the matrix's events
+SERVICE_COLUMNS = {
+    'observation': ['record_type', 'indicator_code', 'observation_date', 'year', 'value_numeric', 'unit',
+                    'gender', 'location'],
+    'event': ['record_type', 'record_id', 'parent_id', 'indicator', 'observation_date'],
+}
+
+class ForecastService:
+    """
+    In-process trend + shock forecaster for interactive use.
+
+    The trend fit and the shock index are built once; each request only
+    applies the event multiplier and cumulative shocks to one indicator.
+    Trends are chosen among `models` by `selection` as in
+    forecast_scenarios(), so the service matches the stored forecasts.
+    Results are kept in a bounded LRU keyed on the quantized parameters.
+    """
+
+    def __init__(self, df, matrix, future_years=(2025, 2026, 2027), cache_size=256, step=0.05, models=None,
+                 selection='aic', cache_path=MODEL_CACHE):
+        self.future_years = list(future_years)
+        self.step = step
+        baselines = fit_national_baselines(df, self.future_years, models=list(models or MODELS),
+                                           selection=selection, cache_path=cache_path)
+        self.indicators = pd.Index(baselines['indicators'])
+        self.models = baselines['model']
+        self.base_pred = baselines['base_pred']
+        self.ci_95 = baselines['ci_95']
+        self.shock_index = ShockIndex.build(matrix, df)
+        self._cache = LRUCache(maxsize=cache_size)
+
+    def quantize(self, multiplier):
+        """Snaps a slider value to the cache grid."""
+        return round(round(multiplier / self.step) * self.step, 6)
+
+    def forecast(self, indicator_code, multiplier=1.0, scenario='Base'):
+        """
+        Runs the model for one indicator with a custom event impact multiplier.
+
+        Args:
+            indicator_code (str): Indicator with a fitted trend.
+            multiplier (float): Event impact multiplier (quantized to `step`).
+            scenario (str): Sets the flat annual adjustment (see SCENARIO_ADJUSTMENTS).
+
+        Returns:
+            pd.DataFrame: 'Year', 'Predicted_Value', 'Lower_CI', 'Upper_CI'.
+        """
+        if indicator_code not in self.indicators:
+            raise KeyError(f"No fitted trend for {indicator_code}")
+        scenario = scenario if scenario in SCENARIO_ADJUSTMENTS else 'Base'
+        key = (indicator_code, self.quantize(multiplier), scenario)
+
+        result = self._cache.get(key)
+        count_cache('forecast_service', result is not None)
+        if result is None:
+            pos = self.indicators.get_loc(indicator_code)
+            pred = scenario_forecast(self.base_pred[pos:pos + 1], self.shock_index, [indicator_code],
+                                     self.future_years, scenario, multiplier=key[1])[0]
+            result = pd.DataFrame({
+                'Year': self.future_years,
+                'Predicted_Value': pred.round(2),
+                'Lower_CI': (pred - self.ci_95[pos]).round(2),
+                'Upper_CI': (pred + self.ci_95[pos]).round(2),
+            })
+            self._cache[key] = result
+        return result.copy()
+
+    def cache_info(self):
+        return {'size': self._cache.currsize, 'maxsize': self._cache.maxsize}
@@ -1,63 +1,93 @@
 import pandas as pd
 import numpy as np
-import os
 
-def generate_matrix():
-    data_path = 'data/processed/ethiopia_fi_enriched.csv'
-    output_path = 'data/processed/event_indicator_matrix.csv'
+from src.impact_matrix import MATRIX_CSV, MATRIX_NPZ, ImpactMatrix
+from src.instrumentation import instrumented, record_size
+from src.processed_store import load_enriched
 
-    if not os.path.exists(data_path):
-        print(f"Error: {data_path} not found.")
-        return
+# Columns needed to join impact links to their events
+LINK_COLUMNS = [
+    'record_type', 'record_id', 'parent_id', 'indicator', 'indicator_code', 'related_indicator',
+    'impact_magnitude', 'impact_direction', 'lag_months', 'confidence', 'observation_date',
+]
+
+def prepare_events(df):
+    """
+    Returns one row per event with a clean 'parent_id', the 'event_display_name'
+    used as the matrix row label and the parsed 'event_date'.
+    """
+    events = df[df['record_type'] == 'event'].copy()
+
+    # Starter events carry their id in record_id, enrichment events in parent_id
+    event_ids = events['parent_id'] if 'parent_id' in events.columns else pd.Series(np.nan, index=events.index)
+    if 'record_id' in events.columns:
+        event_ids = event_ids.fillna(events['record_id'])
+    events['parent_id'] = event_ids.astype(str).str.strip()
 
-    df = pd.read_csv(data_path)
+    events['event_display_name'] = events['indicator'].fillna(events['parent_id'])
+    events['event_date'] = pd.to_datetime(events['observation_date'], format='mixed', errors='coerce')
+    return events[['parent_id', 'event_display_name', 'event_date']].drop_duplicates()
 
-    # 1. Isolate and Clean
+def prepare_impact_links(df):
+    """
+    Returns one row per impact link joined to its event, with numeric
+    'impact_magnitude' and 'lag_months', the target 'indicator_code' and
+    the link's 'confidence' and 'impact_direction'.
+    """
     links = df[df['record_type'] == 'impact_link'].copy()
-    events = df[df['record_type'] == 'event'].copy()
 
     # Clean IDs
     links['parent_id'] = links['parent_id'].astype(str).str.strip()
-    events['parent_id'] = events['parent_id'].astype(str).str.strip()
 
-    # 2. Prepare a clean event lookup table (only 2 columns)
+    # Check which indicator column to use
+    if 'related_indicator' in links.columns:
+        ind_col = 'related_indicator'
+    else:
+        ind_col = 'indicator_code'
+
+    for col in ['lag_months', 'confidence', 'impact_direction']:
+        if col not in links.columns:
+            links[col] = np.nan
+
+    links = pd.DataFrame({
+        'parent_id': links['parent_id'],
+        'indicator_code': links[ind_col].astype(object),
+        'impact_magnitude': pd.to_numeric(links['impact_magnitude'], errors='coerce').fillna(0),
+        'lag_months': pd.to_numeric(links['lag_months'], errors='coerce').fillna(0),
+        'confidence': links['confidence'].astype(object).fillna('medium'),
+        'impact_direction': links['impact_direction'].astype(object),
+    }, index=links.index)
+
+    # We join the links with a clean event lookup table
     # This prevents the event_name_x / event_name_y error
-    events['event_display_name'] = events['indicator'].fillna(events['parent_id'])
-    event_lookup = events[['parent_id', 'event_display_name']].drop_duplicates()
+    return pd.merge(links, prepare_events(df), on='parent_id', how='inner')
+
+@instrumented('matrix_generation')
+def generate_matrix():
+    try:
+        df = load_enriched(columns=LINK_COLUMNS, record_types=['event', 'impact_link'])
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return
 
-    # 3. Merge
-    # We join the links with our clean lookup table
-    impact_model_df = pd.merge(links, event_lookup, on='parent_id', how='inner')
+    # 1. Isolate, clean and merge links with their events
+    impact_model_df = prepare_impact_links(df)
 
     if impact_model_df.empty:
         print("❌ Error: Merge resulted in empty dataframe.")
         return
 
-    # 4. Standardize numeric and column names
-    impact_model_df['impact_magnitude'] = pd.to_numeric(impact_model_df['impact_magnitude'], errors='coerce').fillna(0)
-    
-    # Check which indicator column to use
-    if 'related_indicator' in impact_model_df.columns:
-        ind_col = 'related_indicator'
-    else:
-        ind_col = 'indicator_code'
+    # 2. Sparse event x indicator matrix (magnitudes summed per cell) + link metadata
+    matrix = ImpactMatrix.from_links(impact_model_df)
+    record_size(*matrix.shape)
+    matrix.save(MATRIX_NPZ)
+    print(f"✅ Success! Sparse matrix {matrix.shape[0]} events x {matrix.shape[1]} indicators "
+          f"({matrix.matrix.nnz} non-zero) saved to {MATRIX_NPZ}")
 
-    # 5. Pivot Table
-    try:
-        matrix = impact_model_df.pivot_table(
-            index='event_display_name', 
-            columns=ind_col, 
-            values='impact_magnitude', 
-            aggfunc='sum'
-        ).fillna(0)
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        matrix.to_csv(output_path)
-        print(f"✅ Success! Matrix saved to {output_path}")
-        print("You can now run Task 4 and start your Dashboard.")
-        
-    except Exception as e:
-        print(f"❌ Pivot failed: {e}")
+    # Dense copy for the notebooks and manual inspection
+    matrix.to_frame().to_csv(MATRIX_CSV)
+    print(f"Dense copy saved to {MATRIX_CSV}")
+    print("You can now run Task 4 and start your Dashboard.")
 
 if __name__ == "__main__":
-    generate_matrix()
\ No newline at end of file
+    generate_matrix()
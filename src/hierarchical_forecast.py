@@ -0,0 +1,253 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from src.shock_index import ShockIndex
+from src.task4_forecasting import (MODEL_CACHE, MODELS, SCENARIO_ADJUSTMENTS, add_year_column, fit_models,
+                                   indicator_caps, load_data)
+
+# Population shares used to weight each breakdown into the national value
+# (Ethiopia: roughly even gender split, about 22% urban). Regions have no
+# default shares, so region breakdowns are only reconciled when given some.
+BREAKDOWN_WEIGHTS = {
+    'gender': {'male': 0.5, 'female': 0.5},
+    'location': {'urban': 0.22, 'rural': 0.78},
+}
+
+# Breakdowns of these units average into the total; all others add up to it
+RATE_UNITS = ['%', 'pp', 'ratio', '% of GNI']
+
+NODE_KEYS = ['indicator_code', 'dimension', 'member']
+
+def hierarchy_nodes(df):
+    """
+    Labels each observation with its node in the indicator hierarchy:
+    dimension 'total' (national, all genders), or one member of the
+    'gender', 'location' or 'region' breakdown. Cross-classified rows
+    (e.g. female + rural) belong to no node and are dropped.
+    """
+    obs = add_year_column(df)
+    if 'record_type' in obs.columns:
+        obs = obs[obs['record_type'] == 'observation']
+
+    def column(name, total_values):
+        if name not in obs.columns:
+            return pd.Series('', index=obs.index), np.ones(len(obs), dtype=bool)
+        values = obs[name].astype(object).where(obs[name].notna(), '').astype(str).str.strip().str.lower()
+        return values, values.isin(total_values).to_numpy()
+
+    gender, all_genders = column('gender', ['', 'all'])
+    location, national = column('location', ['', 'national'])
+    region, no_region = column('region', [''])
+
+    dimension = np.select(
+        [all_genders & national & no_region, ~all_genders & national & no_region,
+         all_genders & ~national & no_region, all_genders & national & ~no_region],
+        ['total', 'gender', 'location', 'region'], default='')
+    member = np.select([dimension == 'gender', dimension == 'location', dimension == 'region'],
+                       [gender, location, region], default='all')
+
+    keep = dimension != ''
+    return obs[keep].assign(dimension=dimension[keep], member=member[keep])
+
+def constraint_matrix(nodes, units, weights=None):
+    """
+    Sparse coherence constraints C, one row per (indicator, breakdown):
+    total - sum(w_member * member) = 0, so coherent forecasts satisfy C y = 0.
+
+    A grouped hierarchy like this one (gender, location and region are
+    alternative splits of the same total) has no single bottom level, so
+    the summing rows are kept in this constraint form, C = [I | -A] up to
+    column order.
+
+    Args:
+        nodes (pd.MultiIndex): Node keys (NODE_KEYS) of the forecast rows.
+        units (pd.Series): Unit per indicator_code; rate units are weighted
+            averages of their breakdown, anything else sums.
+        weights (dict): Member weights per dimension (BREAKDOWN_WEIGHTS by default).
+
+    Returns:
+        scipy.sparse.csr_matrix: constraints x nodes. A breakdown gets a row
+        only if the total and every weighted member are among `nodes`.
+    """
+    weights = BREAKDOWN_WEIGHTS if weights is None else weights
+    frame = nodes.to_frame(index=False)
+    frame['pos'] = np.arange(len(frame))
+
+    shares = pd.DataFrame([(dim, member, w) for dim, members in weights.items() for member, w in members.items()],
+                          columns=['dimension', 'member', 'weight'])
+    expected = shares.groupby('dimension').size().rename('expected')
+
+    members = frame.merge(shares, on=['dimension', 'member'])
+    totals = frame[frame['dimension'] == 'total'][['indicator_code', 'pos']].rename(columns={'pos': 'total_pos'})
+    members = members.merge(totals, on='indicator_code')
+
+    # Only complete breakdowns can be reconciled
+    counts = members.groupby(['indicator_code', 'dimension']).size().rename('count')
+    complete = (counts.to_frame().join(expected, on='dimension')
+                .query('count == expected').reset_index()[['indicator_code', 'dimension']])
+    members = members.merge(complete, on=['indicator_code', 'dimension'])
+    if members.empty:
+        return sparse.csr_matrix((0, len(nodes)))
+
+    row, groups = pd.MultiIndex.from_frame(members[['indicator_code', 'dimension']]).factorize()
+    is_rate = members['indicator_code'].map(units).isin(RATE_UNITS).to_numpy()
+    coef = -np.where(is_rate, members['weight'].to_numpy(dtype=float), 1.0)
+
+    total_pos = members.groupby(row)['total_pos'].first().to_numpy()
+    rows = np.concatenate([np.arange(len(groups)), row])
+    cols = np.concatenate([total_pos, members['pos'].to_numpy()])
+    data = np.concatenate([np.ones(len(groups)), coef])
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(groups), len(nodes)))
+
+def reconcile(base, constraints, variances=None):
+    """
+    Projects base forecasts onto the coherent subspace in one solve:
+
+        y~ = y^ - W C' (C W C')^-1 C y^
+
+    which equals the summing-matrix form S (S' W^-1 S)^-1 S' W^-1 y^.
+    W = I is OLS reconciliation; passing the nodes' residual variances as
+    W is the diagonal MinT (WLS) estimator, which moves noisy series more.
+
+    Args:
+        base (np.ndarray): nodes x columns (any number of scenarios x horizons).
+        constraints (scipy.sparse matrix): C from constraint_matrix().
+        variances (np.ndarray): Diagonal of W per node (ones by default).
+
+    Returns:
+        np.ndarray: Reconciled forecasts, same shape as `base`. Nodes outside
+        every constraint are returned unchanged.
+    """
+    if constraints.shape[0] == 0:
+        return base.copy()
+    w = np.ones(base.shape[0]) if variances is None else np.asarray(variances, dtype=float)
+    cw = constraints.multiply(w[None, :]).tocsr()
+    # Only constrained nodes enter the product; NaN forecasts elsewhere stay put
+    gap = constraints @ np.nan_to_num(base)
+    lu = splu((cw @ constraints.T).tocsc())
+    return base - cw.T @ lu.solve(gap)
+
+def fit_hierarchy(df, future_years, models=None, selection='aic', workers=None, cache_path=MODEL_CACHE):
+    """
+    Chooses and fits the trend of every node (total and breakdowns of every
+    indicator) with fit_models(), as forecast_scenarios does for national
+    series. Returns its dict with node keys as 'series', plus each
+    indicator's 'units'.
+    """
+    history = hierarchy_nodes(df).dropna(subset=['indicator_code', 'year', 'value_numeric'])
+    history = history.assign(indicator_code=history['indicator_code'].astype(str), year=history['year'].astype(int))
+    points = history.groupby(NODE_KEYS + ['year'], as_index=False)['value_numeric'].mean()
+
+    # fit_models() keys series on one column, so each node gets a label
+    label = points['indicator_code'] + '|' + points['dimension'] + '|' + points['member']
+    keys = points[NODE_KEYS].set_index(label)
+    keys = keys[~keys.index.duplicated()]
+    caps = indicator_caps(history)
+    node_caps = {node: caps[code] for node, code in keys['indicator_code'].items() if code in caps}
+
+    fit = fit_models(points[['year', 'value_numeric']].assign(indicator_code=label), future_years,
+                     list(models or MODELS), selection, caps=node_caps, workers=workers, cache_path=cache_path)
+    result = dict(fit)
+    result['series'] = pd.MultiIndex.from_frame(keys.loc[fit['series']].reset_index(drop=True))
+
+    units = pd.Series(dtype=object)
+    if 'unit' in history.columns:
+        # Most common unit per indicator
+        counts = (history.dropna(subset=['unit']).astype({'indicator_code': str, 'unit': str})
+                  .groupby(['indicator_code', 'unit']).size().sort_values(ascending=False, kind='stable'))
+        units = counts.reset_index().drop_duplicates('indicator_code').set_index('indicator_code')['unit']
+    result['units'] = units
+    return result
+
+def hierarchical_forecast(df, matrix, future_years, scenarios=('Base', 'Optimistic', 'Pessimistic'),
+                          method='wls', weights=None, models=None, selection='aic', workers=None,
+                          cache_path=MODEL_CACHE):
+    """
+    Trend + shock forecasts for every node of the indicator hierarchy,
+    reconciled so each national value equals its weighted breakdowns.
+
+    Base forecasts for all nodes, scenarios and years form one
+    nodes x (scenarios * years) matrix, reconciled with a single sparse solve.
+
+    Args:
+        df (pd.DataFrame): Enriched records.
+        matrix (ImpactMatrix or pd.DataFrame): Event-indicator matrix; a
+            node gets the event shocks of its indicator.
+        future_years (list): Forecast years.
+        scenarios (tuple): Scenario names.
+        method (str): 'ols' (W = I) or 'wls' (W = residual variance per node).
+        weights (dict): Breakdown weights (BREAKDOWN_WEIGHTS by default).
+        models (list): Trend candidates (all of MODELS by default).
+        selection (str): 'aic' or 'backtest' (see select_model).
+        workers (int): Process pool size for fit_models().
+        cache_path (str): Model fit cache; None disables it.
+
+    Returns:
+        pd.DataFrame: 'Scenario', 'Indicator', 'Dimension', 'Member', 'Model', 'Year',
+        'Base_Value' (before reconciliation), 'Predicted_Value', 'Lower_CI', 'Upper_CI'.
+    """
+    future_years = list(future_years)
+    fit = fit_hierarchy(df, future_years, models, selection, workers, cache_path)
+    nodes = fit['series']
+    indicators = nodes.get_level_values('indicator_code')
+
+    shock_index = ShockIndex.build(matrix, df)
+    base = np.hstack([
+        fit['projections'] + shock_index.cumulative(
+            future_years, sc, indicators, adjustment=SCENARIO_ADJUSTMENTS.get(sc, 0.0)).T
+        for sc in scenarios])
+
+    if method == 'ols':
+        variances = None
+    elif method == 'wls':
+        # Floor the variance so perfectly fitted (two-point) series still move a little
+        variances = np.maximum(np.nan_to_num(fit['rse'] ** 2, nan=1.0), 1e-3)
+    else:
+        raise ValueError(f"Unknown reconciliation method: {method}")
+
+    constraints = constraint_matrix(nodes, fit['units'], weights)
+    reconciled = reconcile(base, constraints, variances)
+
+    n_nodes, n_years = len(nodes), len(future_years)
+    ci_95 = np.where(fit['n_obs'] > 2, 1.96 * fit['rse'], 2.0)
+    pred = reconciled.reshape(n_nodes, len(scenarios), n_years).transpose(1, 0, 2)
+    return pd.DataFrame({
+        'Scenario': np.repeat(list(scenarios), n_nodes * n_years),
+        'Indicator': np.tile(np.repeat(np.asarray(indicators), n_years), len(scenarios)),
+        'Dimension': np.tile(np.repeat(np.asarray(nodes.get_level_values('dimension')), n_years), len(scenarios)),
+        'Member': np.tile(np.repeat(np.asarray(nodes.get_level_values('member')), n_years), len(scenarios)),
+        'Model': np.tile(np.repeat(fit['model'], n_years), len(scenarios)),
+        'Year': np.tile(future_years, n_nodes * len(scenarios)),
+        'Base_Value': base.reshape(n_nodes, len(scenarios), n_years).transpose(1, 0, 2).ravel().round(2),
+        'Predicted_Value': pred.ravel().round(2),
+        'Lower_CI': (pred - ci_95[None, :, None]).ravel().round(2),
+        'Upper_CI': (pred + ci_95[None, :, None]).ravel().round(2),
+    })
+
+def run_hierarchical_forecast():
+    print("--- Starting Hierarchical Forecasting (Reconciled Breakdowns) ---")
+
+    try:
+        df, matrix = load_data()
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    results_df = hierarchical_forecast(df, matrix, [2025, 2026, 2027])
+    n_nodes = len(results_df.drop_duplicates(['Indicator', 'Dimension', 'Member']))
+    print(f"Forecast {n_nodes} hierarchy nodes")
+
+    print("\n--- ACC_OWNERSHIP and its breakdowns (Base) ---")
+    print(results_df[(results_df['Indicator'] == 'ACC_OWNERSHIP') & (results_df['Scenario'] == 'Base')])
+
+    output_path = 'data/processed/forecasting_hierarchical.csv'
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    results_df.to_csv(output_path, index=False)
+    print(f"\nSaved to {output_path}")
+
+if __name__ == "__main__":
+    run_hierarchical_forecast()
@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+MATRIX_NPZ = 'data/processed/event_indicator_matrix.npz'
+MATRIX_CSV = 'data/processed/event_indicator_matrix.csv'
+
+# Per-link metadata stored next to the matrix
+LINK_FIELDS = ['event', 'indicator', 'impact_magnitude', 'lag_months', 'impact_direction', 'confidence',
+               'effect_type', 'rollout_months']
+TEXT_FIELDS = ['impact_direction', 'confidence', 'effect_type']
+
+# Rollout curve of a link's impact after its lag until calibrated (see impact_modeling.lag_kernel)
+DEFAULT_EFFECT_TYPE = 'sigmoid'
+DEFAULT_ROLLOUT_MONTHS = 12
+
+class ImpactMatrix:
+    """
+    Sparse (CSR) event x indicator matrix of summed impact magnitudes.
+
+    Keeps the event and indicator dictionaries (row / column labels), each
+    event's date, and one metadata row per impact link (lag_months,
+    direction, confidence, rollout curve), so nothing has to be re-read from the enriched
+    data to build shocks. Real links touch a few indicators per event, so
+    the matrix is almost all zeros and is never densified on the hot path.
+    """
+
+    def __init__(self, matrix, events, indicators, event_dates=None, links=None):
+        self.matrix = sparse.csr_matrix(matrix, dtype=float)
+        self.events = pd.Index(events)
+        self.indicators = pd.Index(indicators)
+        if event_dates is None:
+            event_dates = pd.Series(pd.NaT, index=self.events, dtype='datetime64[ns]')
+        self.event_dates = pd.Series(pd.DatetimeIndex(event_dates), index=self.events)
+        self.links = links if links is not None else pd.DataFrame(columns=LINK_FIELDS)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def empty(self):
+        return self.matrix.shape[0] == 0 or self.matrix.shape[1] == 0
+
+    @classmethod
+    def from_links(cls, links):
+        """
+        Builds the matrix from prepare_impact_links() output; magnitudes of
+        repeated (event, indicator) links are summed.
+        """
+        links = links.dropna(subset=['indicator_code'])
+        event_codes, events = pd.factorize(links['event_display_name'], sort=True)
+        indicator_codes, indicators = pd.factorize(links['indicator_code'].astype(str), sort=True)
+
+        matrix = sparse.coo_matrix(
+            (links['impact_magnitude'].to_numpy(dtype=float), (event_codes, indicator_codes)),
+            shape=(len(events), len(indicators))).tocsr()
+        matrix.sum_duplicates()
+
+        event_dates = links.groupby('event_display_name')['event_date'].first().reindex(events)
+        direction = links['impact_direction'] if 'impact_direction' in links.columns else pd.Series(np.nan, index=links.index)
+        meta = pd.DataFrame({
+            'event': event_codes,
+            'indicator': indicator_codes,
+            'impact_magnitude': links['impact_magnitude'].to_numpy(dtype=float),
+            'lag_months': links['lag_months'].to_numpy(dtype=float),
+            'impact_direction': direction.astype(object).fillna('').astype(str).to_numpy(),
+            'confidence': links['confidence'].astype(str).to_numpy(),
+            'effect_type': DEFAULT_EFFECT_TYPE,
+            'rollout_months': float(DEFAULT_ROLLOUT_MONTHS),
+        })
+        return cls(matrix, events, indicators, event_dates.to_numpy(), meta)
+
+    def with_links(self, links):
+        """New matrix with the same dictionaries and dates, rebuilt from an edited link table."""
+        matrix = sparse.coo_matrix(
+            (links['impact_magnitude'].to_numpy(dtype=float),
+             (links['event'].to_numpy(), links['indicator'].to_numpy())),
+            shape=self.shape).tocsr()
+        matrix.sum_duplicates()
+        return ImpactMatrix(matrix, self.events, self.indicators, self.event_dates.to_numpy(), links)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Wraps a dense event x indicator DataFrame (e.g. a legacy matrix CSV)."""
+        if frame.empty:
+            return cls(sparse.csr_matrix((0, 0)), [], [])
+        return cls(frame.fillna(0).to_numpy(dtype=float), frame.index, frame.columns)
+
+    def to_frame(self):
+        """Dense DataFrame view (rows: events, columns: indicators), for display."""
+        return pd.DataFrame(self.matrix.toarray(), index=self.events, columns=self.indicators)
+
+    def save(self, path=MATRIX_NPZ):
+        """Writes the CSR arrays, dictionaries and link metadata to one .npz file."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+            events=self.events.to_numpy(dtype=str), indicators=self.indicators.to_numpy(dtype=str),
+            event_dates=self.event_dates.to_numpy(dtype='datetime64[ns]'),
+            **{f'link_{field}': self.links[field].to_numpy(dtype=str if field in TEXT_FIELDS else float)
+               for field in LINK_FIELDS})
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path=MATRIX_NPZ):
+        with np.load(path) as npz:
+            matrix = sparse.csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape=tuple(npz['shape']))
+            links = pd.DataFrame({field: npz[f'link_{field}'] for field in LINK_FIELDS if f'link_{field}' in npz})
+            # Files written before rollout calibration carry no curve per link
+            links['effect_type'] = links.get('effect_type', DEFAULT_EFFECT_TYPE)
+            links['rollout_months'] = links.get('rollout_months', float(DEFAULT_ROLLOUT_MONTHS))
+            links[['event', 'indicator']] = links[['event', 'indicator']].astype(np.int64)
+            return cls(matrix, npz['events'], npz['indicators'], npz['event_dates'], links)
+
+def load_impact_matrix(path=MATRIX_NPZ, csv_path=MATRIX_CSV):
+    """
+    Loads the sparse matrix, falling back to a dense matrix CSV from older
+    runs. Returns None if neither exists.
+    """
+    if os.path.exists(path):
+        return ImpactMatrix.load(path)
+    if os.path.exists(csv_path):
+        return ImpactMatrix.from_frame(pd.read_csv(csv_path, index_col=0))
+    return None
@@ -1,51 +1,132 @@
 
+import functools
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
-def calculate_lag_effect(start_date, total_impact, duration_months, effect_type='linear'):
+from src.instrumentation import instrumented, record_size, register_cache
+
+def month_ordinal(dates):
+    """Maps dates to a contiguous integer month axis (year * 12 + month - 1)."""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates, format='mixed', errors='coerce'))
+    return dates.year * 12 + dates.month - 1
+
+@functools.lru_cache(maxsize=None)
+def lag_kernel(effect_type, duration_months):
     """
-    Distributes the total impact of an event over a specified duration.
-    
+    Normalized monthly increments (summing to 1) of an effect curve.
+    Memoized per (effect_type, duration_months); the array is read-only.
+
     Args:
-        start_date (str): YYYY-MM-DD string.
-        total_impact (float): Total percentage or value lift (e.g., 0.15 for 15%).
-        duration_months (int): Number of months the impact is spread over.
         effect_type (str): 'linear', 'sigmoid', or 'decay'.
-    
+        duration_months (int): Number of months the impact is spread over.
+
     Returns:
-        pd.DataFrame: DataFrame with 'date' and 'incremental_impact'.
+        np.ndarray: Shape (duration_months,).
     """
-    start = pd.to_datetime(start_date)
-    dates = [start + pd.DateOffset(months=i) for i in range(duration_months)]
-    
+    duration_months = int(duration_months)
+    if duration_months < 1:
+        raise ValueError(f"duration_months must be >= 1, got {duration_months}")
+
     if effect_type == 'linear':
         # Even distribution
-        monthly_impact = total_impact / duration_months
-        impacts = [monthly_impact] * duration_months
-        
+        kernel = np.full(duration_months, 1.0 / duration_months)
+
     elif effect_type == 'sigmoid':
         # S-curve logic: slow start -> accelerate -> smooth out
-        # Using a logistic function approximation normalized to sum to total_impact
+        # Difference of the logistic CDF gives the monthly addition (PDF)
         x = np.linspace(-6, 6, duration_months)
-        y = 1 / (1 + np.exp(-x))
-        # Derivative of logistic gives the rate of change (density function)
-        # But here we want the incremental addition each month.
-        # Let's take the difference of the CDF to get the PDF (monthly add)
-        cdf = y
+        cdf = 1 / (1 + np.exp(-x))
         pdf = np.diff(cdf, prepend=0)
-        # Normalize PDF to sum to 1, then scale by total_impact
-        impacts = (pdf / pdf.sum()) * total_impact
-        
+        kernel = pdf / pdf.sum()
+
     elif effect_type == 'decay':
         # Strong start, then fades out (e.g., marketing burst)
         # Exponential decay
-        x = np.arange(duration_months)
-        y = np.exp(-0.5 * x)
-        impacts = (y / y.sum()) * total_impact
-        
+        y = np.exp(-0.5 * np.arange(duration_months))
+        kernel = y / y.sum()
+
     else:
         raise ValueError(f"Unknown effect_type: {effect_type}")
+
+    kernel.setflags(write=False)
+    return kernel
+
+register_cache('lag_kernel', lag_kernel)
+
+@instrumented('lag_curves')
+def calculate_lag_effects(start_dates, total_impacts, durations, effect_types='linear',
+                          axis_start=None, axis_end=None):
+    """
+    Batched version of calculate_lag_effect for many events on a shared monthly axis.
+
+    Events are grouped by (effect_type, duration); each group is one
+    broadcasted multiply of its magnitudes with the memoized kernel.
+
+    Args:
+        start_dates (array-like): Event start dates; events without a
+            parseable date get an all-zero row.
+        total_impacts (array-like): Total lift per event.
+        durations (int or array-like): Rollout months per event.
+        effect_types (str or array-like): 'linear', 'sigmoid' or 'decay' per event.
+        axis_start, axis_end (str or Timestamp): Optional month range of the axis.
+            Increments before axis_start are folded into its first month;
+            increments after axis_end are dropped.
+
+    Returns:
+        tuple: (pd.DatetimeIndex of month starts, np.ndarray events x months
+        of incremental impact). Use np.cumsum(..., axis=1) for cumulative impact.
+    """
+    ordinals = np.asarray(month_ordinal(start_dates), dtype=float)
+    n_events = len(ordinals)
+    # Events without a (parseable) start date keep an all-zero row
+    dated = ~np.isnan(ordinals)
+    starts = np.where(dated, ordinals, 0).astype(np.int64)
+    impacts = np.broadcast_to(np.asarray(total_impacts, dtype=float), (n_events,))
+    durations = np.broadcast_to(np.asarray(durations, dtype=np.int64), (n_events,))
+    effect_types = np.broadcast_to(np.asarray(effect_types, dtype=object), (n_events,))
+
+    any_dated = dated.any()
+    first = month_ordinal([axis_start])[0] if axis_start is not None else (starts[dated].min() if any_dated else 0)
+    last = month_ordinal([axis_end])[0] if axis_end is not None else (
+        (starts + durations)[dated].max() - 1 if any_dated else first)
+    n_months = max(int(last - first + 1), 0)
+
+    out = np.zeros((n_events, n_months))
+    record_size(n_events, n_months)
+    groups = pd.DataFrame({'effect_type': effect_types, 'duration': durations})[dated].groupby(
+        ['effect_type', 'duration']).indices
+    dated_rows = np.flatnonzero(dated)
+    for (effect_type, duration), positions in groups.items():
+        rows = dated_rows[positions]
+        kernel = lag_kernel(effect_type, int(duration))
+        cols = (starts[rows] - first)[:, None] + np.arange(duration)[None, :]
+        values = impacts[rows, None] * kernel[None, :]
+        keep = cols < n_months
+        rows_2d = np.broadcast_to(rows[:, None], cols.shape)
+        np.add.at(out, (rows_2d[keep], np.maximum(cols[keep], 0)), values[keep])
+
+    months = pd.date_range(
+        start=pd.Timestamp(year=int(first // 12), month=int(first % 12) + 1, day=1),
+        periods=n_months, freq='MS')
+    return months, out
+
+def calculate_lag_effect(start_date, total_impact, duration_months, effect_type='linear'):
+    """
+    Distributes the total impact of an event over a specified duration.
+    
+    Args:
+        start_date (str): YYYY-MM-DD string.
+        total_impact (float): Total percentage or value lift (e.g., 0.15 for 15%).
+        duration_months (int): Number of months the impact is spread over.
+        effect_type (str): 'linear', 'sigmoid', or 'decay'.
+    
+    Returns:
+        pd.DataFrame: DataFrame with 'date' and 'incremental_impact'.
+    """
+    start = pd.to_datetime(start_date)
+    dates = [start + pd.DateOffset(months=i) for i in range(duration_months)]
+    impacts = lag_kernel(effect_type, duration_months) * total_impact
         
     return pd.DataFrame({
         'date': dates,
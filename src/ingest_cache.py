@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from src.instrumentation import count_cache
+
+CACHE_DIR = 'data/cache'
+INDEX_FILE = '_index.json'
+
+RAW_WORKBOOKS = [
+    'data/raw/ethiopia_fi_unified_data.xlsx',
+    'data/raw/reference_codes.xlsx',
+    'data/raw/Additional Data Points Guide.xlsx',
+]
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def path_fingerprint(path):
+    """Content hash of a file, or of every file under a directory; 'missing' if absent."""
+    if os.path.isfile(path):
+        return file_sha256(path)
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode())
+                digest.update(file_sha256(full).encode())
+        return digest.hexdigest()
+    return 'missing'
+
+def _load_index(cache_dir):
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt index only costs a re-conversion
+        return {}
+
+def _save_index(cache_dir, index):
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, index_path)
+
+def _arrow_safe(df):
+    """Stringifies object columns Arrow cannot type (e.g. ints mixed with 'FY2022/23')."""
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+def _write_sheets(sheets, entry_dir):
+    """Writes one Arrow file per sheet into `entry_dir`, swapped in atomically."""
+    tmp_dir = entry_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    for i, frame in enumerate(sheets.values()):
+        feather.write_feather(_arrow_safe(frame), os.path.join(tmp_dir, f'{i}.arrow'), compression='uncompressed')
+
+    if os.path.exists(entry_dir):
+        shutil.rmtree(entry_dir)
+    os.replace(tmp_dir, entry_dir)
+    return list(sheets.keys())
+
+def _convert(path, entry_dir):
+    """Reads every sheet once with pd.read_excel and writes one Arrow file per sheet."""
+    return _write_sheets(pd.read_excel(path, sheet_name=None), entry_dir)
+
+def cached_workbook(path, cache_dir=CACHE_DIR):
+    """
+    Ensures `path` is converted in the cache and returns its index entry.
+
+    The (size, mtime) pair is the fast path; only when it changes is the
+    content hash recomputed, and only when the hash changes is the workbook
+    converted again.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = os.path.abspath(path)
+    index = _load_index(cache_dir)
+    entry = index.get(key)
+
+    stat = os.stat(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns \
+            and os.path.isdir(os.path.join(cache_dir, entry['sha256'])):
+        count_cache('arrow_cache', True)
+        return entry
+
+    sha = file_sha256(path)
+    entry_dir = os.path.join(cache_dir, sha)
+    hit = bool(entry and entry['sha256'] == sha and os.path.isdir(entry_dir))
+    count_cache('arrow_cache', hit)
+    if not hit:
+        print(f"Converting {path} to Arrow cache...")
+        sheets = _convert(path, entry_dir)
+        if entry and entry['sha256'] != sha and not any(
+                e['sha256'] == entry['sha256'] for k, e in index.items() if k != key):
+            shutil.rmtree(os.path.join(cache_dir, entry['sha256']), ignore_errors=True)
+    else:
+        sheets = entry['sheets']
+
+    entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha, 'sheets': sheets}
+    index[key] = entry
+    _save_index(cache_dir, index)
+    return entry
+
+def cache_frames(path, sheets, cache_dir=CACHE_DIR):
+    """
+    Registers in-memory sheets as the cache entry of the file at `path`.
+
+    Used for synthetic workbooks that are too large to write as real Excel
+    files; `path` only has to exist so its size, mtime and hash can be indexed.
+
+    Args:
+        path (str): File the sheets stand in for.
+        sheets (dict): Sheet name -> pd.DataFrame, in sheet order.
+
+    Returns:
+        dict: The index entry.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(path)
+    sha = file_sha256(path)
+    names = _write_sheets(sheets, os.path.join(cache_dir, sha))
+
+    index = _load_index(cache_dir)
+    entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha, 'sheets': names}
+    index[os.path.abspath(path)] = entry
+    _save_index(cache_dir, index)
+    return entry
+
+def sheet_arrow_path(path, sheet_name=0, cache_dir=CACHE_DIR):
+    """Path of the cached Arrow IPC file for one sheet (position or name)."""
+    entry = cached_workbook(path, cache_dir)
+    if isinstance(sheet_name, int):
+        position = sheet_name
+    elif sheet_name in entry['sheets']:
+        position = entry['sheets'].index(sheet_name)
+    else:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return os.path.join(cache_dir, entry['sha256'], f'{position}.arrow')
+
+def read_workbook(path, sheet_name=0, cache_dir=CACHE_DIR):
+    """
+    Drop-in for pd.read_excel(path, sheet_name=...) backed by the Arrow cache.
+
+    Args:
+        path (str): Excel workbook.
+        sheet_name (int, str or None): Sheet position or name; None returns
+            a dict of all sheets, like pd.read_excel.
+
+    Returns:
+        pd.DataFrame or dict of pd.DataFrame
+    """
+    if sheet_name is None:
+        entry = cached_workbook(path, cache_dir)
+        return {name: read_workbook(path, i, cache_dir) for i, name in enumerate(entry['sheets'])}
+    return feather.read_feather(sheet_arrow_path(path, sheet_name, cache_dir), memory_map=True)
+
+def warm_cache(paths=RAW_WORKBOOKS, cache_dir=CACHE_DIR):
+    """Converts all raw workbooks that are missing or stale in the cache."""
+    for path in paths:
+        if os.path.exists(path):
+            entry = cached_workbook(path, cache_dir)
+            print(f"{path}: {len(entry['sheets'])} sheet(s) cached ({entry['sha256'][:12]})")
+        else:
+            print(f"Warning: {path} not found, skipped.")
+
+if __name__ == "__main__":
+    warm_cache()
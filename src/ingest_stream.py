@@ -0,0 +1,173 @@
+import argparse
+import glob
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.processed_store import (ENRICHED_CSV, STORE_PATH, append_csv, append_processed, has_store,
+                                 read_processed)
+from src.validate_data import RULES
+
+# Drop directory for new records; ingested files are moved to 'done/'
+INCOMING_DIR = 'data/incoming'
+DONE_DIR = 'done'
+REJECTED_DIR = 'rejected'
+
+# Records per appended batch
+CHUNK_SIZE = 50000
+
+def iter_drop_file(file_path, chunksize=CHUNK_SIZE):
+    """Yields DataFrame chunks of a JSONL or CSV drop file, values kept as read (no type inference)."""
+    if file_path.endswith('.jsonl'):
+        reader = pd.read_json(file_path, lines=True, dtype=False, convert_dates=False, chunksize=chunksize)
+    elif file_path.endswith('.csv'):
+        reader = pd.read_csv(file_path, chunksize=chunksize)
+    else:
+        raise ValueError("Unsupported drop file format. Please use .jsonl or .csv")
+    with reader:
+        yield from reader
+
+def store_event_ids(path=STORE_PATH):
+    """Event ids in the store (only the event partition is read)."""
+    events = read_processed(columns=['record_id', 'parent_id'], record_types=['event'], path=path)
+    ids = set()
+    for col in ['parent_id', 'record_id']:
+        if col in events.columns:
+            ids.update(events[col].dropna().astype(str).str.strip())
+    return ids
+
+def validate_batch(batch, event_ids):
+    """
+    Runs every validation rule on a batch. Unlike a whole file, a batch is
+    not skipped by a rule for lacking its columns: a field a record leaves
+    out is missing. Impact links may reference events of the batch or of
+    `event_ids` (events already in the store).
+
+    Returns:
+        dict: Offending row positions per failed rule.
+    """
+    batch = batch.reset_index(drop=True)
+    failures = {}
+    # Records are partitioned by type, so they cannot be stored without one
+    if 'record_type' not in batch.columns:
+        return {'record_type': np.arange(len(batch))}
+    untyped = np.flatnonzero(batch['record_type'].isna().to_numpy())
+    if len(untyped):
+        failures['record_type'] = untyped
+
+    columns = sorted({col for rule in RULES.values() for col in rule.columns} - set(batch.columns))
+    batch = batch.assign(**{col: np.nan for col in columns})
+    for rule in RULES.values():
+        state = {'event_ids': set(event_ids)}
+        mask = rule.check(batch, state)
+        rows = [] if mask is None else [np.flatnonzero(np.asarray(mask, dtype=bool))]
+        if rule.finalize is not None and mask is None:
+            rows.append(np.asarray(rule.finalize(state), dtype=np.int64))
+        rows = np.unique(np.concatenate(rows)) if rows else np.array([], dtype=np.int64)
+        if len(rows):
+            failures[rule.name] = rows
+    return failures
+
+def ingest_file(file_path, store_path=STORE_PATH, csv_path=ENRICHED_CSV, chunksize=CHUNK_SIZE, event_ids=None):
+    """
+    Streams one drop file into the store, one appended batch per chunk.
+    Records failing a validation rule are skipped and written to
+    '<file>.rejected.csv' under the drop directory's 'rejected/' folder.
+
+    Returns:
+        dict: 'file', 'read', 'appended', 'duplicates' and 'rejected' counts.
+    """
+    event_ids = store_event_ids(store_path) if event_ids is None else event_ids
+    summary = {'file': file_path, 'read': 0, 'appended': 0, 'duplicates': 0, 'rejected': 0}
+    rejected = []
+
+    for chunk in iter_drop_file(file_path, chunksize):
+        chunk = chunk.reset_index(drop=True)
+        summary['read'] += len(chunk)
+
+        failures = validate_batch(chunk, event_ids)
+        bad = np.unique(np.concatenate(list(failures.values()))) if failures else np.array([], dtype=np.int64)
+        if len(bad):
+            reasons = pd.Series('', index=chunk.index)
+            for name, rows in failures.items():
+                reasons.iloc[rows] += name + ';'
+            rejected.append(chunk.iloc[bad].assign(rejected_by=reasons.iloc[bad].str.rstrip(';')))
+            chunk = chunk.drop(index=bad)
+
+        appended = append_processed(chunk, store_path)
+        if len(appended) and csv_path and os.path.exists(csv_path):
+            append_csv(appended, csv_path)
+
+        is_event = appended['record_type'] == 'event'
+        for col in ['parent_id', 'record_id']:
+            if col in appended.columns:
+                event_ids.update(appended.loc[is_event, col].dropna().astype(str).str.strip())
+
+        summary['appended'] += len(appended)
+        summary['duplicates'] += len(chunk) - len(appended)
+        summary['rejected'] += len(bad)
+
+    if rejected:
+        reject_dir = os.path.join(os.path.dirname(file_path), REJECTED_DIR)
+        os.makedirs(reject_dir, exist_ok=True)
+        reject_path = os.path.join(reject_dir, os.path.basename(file_path) + '.rejected.csv')
+        pd.concat(rejected, ignore_index=True).to_csv(reject_path, index=False)
+    return summary
+
+def ingest_incoming(incoming_dir=INCOMING_DIR, store_path=STORE_PATH, csv_path=ENRICHED_CSV, chunksize=CHUNK_SIZE):
+    """
+    Ingests every .jsonl / .csv file in the drop directory, oldest first,
+    and moves each one to 'done/' once it is in the store.
+
+    Returns:
+        list: One summary dict per file (see ingest_file).
+    """
+    files = sorted(glob.glob(os.path.join(incoming_dir, '*.jsonl')) + glob.glob(os.path.join(incoming_dir, '*.csv')),
+                   key=lambda f: (os.path.getmtime(f), f))
+    if not files:
+        return []
+
+    event_ids = store_event_ids(store_path)
+    done_dir = os.path.join(incoming_dir, DONE_DIR)
+    os.makedirs(done_dir, exist_ok=True)
+
+    summaries = []
+    for file_path in files:
+        summaries.append(ingest_file(file_path, store_path, csv_path, chunksize, event_ids))
+        shutil.move(file_path, os.path.join(done_dir, os.path.basename(file_path)))
+    return summaries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append JSONL / CSV drop files to the enriched Parquet store.")
+    parser.add_argument('files', nargs='*', help=f"Files to ingest (default: everything in {INCOMING_DIR}).")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if not has_store():
+        print(f"Error: Parquet store not found at {STORE_PATH}. Please run task1_enrichment.py.")
+        return 1
+
+    if args.files:
+        event_ids = store_event_ids()
+        summaries = [ingest_file(path, chunksize=args.chunksize, event_ids=event_ids) for path in args.files]
+    else:
+        summaries = ingest_incoming(chunksize=args.chunksize)
+
+    if not summaries:
+        print(f"No drop files in {INCOMING_DIR}.")
+    for s in summaries:
+        print(f"{s['file']}: {s['read']} read, {s['appended']} appended, "
+              f"{s['duplicates']} duplicates skipped, {s['rejected']} rejected")
+
+    rejected = sum(s['rejected'] for s in summaries)
+    if rejected:
+        print(f"\n❌ {rejected} records failed validation (see {REJECTED_DIR}/).")
+        return 1
+    print("\n✅ Ingestion complete.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
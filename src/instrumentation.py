@@ -0,0 +1,217 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+
+METRICS_PATH = 'data/processed/metrics.jsonl'
+
+# 'full' records wall time and tracemalloc peak memory, 'time' skips the
+# tracing overhead, 'off' records nothing
+MODE_ENV = 'FI_METRICS'
+# Shared by every process of one pipeline run
+RUN_ENV = 'FI_RUN_ID'
+
+# Memoized functions (anything with cache_info()) whose hits each stage reports
+CACHES = {}
+
+_local = threading.local()
+_lock = threading.Lock()
+_tracing = {'active': 0, 'owned': False}
+
+def metrics_mode():
+    mode = os.environ.get(MODE_ENV, 'full').lower()
+    return mode if mode in ('full', 'time', 'off') else 'full'
+
+def run_id():
+    """Id of the current run; set once per process (inherited by pipeline workers)."""
+    if RUN_ENV not in os.environ:
+        os.environ[RUN_ENV] = datetime.now().strftime('%Y%m%dT%H%M%S-') + uuid.uuid4().hex[:6]
+    return os.environ[RUN_ENV]
+
+def new_run():
+    """Starts a new run id for this process and the workers it spawns."""
+    os.environ.pop(RUN_ENV, None)
+    return run_id()
+
+def register_cache(name, cached):
+    """Reports hits / misses of an lru_cache'd function in every stage."""
+    CACHES[name] = cached
+    return cached
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+def count_cache(name, hit):
+    """Counts one lookup of a hand-rolled cache in every active stage of this thread (so parents include it)."""
+    for record in _stack():
+        counts = record['caches'].setdefault(name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+def record_size(rows, columns=None):
+    """Sets the row / column count of the innermost active stage."""
+    stack = _stack()
+    if stack:
+        stack[-1]['rows'] = None if rows is None else int(rows)
+        stack[-1]['columns'] = None if columns is None else int(columns)
+
+def _shape(result):
+    """(rows, columns) of a stage's return value, if it looks like a table."""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    shape = getattr(result, 'shape', None)
+    if isinstance(shape, tuple) and len(shape) in (1, 2):
+        return shape[0], (shape[1] if len(shape) == 2 else None)
+    if isinstance(result, dict) and 'indicators' in result:
+        return len(result['indicators']), None
+    return None, None
+
+def _cache_counts():
+    counts = {}
+    for name, cached in CACHES.items():
+        info = cached.cache_info()
+        counts[name] = (info.hits, info.misses)
+    return counts
+
+def write_metric(record, path=None):
+    """Appends one JSON line; metrics never break the stage they describe."""
+    try:
+        path = path or METRICS_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+    except OSError:
+        pass
+
+@contextlib.contextmanager
+def stage(name, path=None, **fields):
+    """
+    Measures a block as one stage and writes its metrics line on exit:
+    wall time, peak traced memory above the level at entry, rows / columns
+    (see record_size) and cache hits / misses during the stage. Stages
+    nest; the record names its parent.
+
+    Memory is only traced when no one else (e.g. the benchmarks) is
+    already running tracemalloc; 'peak_mb' is None otherwise.
+
+    Yields:
+        dict: The record being built; extra keys are written as they are.
+    """
+    mode = metrics_mode()
+    if mode == 'off':
+        yield {'caches': {}}
+        return
+
+    stack = _stack()
+    record = {
+        'run_id': run_id(),
+        'stage': name,
+        'parent': stack[-1]['stage'] if stack else None,
+        'started': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'pid': os.getpid(),
+        'rows': None,
+        'columns': None,
+        'caches': {},
+        **fields,
+    }
+
+    traced = False
+    if mode == 'full':
+        with _lock:
+            if _tracing['active'] == 0:
+                _tracing['owned'] = not tracemalloc.is_tracing()
+                if _tracing['owned']:
+                    tracemalloc.start()
+            _tracing['active'] += 1
+            traced = _tracing['owned']
+    if traced:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]['_peak'] = max(stack[-1].get('_peak', 0), peak)
+        tracemalloc.reset_peak()
+        record['_base'], record['_peak'] = current, current
+
+    before = _cache_counts()
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+        record['status'] = 'ok'
+    except BaseException:
+        record['status'] = 'error'
+        raise
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 6)
+        stack.pop()
+
+        record['peak_mb'] = None
+        if traced:
+            peak = max(record.pop('_peak'), tracemalloc.get_traced_memory()[1])
+            record['peak_mb'] = round((peak - record.pop('_base')) / 1e6, 3)
+            if stack:
+                stack[-1]['_peak'] = max(stack[-1].get('_peak', 0), peak)
+        if mode == 'full':
+            with _lock:
+                _tracing['active'] -= 1
+                if _tracing['active'] == 0 and _tracing['owned']:
+                    tracemalloc.stop()
+                    _tracing['owned'] = False
+
+        for cache, (hits, misses) in _cache_counts().items():
+            hits -= before.get(cache, (0, 0))[0]
+            misses -= before.get(cache, (0, 0))[1]
+            if hits or misses:
+                counts = record['caches'].setdefault(cache, {'hits': 0, 'misses': 0})
+                counts['hits'] += hits
+                counts['misses'] += misses
+        write_metric(record, path or METRICS_PATH)
+
+def instrumented(name):
+    """Decorator running the function as a stage; rows / columns default to its result's shape."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if record.get('rows') is None:
+                    record['rows'], record['columns'] = _shape(result)
+                return result
+        return wrapper
+    return decorator
+
+def load_metrics(path=None):
+    """
+    Reads the metrics log into a DataFrame, one row per stage record, with
+    the cache counts flattened to '<cache>_hits' / '<cache>_misses' /
+    '<cache>_hit_rate' columns. Empty if there is no log yet.
+    """
+    path = path or METRICS_PATH
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash is skipped
+                continue
+    if not records:
+        return pd.DataFrame()
+
+    df = pd.json_normalize(records, sep='_')
+    for col in [c for c in df.columns if c.startswith('caches_') and c.endswith('_hits')]:
+        prefix = col[:-len('_hits')]
+        hits, misses = df[col].fillna(0), df[prefix + '_misses'].fillna(0)
+        df[prefix + '_hit_rate'] = hits / (hits + misses).where(hits + misses > 0)
+    df.columns = [c[len('caches_'):] if c.startswith('caches_') else c for c in df.columns]
+    df['started'] = pd.to_datetime(df['started'], utc=True)
+    return df
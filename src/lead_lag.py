@@ -0,0 +1,238 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.impact_modeling import month_ordinal
+from src.instrumentation import instrumented
+from src.processed_store import load_enriched
+from src.task4_forecasting import add_year_column, national_series
+
+LEAD_LAG_PATH = 'data/processed/lead_lag.csv'
+# Default lag range per panel frequency (in periods)
+MAX_LAGS = {'annual': 3, 'monthly': 36}
+# Lagged correlations need at least this many overlapping points
+MIN_OBS = 4
+# Granger statistics are computed for this many of the strongest pairs
+N_GRANGER = 200
+# Complex cells per FFT batch (leaders x indicators x frequencies)
+BATCH_CELLS = 4_000_000
+
+def lead_lag_panel(df, freq='annual'):
+    """
+    Period x indicator panel of the national series.
+
+    'annual' holds the mean observation of each year. 'monthly' puts each
+    observation on its month and interpolates linearly between them (not
+    past an indicator's first or last observation), so indicators surveyed
+    in different months line up.
+    """
+    history = add_year_column(national_series(df))
+    history = history.dropna(subset=['value_numeric'])
+    codes = history['indicator_code'].astype(str)
+    if freq == 'annual':
+        periods = history['year']
+    elif freq == 'monthly':
+        periods = pd.Series(month_ordinal(history['observation_date']), index=history.index)
+    else:
+        raise ValueError(f"Unknown panel frequency: {freq}")
+
+    data = pd.DataFrame({'period': periods, 'indicator_code': codes, 'value': history['value_numeric']}).dropna()
+    panel = data.groupby(['period', 'indicator_code'])['value'].mean().unstack().sort_index(axis=1)
+    if panel.empty:
+        return panel
+    panel.index = panel.index.astype(int)
+    panel = panel.reindex(np.arange(panel.index.min(), panel.index.max() + 1))
+    if freq == 'monthly':
+        panel = panel.interpolate(limit_area='inside')
+    return panel
+
+def _standardize(values):
+    """Centers and scales each column over its observed points (FFT sums stay well conditioned)."""
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    return (values - mean) / np.where(std > 0, std, 1.0)
+
+def lagged_correlations(values, max_lag, min_obs=MIN_OBS, leaders=None):
+    """
+    Pearson correlation of every leader column at time t with every column
+    at time t + lag, for lags 0 .. max_lag, over the points where both are
+    observed.
+
+    The six sums behind each correlation (count, sums, sums of squares,
+    cross products) are cross-correlations of the zero-filled series and
+    their observation masks, computed for all pairs of a batch at once as
+    products of their FFTs.
+
+    Args:
+        values (np.ndarray): Periods x indicators, NaN where unobserved.
+        max_lag (int): Largest lag, in periods.
+        min_obs (int): Correlations over fewer points are NaN.
+        leaders (np.ndarray): Column positions used as leaders (default: all).
+
+    Returns:
+        tuple: (correlations, counts), both leaders x indicators x (max_lag + 1).
+    """
+    values = _standardize(np.asarray(values, dtype=float))
+    n_periods, n_cols = values.shape
+    leaders = np.arange(n_cols) if leaders is None else np.asarray(leaders)
+    observed = ~np.isnan(values)
+    filled = np.where(observed, values, 0.0)
+
+    # Zero padding to n_periods + max_lag keeps the lags of interest free of wrap-around
+    n_fft = 1 << int(np.ceil(np.log2(max(n_periods + max_lag, 2))))
+    spectra = [np.fft.rfft(a, n_fft, axis=0).T for a in (observed.astype(float), filled, filled ** 2)]
+    mask_f, value_f, square_f = spectra
+
+    correlations = np.full((len(leaders), n_cols, max_lag + 1), np.nan)
+    counts = np.zeros((len(leaders), n_cols, max_lag + 1), dtype=np.int64)
+    batch = max(BATCH_CELLS // max(n_cols * mask_f.shape[1], 1), 1)
+    for start in range(0, len(leaders), batch):
+        rows = leaders[start:start + batch]
+
+        def xcorr(lead, follow):
+            # sum_t lead[t] * follow[t + lag] for every (leader, indicator, lag)
+            return np.fft.irfft(np.conj(lead[rows])[:, None, :] * follow[None, :, :], n_fft, axis=2)[..., :max_lag + 1]
+
+        n = np.rint(xcorr(mask_f, mask_f))
+        sx, sy = xcorr(value_f, mask_f), xcorr(mask_f, value_f)
+        sxx, syy = xcorr(square_f, mask_f), xcorr(mask_f, square_f)
+        sxy = xcorr(value_f, value_f)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sxy - sx * sy / n
+            var_x = sxx - sx ** 2 / n
+            var_y = syy - sy ** 2 / n
+            r = cov / np.sqrt(var_x * var_y)
+        valid = (n >= min_obs) & (var_x > 1e-9 * n) & (var_y > 1e-9 * n)
+        correlations[start:start + len(rows)] = np.where(valid, np.clip(r, -1.0, 1.0), np.nan)
+        counts[start:start + len(rows)] = n.astype(np.int64)
+    return correlations, counts
+
+def granger_statistic(leader, follower, lag):
+    """
+    Granger-style F statistic for one pair: does the leader at t - lag add
+    to an AR(1) model of the follower at t? Compares the residual sums of
+    y_t ~ 1 + y_(t-1) and y_t ~ 1 + y_(t-1) + x_(t-lag).
+
+    Returns:
+        tuple: (F statistic, p-value, points used); NaNs below 5 points.
+    """
+    from scipy.stats import f as f_dist
+
+    n = len(follower)
+    start = max(lag, 1)
+    y, y_prev, x_lag = follower[start:], follower[start - 1:n - 1], leader[start - lag:n - lag]
+    keep = ~(np.isnan(y) | np.isnan(y_prev) | np.isnan(x_lag))
+    y, y_prev, x_lag = y[keep], y_prev[keep], x_lag[keep]
+    dof = len(y) - 3
+    if dof < 2:
+        return np.nan, np.nan, len(y)
+
+    ones = np.ones(len(y))
+    restricted = np.column_stack([ones, y_prev])
+    unrestricted = np.column_stack([ones, y_prev, x_lag])
+    rss_r = np.sum((y - restricted @ np.linalg.lstsq(restricted, y, rcond=None)[0]) ** 2)
+    rss_u = np.sum((y - unrestricted @ np.linalg.lstsq(unrestricted, y, rcond=None)[0]) ** 2)
+    # Exact fits (e.g. straight interpolated stretches) leave nothing to test
+    tiny = 1e-10 * max(np.sum((y - y.mean()) ** 2), 1e-300)
+    if rss_r <= tiny:
+        return 0.0, 1.0, len(y)
+    if rss_u <= tiny:
+        return np.inf, 0.0, len(y)
+    stat = max((rss_r - rss_u) / (rss_u / dof), 0.0)
+    return stat, float(f_dist.sf(stat, 1, dof)), len(y)
+
+@instrumented('lead_lag')
+def lead_lag_table(panel, max_lag, min_lag=1, min_obs=MIN_OBS, months_per_period=12, n_granger=N_GRANGER,
+                   diff=False):
+    """
+    Ranks ordered indicator pairs by their strongest lagged correlation.
+
+    For every (leader, follower) pair the lag in min_lag .. max_lag with
+    the largest absolute correlation is kept. Pairs are ranked by that
+    absolute correlation, and the n_granger strongest also get a
+    Granger-style F test at their lag.
+
+    Args:
+        panel (pd.DataFrame): Periods x indicators from lead_lag_panel().
+        max_lag, min_lag (int): Lag range, in periods.
+        min_obs (int): Fewest overlapping points for a correlation.
+        months_per_period (int): 12 for the annual panel, 1 for monthly.
+        n_granger (int): Pairs that get the F test.
+        diff (bool): Correlate period-on-period changes instead of levels
+            (trending levels correlate whatever their timing).
+
+    Returns:
+        pd.DataFrame: rank, leader, follower, lag, lag_months, correlation,
+        n_obs, granger_f, granger_p; strongest first.
+    """
+    columns = ['rank', 'leader', 'follower', 'lag', 'lag_months', 'correlation', 'n_obs', 'granger_f', 'granger_p']
+    if diff:
+        panel = panel.diff()
+    values = panel.to_numpy(dtype=float)
+    codes = np.asarray(panel.columns.astype(str))
+    if values.shape[1] < 2 or max_lag < min_lag:
+        return pd.DataFrame(columns=columns)
+
+    correlations, counts = lagged_correlations(values, max_lag, min_obs)
+    window = np.abs(correlations[:, :, min_lag:])
+    # A pair with no valid lag would make nanargmax raise
+    has_any = ~np.isnan(window).all(axis=2)
+    has_any[np.arange(len(codes)), np.arange(len(codes))] = False
+    best = np.nanargmax(np.where(has_any[..., None], window, 0.0), axis=2) + min_lag
+
+    lead_pos, follow_pos = np.nonzero(has_any)
+    lags = best[lead_pos, follow_pos]
+    table = pd.DataFrame({
+        'leader': codes[lead_pos],
+        'follower': codes[follow_pos],
+        'lag': lags,
+        'lag_months': lags * months_per_period,
+        'correlation': correlations[lead_pos, follow_pos, lags],
+        'n_obs': counts[lead_pos, follow_pos, lags],
+    })
+    table = (table.assign(strength=table['correlation'].abs())
+             .sort_values(['strength', 'n_obs'], ascending=False, kind='stable')
+             .drop(columns='strength').reset_index(drop=True))
+
+    top = table.head(n_granger)
+    position = {code: i for i, code in enumerate(codes)}
+    stats = [granger_statistic(values[:, position[lead]], values[:, position[follow]], lag)[:2]
+             for lead, follow, lag in zip(top['leader'], top['follower'], top['lag'])]
+    table['granger_f'] = np.nan
+    table['granger_p'] = np.nan
+    if stats:
+        table.loc[top.index, ['granger_f', 'granger_p']] = np.array(stats, dtype=float)
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table[columns]
+
+def run_lead_lag(freq='annual', max_lag=None, diff=False, output_path=LEAD_LAG_PATH):
+    """Builds the panel from the enriched store, ranks every pair and writes the table."""
+    df = load_enriched(columns=['record_type', 'indicator_code', 'observation_date', 'year', 'value_numeric',
+                                'gender', 'location'], record_types=['observation'])
+    panel = lead_lag_panel(df, freq)
+    max_lag = MAX_LAGS[freq] if max_lag is None else max_lag
+    table = lead_lag_table(panel, max_lag, months_per_period=12 if freq == 'annual' else 1, diff=diff)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    table.to_csv(output_path, index=False)
+    print(f"🔗 {len(table)} lead-lag pairs across {panel.shape[1]} indicators ({freq} panel, lags up to {max_lag})")
+    if not table.empty:
+        print(table.head(10).to_string(index=False))
+    print(f"Saved to {output_path}")
+    return table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank lagged cross-correlations between every pair of indicators.")
+    parser.add_argument('--freq', choices=list(MAX_LAGS), default='annual')
+    parser.add_argument('--max-lag', type=int, help="Largest lag in periods (default: 3 years or 36 months).")
+    parser.add_argument('--diff', action='store_true', help="Correlate period-on-period changes instead of levels.")
+    parser.add_argument('--output', default=LEAD_LAG_PATH)
+    args = parser.parse_args(argv)
+    run_lead_lag(args.freq, args.max_lag, args.diff, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list, linkage
+
+# Largest tile (per axis) sent to the browser; bigger pages are aggregated into blocks
+MAX_TILE = 60
+# Cell values are written on the heatmap only up to this many cells
+TEXT_MAX_CELLS = 400
+
+def top_k(matrix, k_events=None, k_indicators=None):
+    """
+    Positions of the k events and k indicators with the largest total
+    absolute impact (all of them when k is None), strongest first.
+
+    Args:
+        matrix (ImpactMatrix): Event-indicator matrix.
+        k_events, k_indicators (int): How many rows / columns to keep.
+
+    Returns:
+        tuple: (event positions, indicator positions) as np.ndarray.
+    """
+    magnitude = abs(matrix.matrix)
+    row_weight = np.asarray(magnitude.sum(axis=1)).ravel()
+    col_weight = np.asarray(magnitude.sum(axis=0)).ravel()
+    rows = np.argsort(-row_weight, kind='stable')[:k_events]
+    cols = np.argsort(-col_weight, kind='stable')[:k_indicators]
+    return rows, cols
+
+def cluster_order(values):
+    """
+    Leaf order of an average-linkage hierarchical clustering of the rows,
+    so events (or, transposed, indicators) with similar impact profiles
+    sit next to each other.
+    """
+    if values.shape[0] < 3:
+        return np.arange(values.shape[0])
+    return leaves_list(linkage(values, method='average', metric='euclidean'))
+
+def heatmap_layout(matrix, k_events=None, k_indicators=None, cluster=True):
+    """
+    Chooses and orders the rows and columns of the heatmap: the top-k
+    events and indicators, in clustering order if `cluster`, else by
+    impact. Only the k_events x k_indicators block is densified.
+
+    Returns:
+        tuple: (event positions, indicator positions) into `matrix`.
+    """
+    rows, cols = top_k(matrix, k_events, k_indicators)
+    if cluster and len(rows) and len(cols):
+        block = matrix.matrix[rows][:, cols].toarray()
+        rows, cols = rows[cluster_order(block)], cols[cluster_order(block.T)]
+    return rows, cols
+
+def _blocks(n, max_size):
+    """Start offsets of at most max_size near-equal blocks covering n positions."""
+    return np.unique(np.linspace(0, n, min(n, max_size) + 1).astype(np.int64)[:-1])
+
+def _block_labels(labels, starts):
+    ends = np.append(starts[1:], len(labels)) - 1
+    return [labels[s] if s == e else f"{labels[s]} … {labels[e]} ({e - s + 1})" for s, e in zip(starts, ends)]
+
+def _strongest(values, starts, axis):
+    """Per block of `starts` along `axis`: the value with the largest magnitude."""
+    high = np.maximum.reduceat(values, starts, axis=axis)
+    low = np.minimum.reduceat(values, starts, axis=axis)
+    return np.where(-low > high, low, high)
+
+def heatmap_tile(matrix, rows, cols, row_page=0, col_page=0, page_size=50, max_tile=MAX_TILE):
+    """
+    One page of the heatmap as a dense DataFrame, ready for px.imshow.
+
+    Pages larger than max_tile per axis (zoomed-out views) are aggregated
+    into max_tile blocks per axis; a block shows its strongest impact
+    (largest absolute value, sign kept), so isolated links stay visible.
+
+    Args:
+        matrix (ImpactMatrix): Event-indicator matrix.
+        rows, cols (np.ndarray): Ordered positions from heatmap_layout().
+        row_page, col_page (int): Page numbers along each axis.
+        page_size (int): Events / indicators per page.
+        max_tile (int): Largest number of cells sent per axis.
+
+    Returns:
+        pd.DataFrame: Events (or event ranges) x indicators (or ranges).
+    """
+    page_rows = rows[row_page * page_size:(row_page + 1) * page_size]
+    page_cols = cols[col_page * page_size:(col_page + 1) * page_size]
+    values = matrix.matrix[page_rows][:, page_cols].toarray()
+    row_labels = matrix.events[page_rows].astype(str)
+    col_labels = matrix.indicators[page_cols].astype(str)
+
+    if len(page_rows) > max_tile:
+        starts = _blocks(len(page_rows), max_tile)
+        values = _strongest(values, starts, axis=0)
+        row_labels = _block_labels(row_labels, starts)
+    if len(page_cols) > max_tile:
+        starts = _blocks(len(page_cols), max_tile)
+        values = _strongest(values, starts, axis=1)
+        col_labels = _block_labels(col_labels, starts)
+    return pd.DataFrame(values, index=pd.Index(row_labels, name='event'),
+                        columns=pd.Index(col_labels, name='indicator'))
+
+def n_pages(n, page_size):
+    """Number of pages of page_size covering n rows (at least one)."""
+    return max(int(np.ceil(n / page_size)), 1)
@@ -0,0 +1,286 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.generate_matrix import prepare_impact_links
+from src.impact_modeling import month_ordinal
+from src.shock_index import SCENARIO_MULTIPLIERS
+from src.task4_forecasting import (SCENARIO_ADJUSTMENTS, add_year_column, fit_trend_batch,
+                                   load_data, national_series)
+
+# Relative spread (sd / |magnitude|) of an impact link by its confidence
+CONFIDENCE_SPREAD = {'high': 0.10, 'medium': 0.25, 'low': 0.50}
+
+# Spread (sd, months) of the lag timing by confidence
+LAG_SPREAD_MONTHS = {'high': 1.0, 'medium': 3.0, 'low': 6.0}
+
+# Lognormal spread of the scenario multipliers (1.2 / 0.5 are judgement calls)
+MULTIPLIER_SPREAD = 0.10
+
+# Residual SE assumed for series too short to estimate one (matches the 2.0pp CI fallback)
+FALLBACK_RSE = 2.0 / 1.96
+
+def build_simulation_model(df, future_years, scenarios):
+    """
+    Collects everything a batch of draws needs into a dict of NumPy arrays,
+    so it can be shipped to worker processes cheaply.
+
+    Trend uncertainty uses the OLS sampling distribution of the level at the
+    mean year and of the slope (independent in that parametrisation). Impact
+    links contribute their magnitude and lag timing; the link is applied from
+    the year of event date + lag, inside the forecast horizon only.
+    """
+    history = national_series(add_year_column(df))
+    fit = fit_trend_batch(history, future_years)
+    fitted = ~np.isnan(fit['slope'])
+    indicators = pd.Index(fit['series'][fitted])
+
+    n = fit['n_obs'][fitted].astype(float)
+    sxx = fit['sxx'][fitted]
+    # Unbiased residual SE, recovered from the slope SE
+    s = fit['slope_se'][fitted] * np.sqrt(sxx)
+    s = np.where(np.isnan(s), FALLBACK_RSE, s)
+
+    slope = fit['slope'][fitted]
+    x_mean = fit['x_mean'][fitted]
+
+    links = prepare_impact_links(df)
+    links = links[links['indicator_code'].isin(indicators) & links['event_date'].notna()]
+    magnitude = links['impact_magnitude'].to_numpy(dtype=float)
+    confidence = links['confidence'].str.lower()
+
+    # Decimal fractions are percentage points / 100 (see to_percentage_points)
+    scale = np.where((np.abs(magnitude) < 1.0) & (np.abs(magnitude) > 0.0001), 100.0, 1.0)
+
+    # Targets apply to their own year only; targets outside the horizon are not scored
+    target_rows = add_year_column(df[df['record_type'] == 'target'])
+    target_rows = target_rows.dropna(subset=['indicator_code', 'year', 'value_numeric'])
+    target_rows = target_rows[target_rows['indicator_code'].isin(indicators)
+                              & target_rows['year'].isin(future_years)]
+    targets = np.full((len(indicators), len(future_years)), np.nan)
+    targets[indicators.get_indexer(target_rows['indicator_code']),
+            pd.Index(future_years).get_indexer(target_rows['year'].astype(int))] = \
+        target_rows['value_numeric'].to_numpy(dtype=float)
+
+    return {
+        'indicators': indicators.to_numpy(),
+        'scenarios': np.asarray(scenarios),
+        'years': np.asarray(future_years, dtype=int),
+        'level_mean': fit['intercept'][fitted] + slope * x_mean,
+        'level_se': s / np.sqrt(n),
+        'slope': slope,
+        'slope_se': s / np.sqrt(sxx),
+        'x_mean': x_mean,
+        'link_col': indicators.get_indexer(links['indicator_code']),
+        'link_magnitude': magnitude * scale,
+        'link_sd': np.abs(magnitude * scale) * confidence.map(CONFIDENCE_SPREAD).fillna(0.25).to_numpy(),
+        'link_month': np.asarray(month_ordinal(links['event_date']), dtype=float),
+        'link_lag': links['lag_months'].to_numpy(dtype=float),
+        'link_lag_sd': confidence.map(LAG_SPREAD_MONTHS).fillna(3.0).to_numpy(),
+        'multipliers': np.array([SCENARIO_MULTIPLIERS.get(sc, 1.0) for sc in scenarios]),
+        'adjustments': np.array([SCENARIO_ADJUSTMENTS.get(sc, 0.0) for sc in scenarios]),
+        'targets': targets,
+    }
+
+def draw_batch(model, rng, n_draws):
+    """
+    Draws n_draws joint samples of every scenario x indicator x year forecast.
+
+    Returns:
+        np.ndarray: Shape (n_draws, scenarios, indicators, years).
+    """
+    years = model['years']
+    n_ind = len(model['indicators'])
+    n_links = len(model['link_col'])
+
+    # 1. Trend parameters
+    level = model['level_mean'] + model['level_se'] * rng.standard_normal((n_draws, n_ind))
+    slope = model['slope'] + model['slope_se'] * rng.standard_normal((n_draws, n_ind))
+    trend = level[:, :, None] + slope[:, :, None] * (years[None, None, :] - model['x_mean'][None, :, None])
+
+    # 2. Impact magnitudes and 3. lag timings
+    magnitude = model['link_magnitude'] + model['link_sd'] * rng.standard_normal((n_draws, n_links))
+    lag = np.maximum(model['link_lag'] + model['link_lag_sd'] * rng.standard_normal((n_draws, n_links)), 0.0)
+    effect_year = np.floor((model['link_month'] + np.round(lag)) / 12)
+
+    # Carry-over: a link counts from its effect year onwards, within the horizon. Each
+    # link is added once to (draw, indicator, first active year), then summed over years,
+    # so memory grows with draws x links, not draws x links x years
+    onset = np.searchsorted(years, effect_year)
+    inside = (effect_year >= years[0]) & (onset < len(years))
+    draw = np.broadcast_to(np.arange(n_draws)[:, None], onset.shape)
+    col = np.broadcast_to(model['link_col'][None, :], onset.shape)
+    cell = (draw[inside] * n_ind + col[inside]) * len(years) + onset[inside]
+    shock = np.bincount(cell, weights=magnitude[inside], minlength=n_draws * n_ind * len(years))
+    shock = np.cumsum(shock.reshape(n_draws, n_ind, len(years)), axis=2)
+
+    multiplier = model['multipliers'][None, :] * np.exp(
+        MULTIPLIER_SPREAD * rng.standard_normal((n_draws, len(model['multipliers']))) - 0.5 * MULTIPLIER_SPREAD ** 2)
+    adjustment = model['adjustments'][:, None] * np.arange(1, len(years) + 1)[None, :]
+
+    return (trend[:, None] + multiplier[:, :, None, None] * shock[:, None]
+            + adjustment[None, :, None, :])
+
+def empty_accumulator(shape, n_bins):
+    """Streaming statistics per cell: count, mean/M2 (Chan et al.), histogram and exceedances."""
+    return {
+        'count': 0,
+        'mean': np.zeros(shape),
+        'm2': np.zeros(shape),
+        'hist': np.zeros(shape + (n_bins + 2,), dtype=np.int64),
+        'exceed': np.zeros(shape, dtype=np.int64),
+    }
+
+def accumulate(acc, values, lo, width, targets):
+    """Folds a (draws, *cells) batch into the accumulator in place."""
+    n = values.shape[0]
+    n_bins = acc['hist'].shape[-1] - 2
+
+    batch_mean = values.mean(axis=0)
+    batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+    total = acc['count'] + n
+    delta = batch_mean - acc['mean']
+    acc['m2'] += batch_m2 + delta ** 2 * acc['count'] * n / total
+    acc['mean'] += delta * n / total
+    acc['count'] = total
+
+    # Bin 0 / n_bins + 1 collect under- and overflow
+    bins = np.clip(np.floor((values - lo) / width).astype(np.int64) + 1, 0, n_bins + 1)
+    n_cells = lo.size
+    flat = np.arange(n_cells).reshape(lo.shape) * (n_bins + 2) + bins
+    acc['hist'] += np.bincount(flat.ravel(), minlength=n_cells * (n_bins + 2)).reshape(acc['hist'].shape)
+
+    acc['exceed'] += (values >= targets).sum(axis=0)
+    return acc
+
+def merge_accumulators(a, b):
+    """Combines two accumulators (e.g. from different worker batches)."""
+    if a['count'] == 0:
+        return b
+    total = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    return {
+        'count': total,
+        'mean': a['mean'] + delta * b['count'] / total,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / total,
+        'hist': a['hist'] + b['hist'],
+        'exceed': a['exceed'] + b['exceed'],
+    }
+
+def histogram_quantiles(hist, lo, width, quantiles):
+    """
+    Interpolates quantiles from the per-cell histograms.
+
+    Returns:
+        np.ndarray: Shape (len(quantiles), *cells). Quantiles that fall in the
+        under/overflow bins are clamped to the histogram range.
+    """
+    n_bins = hist.shape[-1] - 2
+    cum = np.cumsum(hist, axis=-1)
+    total = cum[..., -1:]
+    out = []
+    for q in quantiles:
+        rank = q * total
+        idx = np.argmax(cum >= rank, axis=-1)[..., None]
+        before = np.take_along_axis(cum, idx, axis=-1) - np.take_along_axis(hist, idx, axis=-1)
+        in_bin = np.maximum(np.take_along_axis(hist, idx, axis=-1), 1)
+        frac = np.clip((rank - before) / in_bin, 0.0, 1.0)
+        pos = np.clip(idx - 1 + frac, 0, n_bins)[..., 0]
+        out.append(lo + pos * width)
+    return np.stack(out)
+
+def _simulate_batch(model, seed, n_draws, lo, width, n_bins):
+    """Worker task: one vectorized batch of draws folded into a fresh accumulator."""
+    rng = np.random.default_rng(seed)
+    values = draw_batch(model, rng, n_draws)
+    targets = np.broadcast_to(model['targets'][None], values.shape[1:])
+    return accumulate(empty_accumulator(values.shape[1:], n_bins), values, lo, width, targets)
+
+def simulate_scenarios(df, future_years=(2025, 2026, 2027), scenarios=('Base', 'Optimistic', 'Pessimistic'),
+                       n_draws=20000, batch_size=2000, workers=None, seed=42,
+                       quantiles=(0.025, 0.5, 0.975), n_bins=1024):
+    """
+    Monte Carlo forecast over trend-parameter, impact-magnitude and lag uncertainty.
+
+    Draws are generated in vectorized batches with seeds spawned from `seed`,
+    so results do not depend on the number of workers. Each batch is reduced
+    to fixed-size streaming statistics before it is returned, so memory stays
+    flat whatever `n_draws` is.
+
+    Args:
+        df (pd.DataFrame): Enriched unified dataset.
+        n_draws (int): Total number of joint samples.
+        batch_size (int): Draws per vectorized batch / worker task.
+        workers (int): Process pool size; 1 runs in the current process.
+        seed (int): Root seed for np.random.SeedSequence.
+        quantiles (tuple): Quantiles to report.
+        n_bins (int): Histogram resolution per cell for the quantile estimates.
+
+    Returns:
+        pd.DataFrame: One row per Scenario x Indicator x Year with Mean, Std,
+        the requested quantiles, the NFIS-II Target for that year and
+        P(value >= Target) (both NaN where no target falls in that year).
+    """
+    model = build_simulation_model(df, list(future_years), list(scenarios))
+
+    n_batches = int(np.ceil(n_draws / batch_size))
+    sizes = [batch_size] * n_batches
+    sizes[-1] = n_draws - batch_size * (n_batches - 1)
+    pilot_seed, *batch_seeds = np.random.SeedSequence(seed).spawn(n_batches + 1)
+
+    # A pilot batch (not counted) fixes the histogram range of each cell
+    pilot = draw_batch(model, np.random.default_rng(pilot_seed), min(batch_size, 2000))
+    lo, hi = pilot.min(axis=0), pilot.max(axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    lo = lo - 0.5 * span
+    width = 2.0 * span / n_bins
+
+    args = ([model] * n_batches, batch_seeds, sizes, [lo] * n_batches, [width] * n_batches, [n_bins] * n_batches)
+    workers = workers or os.cpu_count() or 1
+    acc = empty_accumulator(lo.shape, n_bins)
+    if workers <= 1 or n_batches == 1:
+        for part in map(_simulate_batch, *args):
+            acc = merge_accumulators(acc, part)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, n_batches)) as pool:
+            for part in pool.map(_simulate_batch, *args):
+                acc = merge_accumulators(acc, part)
+
+    q_values = histogram_quantiles(acc['hist'], lo, width, quantiles)
+    n_sc, n_ind, n_years = lo.shape
+    grid = pd.MultiIndex.from_product(
+        [model['scenarios'], model['indicators'], model['years']], names=['Scenario', 'Indicator', 'Year'])
+
+    results = pd.DataFrame({
+        'Mean': acc['mean'].ravel(),
+        'Std': np.sqrt(acc['m2'] / max(acc['count'] - 1, 1)).ravel(),
+    }, index=grid)
+    for q, values in zip(quantiles, q_values):
+        results[f"Q{q * 100:g}"] = values.ravel()
+
+    targets = np.broadcast_to(model['targets'][None], lo.shape)
+    results['Target'] = targets.ravel()
+    results['Prob_Target'] = np.where(np.isnan(targets), np.nan, acc['exceed'] / acc['count']).ravel()
+    return results.reset_index()
+
+def run_monte_carlo(n_draws=20000, workers=None, seed=42):
+    print(f"--- Starting Monte Carlo Forecasting ({n_draws} draws) ---")
+
+    try:
+        df, _ = load_data()
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    results_df = simulate_scenarios(df, n_draws=n_draws, workers=workers, seed=seed)
+    print(results_df[results_df['Indicator'] == 'ACC_OWNERSHIP'].round(2))
+
+    output_path = 'data/processed/forecasting_simulation.csv'
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    results_df.to_csv(output_path, index=False)
+    print(f"\nSaved to {output_path}")
+
+if __name__ == "__main__":
+    run_monte_carlo()
@@ -0,0 +1,208 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.signal import fftconvolve
+
+from src.impact_matrix import DEFAULT_EFFECT_TYPE, DEFAULT_ROLLOUT_MONTHS, MATRIX_NPZ, ImpactMatrix
+from src.impact_modeling import lag_kernel, month_ordinal
+from src.instrumentation import instrumented
+from src.shock_index import SCENARIO_MULTIPLIERS, to_percentage_points
+from src.task4_forecasting import (MODEL_CACHE, MODELS, SCENARIO_ADJUSTMENTS, add_year_column,
+                                   fit_national_baselines, load_data, national_series)
+
+# Findex rounds are fielded towards the end of the year
+DEFAULT_SURVEY_MONTH = 12
+
+def survey_months(df, indicators):
+    """
+    Month of year each indicator is usually measured in (the most common
+    observation month of its national series), so annual values can be
+    read off the monthly trajectory at the survey date.
+    """
+    history = national_series(df)
+    dates = pd.to_datetime(history['observation_date'], format='mixed', errors='coerce')
+    months = pd.DataFrame({'indicator_code': history['indicator_code'].astype(object), 'month': dates.dt.month})
+    mode = months.dropna().groupby('indicator_code')['month'].agg(lambda m: m.value_counts().idxmax())
+    return mode.reindex(indicators).fillna(DEFAULT_SURVEY_MONTH).to_numpy(dtype=int)
+
+def link_impulses(matrix, indicators, first_month, n_months, rows=None):
+    """
+    Step 1: places impact links on a monthly axis at their event month plus
+    lag_months, summing magnitudes (in percentage points) per month and
+    indicator.
+
+    Args:
+        matrix (ImpactMatrix): Sparse matrix with per-link metadata.
+        indicators (pd.Index): Output columns; links to other indicators are dropped.
+        first_month (int): month_ordinal of the first month of the axis.
+        n_months (int): Axis length.
+        rows (np.ndarray): Positions in matrix.links to use (all links by default).
+
+    Returns:
+        np.ndarray: months x indicators impulses.
+    """
+    impulses = np.zeros((n_months, len(indicators)))
+    links = matrix.links if rows is None else matrix.links.iloc[rows]
+    if matrix.empty or links.empty:
+        return impulses
+
+    event_months = np.asarray(month_ordinal(matrix.event_dates), dtype=float)
+    start = event_months[links['event'].to_numpy()] + links['lag_months'].fillna(0).to_numpy()
+    cols = indicators.get_indexer(matrix.indicators[links['indicator'].to_numpy()])
+
+    keep = ~np.isnan(start) & (cols >= 0)
+    rows = start[keep].astype(int) - first_month
+    keep_rows = (rows >= 0) & (rows < n_months)
+    np.add.at(impulses, (rows[keep_rows], cols[keep][keep_rows]),
+              to_percentage_points(links['impact_magnitude'].to_numpy()[keep][keep_rows]))
+    return impulses
+
+def rollout(impulses, effect_type=DEFAULT_EFFECT_TYPE, rollout_months=DEFAULT_ROLLOUT_MONTHS):
+    """
+    Step 2: spreads each impulse over its rollout curve, for all indicators
+    at once (FFT convolution along the month axis).
+
+    Returns:
+        np.ndarray: months x indicators incremental impact.
+    """
+    kernel = lag_kernel(effect_type, int(rollout_months))
+    if not impulses.size:
+        return impulses
+    return fftconvolve(impulses, kernel[:, None], axes=0)[:len(impulses)]
+
+@instrumented('lag_curves')
+def rollout_increments(matrix, indicators, first_month, n_months, effect_type=None, rollout_months=None):
+    """
+    Incremental impact of all links, convolving each group of links that
+    share a rollout curve (per-link 'effect_type' / 'rollout_months', unless
+    overridden) in one pass.
+    """
+    increments = np.zeros((n_months, len(indicators)))
+    if matrix.empty or matrix.links.empty:
+        return increments
+
+    curves = pd.DataFrame({
+        'effect_type': effect_type or matrix.links['effect_type'].to_numpy(),
+        'rollout_months': rollout_months or matrix.links['rollout_months'].to_numpy(),
+    }, index=np.arange(len(matrix.links)))
+    for (effect, months), rows in curves.groupby(['effect_type', 'rollout_months']).indices.items():
+        impulses = link_impulses(matrix, indicators, first_month, n_months, rows)
+        increments += rollout(impulses, effect, months)
+    return increments
+
+def monthly_forecast(df, matrix, future_years, scenarios=('Base', 'Optimistic', 'Pessimistic'),
+                     effect_type=None, rollout_months=None, models=None, selection='aic',
+                     cache_path=MODEL_CACHE):
+    """
+    Monthly trend + lagged, rolled-out event shocks for every indicator.
+
+    The trend is the annual national fit (the model chosen per indicator
+    as in forecast_scenarios) interpolated monthly, anchored so it equals
+    the annual projection in each indicator's survey month. Event
+    impacts start at event date + lag_months and build up along the rollout
+    kernel; only increments from the first forecast month on are added,
+    since earlier ones are already in the observed history.
+
+    Args:
+        df (pd.DataFrame): Enriched records.
+        matrix (ImpactMatrix): Sparse event-indicator matrix with link metadata.
+        future_years (list): Consecutive forecast years.
+        scenarios (tuple): Scenario names (SCENARIO_MULTIPLIERS / SCENARIO_ADJUSTMENTS).
+        effect_type (str): Rollout curve ('linear', 'sigmoid' or 'decay') for
+            all links; by default each link's own (calibrated) curve is used.
+        rollout_months (int): Rollout length after the lag, likewise.
+        models (list): Trend candidates (all of MODELS by default).
+        selection (str): 'aic' or 'backtest' (see select_model).
+        cache_path (str): Model fit cache; None disables it.
+
+    Returns:
+        tuple: (monthly DataFrame with 'Scenario', 'Indicator', 'Month',
+        'Predicted_Value', 'Lower_CI', 'Upper_CI'; survey-aligned annual
+        DataFrame with 'Year' instead of 'Month').
+    """
+    future_years = list(future_years)
+    df = add_year_column(df)
+    # The year before the horizon anchors the months ahead of the first survey month
+    baselines = fit_national_baselines(df, [future_years[0] - 1] + future_years, models=list(models or MODELS),
+                                       selection=selection, cache_path=cache_path)
+    indicators = pd.Index(baselines['indicators'])
+    survey_month = survey_months(df, indicators)
+
+    # Monthly axis over the horizon, plus a run-in so rollouts that started
+    # before the horizon contribute their remaining increments
+    origin = future_years[0] * 12
+    n_horizon = len(future_years) * 12
+    run_in = int(rollout_months or (matrix.links['rollout_months'].max() if len(matrix.links) else 0))
+    months = np.arange(origin, origin + n_horizon)
+
+    increments = rollout_increments(matrix, indicators, origin - run_in, run_in + n_horizon,
+                                    effect_type, rollout_months)
+    shock_level = np.cumsum(increments[run_in:], axis=0)
+
+    # Trend in fractional years, equal to the annual fit at each survey month and
+    # linear between them (the last year's step continues past the final survey)
+    t = (months // 12)[:, None] + ((months % 12)[:, None] + 1 - survey_month[None, :]) / 12.0
+    offset = t - (future_years[0] - 1)
+    step = np.clip(np.floor(offset).astype(int), 0, len(future_years) - 1)
+    cols = np.arange(len(indicators))[None, :]
+    annual_pred = baselines['base_pred'].T
+    lower, upper = annual_pred[step, cols], annual_pred[step + 1, cols]
+    trend = lower + (upper - lower) * (offset - step)
+    ramp = (np.arange(n_horizon) + 1)[:, None] / 12.0
+
+    # Row of each (year, indicator) survey month on the horizon axis
+    survey_rows = (np.arange(len(future_years)) * 12)[:, None] + survey_month[None, :] - 1
+
+    ci_95 = baselines['ci_95'][None, :]
+    month_starts = pd.to_datetime({'year': months // 12, 'month': months % 12 + 1, 'day': 1})
+    monthly, annual = [], []
+    for sc in scenarios:
+        pred = (trend + shock_level * SCENARIO_MULTIPLIERS.get(sc, 1.0)
+                + ramp * SCENARIO_ADJUSTMENTS.get(sc, 0.0))
+        monthly.append(pd.DataFrame({
+            'Scenario': sc,
+            'Indicator': np.tile(np.asarray(indicators), n_horizon),
+            'Month': np.repeat(month_starts.to_numpy(), len(indicators)),
+            'Predicted_Value': pred.ravel().round(2),
+            'Lower_CI': (pred - ci_95).ravel().round(2),
+            'Upper_CI': (pred + ci_95).ravel().round(2),
+        }))
+
+        at_survey = pred[survey_rows, cols].T
+        annual.append(pd.DataFrame({
+            'Scenario': sc,
+            'Indicator': np.repeat(np.asarray(indicators), len(future_years)),
+            'Year': np.tile(future_years, len(indicators)),
+            'Predicted_Value': at_survey.ravel().round(2),
+            'Lower_CI': (at_survey - ci_95.T).ravel().round(2),
+            'Upper_CI': (at_survey + ci_95.T).ravel().round(2),
+        }))
+
+    return pd.concat(monthly, ignore_index=True), pd.concat(annual, ignore_index=True)
+
+def run_monthly_forecast(matrix_path=MATRIX_NPZ):
+    print("--- Starting Monthly Forecasting (Trend + Lagged Shocks) ---")
+
+    try:
+        df, matrix = load_data()
+    except FileNotFoundError as e:
+        print(e)
+        return
+    if matrix_path != MATRIX_NPZ:
+        print(f"Using event matrix {matrix_path}")
+        matrix = ImpactMatrix.load(matrix_path)
+
+    monthly_df, annual_df = monthly_forecast(df, matrix, [2025, 2026, 2027])
+
+    print("\n--- Survey-aligned annual values (2025-2027) ---")
+    print(annual_df[annual_df['Indicator'] == 'ACC_OWNERSHIP'])
+
+    os.makedirs('data/processed', exist_ok=True)
+    monthly_df.to_csv('data/processed/forecasting_monthly.csv', index=False)
+    annual_df.to_csv('data/processed/forecasting_monthly_annual.csv', index=False)
+    print(f"\nSaved {len(monthly_df)} monthly rows to data/processed/forecasting_monthly.csv")
+    print("Saved survey-aligned annual values to data/processed/forecasting_monthly_annual.csv")
+
+if __name__ == "__main__":
+    run_monthly_forecast()
@@ -0,0 +1,239 @@
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src.impact_matrix import MATRIX_CSV, MATRIX_NPZ
+from src.ingest_cache import path_fingerprint
+from src.instrumentation import new_run, stage as metrics_stage
+from src.processed_store import ENRICHED_CSV, STORE_PATH as ENRICHED_STORE
+
+STATE_PATH = 'data/processed/.pipeline_state.json'
+
+class Stage:
+    """
+    One pipeline step: a function ('module:function') with declared input
+    files, output files, upstream stages and keyword parameters.
+    """
+
+    def __init__(self, name, func, inputs, outputs, deps=(), params=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.params = params or {}
+
+    def sources(self):
+        """Source files of the stage function's src module and of the src modules it imports."""
+        module = self.func.split(':')[0]
+        return module_sources(module) if module.startswith('src.') else []
+
+    def fingerprint(self):
+        """Hash of the stage definition, its parameters and the content of every input and source file."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([self.name, self.func, self.params], sort_keys=True).encode())
+        for path in sorted(self.inputs + self.sources()):
+            digest.update(path.encode())
+            digest.update(path_fingerprint(path).encode())
+        return digest.hexdigest()
+
+    def outputs_exist(self):
+        return all(os.path.exists(path) for path in self.outputs)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def module_sources(*modules):
+    """
+    Source files of the given src modules and of every src module they
+    import, directly or not (e.g. 'src.task4_forecasting' includes
+    src/result_store.py), so editing any of them re-runs the stage.
+    This module is left out: its stage definitions are already part of
+    each Stage.fingerprint().
+    """
+    seen = {'pipeline'}
+    todo = [m.split('.')[-1] for m in modules]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        with open(os.path.join(SRC_DIR, f'{name}.py')) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith('src.'):
+                todo.append(node.module.split('.')[1])
+            elif isinstance(node, ast.Import):
+                todo.extend(alias.name.split('.')[1] for alias in node.names if alias.name.startswith('src.'))
+    return [f'src/{name}.py' for name in sorted(seen - {'pipeline'})]
+
+# The dashboard only reads these artifacts, so it is not a batch stage
+PIPELINE = [
+    Stage('enrich', 'src.task1_enrichment:run_enrichment',
+          inputs=['data/raw/ethiopia_fi_unified_data.xlsx'],
+          outputs=[ENRICHED_CSV, ENRICHED_STORE]),
+    Stage('matrix', 'src.generate_matrix:generate_matrix',
+          inputs=[ENRICHED_STORE],
+          outputs=[MATRIX_NPZ, MATRIX_CSV], deps=['enrich']),
+    Stage('eda', 'src.eda_deep_dive:main',
+          inputs=[ENRICHED_STORE],
+          outputs=['reports/figures/dual_axis_4g_adoption.png'], deps=['enrich']),
+    Stage('charts', 'src.chart_pack:render_chart_pack',
+          inputs=[ENRICHED_STORE],
+          outputs=['reports/figures/pairs/_manifest.json'], deps=['enrich']),
+    Stage('lead_lag', 'src.lead_lag:run_lead_lag',
+          inputs=[ENRICHED_STORE],
+          outputs=['data/processed/lead_lag.csv'], deps=['enrich']),
+    Stage('forecast', 'src.task4_forecasting:run_forecasting_scenarios',
+          inputs=[ENRICHED_STORE, MATRIX_NPZ],
+          outputs=['data/processed/forecasting_results.csv'], deps=['matrix']),
+    Stage('forecast_monthly', 'src.monthly_forecast:run_monthly_forecast',
+          inputs=[ENRICHED_STORE, MATRIX_NPZ],
+          outputs=['data/processed/forecasting_monthly.csv', 'data/processed/forecasting_monthly_annual.csv'],
+          deps=['matrix']),
+    Stage('forecast_hierarchical', 'src.hierarchical_forecast:run_hierarchical_forecast',
+          inputs=[ENRICHED_STORE, MATRIX_NPZ],
+          outputs=['data/processed/forecasting_hierarchical.csv'], deps=['matrix']),
+    Stage('backtest', 'src.backtest:run_backtesting',
+          inputs=[ENRICHED_STORE, MATRIX_NPZ],
+          outputs=['data/processed/backtest_results.csv'], deps=['matrix']),
+    Stage('calibrate', 'src.calibration:run_calibration',
+          inputs=[ENRICHED_STORE, MATRIX_NPZ],
+          outputs=['data/processed/event_indicator_matrix_calibrated.npz', 'data/processed/calibration_report.csv'],
+          deps=['matrix']),
+    Stage('simulate', 'src.monte_carlo:run_monte_carlo',
+          inputs=[ENRICHED_STORE],
+          outputs=['data/processed/forecasting_simulation.csv'], deps=['enrich'],
+          params={'n_draws': 20000, 'seed': 42}),
+]
+
+def _run_stage(name, func, params):
+    """Worker task: imports and calls the stage function, returning its wall time."""
+    module_name, func_name = func.split(':')
+    start = time.perf_counter()
+    func = getattr(importlib.import_module(module_name), func_name)
+    # Imports stay outside the measured stage; tracing them dominates its cost
+    with metrics_stage(f'pipeline.{name}'):
+        func(**params)
+    return time.perf_counter() - start
+
+def load_state(state_path=STATE_PATH):
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+def save_state(state, state_path=STATE_PATH):
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+def select_stages(stages, targets=None):
+    """Returns the requested stages plus everything upstream of them, in declaration order."""
+    by_name = {stage.name: stage for stage in stages}
+    if not targets:
+        return list(stages)
+
+    wanted = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in by_name:
+            raise ValueError(f"Unknown stage: {name}")
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in wanted]
+
+def run_pipeline(stages=PIPELINE, targets=None, force=False, jobs=None, state_path=STATE_PATH):
+    """
+    Runs the pipeline incrementally.
+
+    A stage becomes ready once all its upstream stages have finished; its
+    fingerprint is then computed from the (now final) inputs. Stages whose
+    fingerprint matches the last successful run and whose outputs exist are
+    skipped. Ready stages run concurrently in a process pool.
+
+    Returns:
+        list: One dict per stage with 'stage', 'status' ('ran', 'skipped',
+        'failed' or 'blocked') and 'seconds'.
+    """
+    selected = select_stages(stages, targets)
+    state = load_state(state_path)
+    # Every stage's metrics carry this run's id
+    new_run()
+    report = {}
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while len(report) < len(selected):
+            for stage in selected:
+                if stage.name in report or stage.name in running.values():
+                    continue
+                dep_status = [report.get(dep, {}).get('status') for dep in stage.deps if dep in {s.name for s in selected}]
+                if any(status in ('failed', 'blocked') for status in dep_status):
+                    report[stage.name] = {'stage': stage.name, 'status': 'blocked', 'seconds': 0.0}
+                    continue
+                if any(status is None for status in dep_status):
+                    continue
+
+                fingerprint = stage.fingerprint()
+                if not force and state.get(stage.name) == fingerprint and stage.outputs_exist():
+                    report[stage.name] = {'stage': stage.name, 'status': 'skipped', 'seconds': 0.0}
+                    continue
+
+                print(f"▶ Running stage '{stage.name}'")
+                future = pool.submit(_run_stage, stage.name, stage.func, stage.params)
+                future.fingerprint = fingerprint
+                running[future] = stage.name
+
+            if not running:
+                continue
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                stage = next(s for s in selected if s.name == name)
+                try:
+                    seconds = future.result()
+                    ok = stage.outputs_exist()
+                except Exception as e:
+                    print(f"❌ Stage '{name}' raised: {e}")
+                    seconds, ok = 0.0, False
+
+                if ok:
+                    # Record the fingerprint only after a successful run
+                    state[name] = future.fingerprint
+                    save_state(state, state_path)
+                    report[name] = {'stage': name, 'status': 'ran', 'seconds': round(seconds, 3)}
+                else:
+                    state.pop(name, None)
+                    report[name] = {'stage': name, 'status': 'failed', 'seconds': round(seconds, 3)}
+
+    return [report[stage.name] for stage in selected]
+
+def print_report(report):
+    print("\n--- Pipeline Stage Breakdown ---")
+    for row in report:
+        print(f"{row['stage']:<22} {row['status']:<8} {row['seconds']:>8.2f}s")
+    print(f"{'total':<22} {'':<8} {sum(row['seconds'] for row in report):>8.2f}s (stage time)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the forecasting pipeline incrementally.")
+    parser.add_argument('stages', nargs='*', help="Stages to bring up to date (default: all).")
+    parser.add_argument('--force', action='store_true', help="Re-run stages even if unchanged.")
+    parser.add_argument('--jobs', type=int, default=None, help="Maximum concurrent stages.")
+    args = parser.parse_args(argv)
+
+    report = run_pipeline(targets=args.stages, force=args.force, jobs=args.jobs)
+    print_report(report)
+    return 0 if all(row['status'] in ('ran', 'skipped') for row in report) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,387 @@
+import json
+import operator
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+ENRICHED_CSV = 'data/processed/ethiopia_fi_enriched.csv'
+STORE_PATH = 'data/processed/enriched_parquet'
+MANIFEST_FILE = '_manifest.json'
+
+# Arrow schema of the whole store, widened when appended records bring new columns
+SCHEMA_FILE = '_common_metadata'
+
+# Hashes of the record keys already in the store, one sorted .npy segment per
+# batch ('_' prefix keeps the directory out of the Parquet dataset)
+INDEX_DIR = '_dedup_index'
+
+# A record is the same record if these match: record_id (when the record has
+# one) tells apart events of one date, related_indicator the impact links of
+# one event, and gender / location / region the disaggregated observations
+# of one indicator and date. Changing the list rebuilds the stores' indexes
+KEY_COLUMNS = ['record_type', 'record_id', 'parent_id', 'indicator_code', 'related_indicator',
+               'observation_date', 'gender', 'location', 'region']
+
+# Index segments are merged into one once there are more than this many
+MAX_INDEX_SEGMENTS = 16
+
+# Low-cardinality code columns stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = [
+    'category', 'pillar', 'indicator_code', 'indicator_direction', 'value_type', 'unit',
+    'gender', 'location', 'region', 'source_type', 'confidence', 'related_indicator',
+    'relationship_type', 'impact_direction', 'evidence_basis',
+]
+
+NUMERIC_COLUMNS = ['value_numeric', 'impact_magnitude', 'impact_estimate', 'lag_months']
+
+DATE_COLUMNS = ['observation_date', 'period_start', 'period_end']
+
+# Filter operators supported by the CSV fallback (same tuples as pyarrow filters)
+FILTER_OPS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge, 'in': lambda s, v: s.isin(v),
+}
+
+def _as_text(series):
+    """Mixed object columns (dates, numbers, strings) are stored as strings."""
+    if series.isna().all():
+        return pd.Series(pd.NA, index=series.index, dtype='string')
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Records read back from the store (e.g. carried over into a rebuild)
+        series = series.astype(object)
+    return series.where(series.isna(), series.astype(str)).astype('string')
+
+def to_typed_frame(df):
+    """
+    Casts the unified schema to stable dtypes and derives the 'year' column,
+    so downstream stages never re-infer types or re-parse dates. Each
+    column's type follows from its name alone (everything not listed above
+    is text), so separately written batches share one schema.
+    """
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format='mixed', errors='coerce')
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    if 'observation_date' in df.columns:
+        df['year'] = df['observation_date'].dt.year.astype('Int16')
+
+    for col in df.columns:
+        if col in ['record_type', 'year'] or col in DATE_COLUMNS or col in NUMERIC_COLUMNS:
+            continue
+        if col in CATEGORICAL_COLUMNS:
+            df[col] = _as_text(df[col]).astype('category')
+        else:
+            df[col] = _as_text(df[col])
+    return df
+
+def _wide_dictionaries(schema):
+    """int32 dictionary indices, so a later batch with more categories still fits the schema."""
+    return pa.schema([field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                      if pa.types.is_dictionary(field.type) else field for field in schema],
+                     metadata=schema.metadata)
+
+def _column_hash(values, is_date):
+    """uint64 hash per value; missing values hash like ''."""
+    if is_date:
+        days = pd.to_datetime(values, format='mixed', errors='coerce').to_numpy(dtype='datetime64[ns]')
+        return pd.util.hash_array(days.astype('datetime64[D]').view(np.int64))
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Hash the (few) categories once and look them up by code
+        codes = values.cat.codes.to_numpy()
+        # Missing values (code -1) look up the '' hash appended last
+        categories = np.append(values.cat.categories.astype(object), '')
+        return _column_hash(pd.Series(categories), False)[codes]
+    text = values.astype(object).where(values.notna(), '').astype(str).str.strip()
+    return pd.util.hash_array(text.to_numpy(dtype=object))
+
+def record_keys(df):
+    """
+    64-bit hashes of each record's KEY_COLUMNS, one column at a time. Dates
+    are compared by day, so '2024-06-30' and '2024-06-30 00:00:00' are the
+    same key.
+    """
+    keys = np.zeros(len(df), dtype=np.uint64)
+    for col in KEY_COLUMNS:
+        values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        keys = keys * np.uint64(0x100000001B3) ^ _column_hash(values, col in DATE_COLUMNS)
+    return keys
+
+def _write_segment(path, name, keys):
+    os.makedirs(os.path.join(path, INDEX_DIR), exist_ok=True)
+    np.save(os.path.join(path, INDEX_DIR, name), np.unique(keys))
+    return name
+
+def _write_manifest(path, manifest):
+    tmp_path = os.path.join(path, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+def store_schema(path=STORE_PATH):
+    """
+    Arrow schema of the store including the 'record_type' partition column
+    (inferred from the first data file for stores written without one).
+    """
+    schema_path = os.path.join(path, SCHEMA_FILE)
+    if os.path.exists(schema_path):
+        return pq.read_schema(schema_path)
+    return ds.dataset(os.path.abspath(path), format='parquet', partitioning='hive').schema
+
+def load_manifest(path=STORE_PATH):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def write_processed(df, path=STORE_PATH, source=None):
+    """
+    Writes the enriched dataset as typed Parquet, partitioned by record_type,
+    plus the dedup index of its record keys. The manifest is written last
+    and marks the store as complete.
+
+    Args:
+        df (pd.DataFrame): Enriched records.
+        path (str): Store directory.
+        source (str): Fingerprint of the data the store was built from, kept
+            in the manifest so callers can tell when a rebuild is due.
+    """
+    typed = to_typed_frame(df)
+
+    # Build next to the live store and swap it in, so readers never see a partial write
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+    table = table.cast(_wide_dictionaries(table.schema))
+    # Deterministic file names keep the store's content fingerprint stable across rewrites
+    pq.write_to_dataset(table, tmp_path, partition_cols=['record_type'],
+                        basename_template='part-{i}.parquet')
+    pq.write_metadata(table.schema, os.path.join(tmp_path, SCHEMA_FILE))
+
+    manifest = {
+        'rows': int(len(typed)),
+        'record_types': typed['record_type'].value_counts().to_dict(),
+        'columns': {col: str(dtype) for col, dtype in typed.dtypes.items()},
+        'source': source,
+        'batches': 0,
+        'key_columns': KEY_COLUMNS,
+        'index_segments': [_write_segment(tmp_path, 'keys-000000.npy', record_keys(typed))],
+    }
+    _write_manifest(tmp_path, manifest)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return path
+
+def _index_segments(path, manifest):
+    """
+    Committed index segments. Stores written before the index existed, or
+    indexed under other KEY_COLUMNS, get one segment of all their keys.
+    """
+    if 'index_segments' not in manifest or manifest.get('key_columns') != KEY_COLUMNS:
+        columns = [col for col in KEY_COLUMNS if col in store_schema(path).names]
+        keys = record_keys(read_processed(columns=columns, path=path))
+        # A new name, so readers of the old manifest keep their segments
+        batch = manifest.setdefault('batches', 0)
+        manifest['index_segments'] = [_write_segment(path, f'keys-{batch:06d}-rekeyed.npy', keys)]
+        manifest['key_columns'] = KEY_COLUMNS
+        _write_manifest(path, manifest)
+    return manifest['index_segments']
+
+def known_keys(keys, path=STORE_PATH):
+    """
+    Boolean mask of the `keys` already in the store. Segments are
+    memory-mapped and binary-searched, so only the pages the lookups touch
+    are read.
+    """
+    manifest = load_manifest(path)
+    known = np.zeros(len(keys), dtype=bool)
+    for name in _index_segments(path, manifest):
+        segment = np.load(os.path.join(path, INDEX_DIR, name), mmap_mode='r')
+        if not len(segment):
+            continue
+        pos = np.minimum(np.searchsorted(segment, keys), len(segment) - 1)
+        known |= segment[pos] == keys
+    return known
+
+def _conform(typed, schema):
+    """Arrow table of `typed` with exactly the store's schema (missing columns are null)."""
+    arrays = []
+    for field in schema:
+        if field.name not in typed.columns or typed[field.name].isna().all():
+            arrays.append(pa.nulls(len(typed), field.type))
+            continue
+        try:
+            arrays.append(pa.array(typed[field.name], from_pandas=True).cast(field.type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Column '{field.name}' does not fit the store type {field.type}: {e}") from e
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def append_processed(df, path=STORE_PATH):
+    """
+    Appends records to the store as new Parquet files, one per record_type
+    partition, without touching the existing ones.
+
+    Records whose key (KEY_COLUMNS) is already in the store, or repeated
+    within `df`, are skipped, so appending the same records twice is a
+    no-op. The cost depends on the size of `df`, not of the store: the key
+    lookup binary-searches the memory-mapped index and only the batch is
+    written.
+
+    Returns:
+        pd.DataFrame: The records that were appended.
+    """
+    if not has_store(path):
+        raise FileNotFoundError(f"No Parquet store at {path}. Please run task1_enrichment.py.")
+
+    keys = record_keys(df)
+    new = ~known_keys(keys, path) & ~pd.Series(keys).duplicated().to_numpy()
+    df, keys = df[new], keys[new]
+    if df.empty:
+        return df
+
+    manifest = load_manifest(path)
+    segments = _index_segments(path, manifest)
+    batch = manifest.get('batches', 0) + 1
+
+    # New columns widen the store schema; older files read them as nulls
+    typed = to_typed_frame(df).reset_index(drop=True)
+    schema = store_schema(path)
+    extra = [col for col in typed.columns if col not in schema.names]
+    if extra:
+        added = _wide_dictionaries(pa.Schema.from_pandas(typed[extra], preserve_index=False))
+        schema = pa.schema(list(schema) + list(added), metadata=schema.metadata)
+    file_schema = schema.remove(schema.get_field_index('record_type'))
+
+    # Stage the files under a '_' name (ignored by readers), then move them in
+    staging = os.path.join(path, f'_batch-{batch:06d}')
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    for record_type, rows in typed.groupby('record_type', sort=True).indices.items():
+        part_dir = os.path.join(staging, f'record_type={record_type}')
+        os.makedirs(part_dir)
+        pq.write_table(_conform(typed.iloc[rows], file_schema), os.path.join(part_dir, f'batch-{batch:06d}.parquet'))
+
+    segments = segments + [_write_segment(path, f'keys-{batch:06d}.npy', keys)]
+    if len(segments) > MAX_INDEX_SEGMENTS:
+        merged = np.concatenate([np.load(os.path.join(path, INDEX_DIR, name)) for name in segments])
+        segments = [_write_segment(path, f'merged-{batch:06d}.npy', merged)]
+
+    for part_dir in sorted(os.listdir(staging)):
+        os.makedirs(os.path.join(path, part_dir), exist_ok=True)
+        for name in os.listdir(os.path.join(staging, part_dir)):
+            os.replace(os.path.join(staging, part_dir, name), os.path.join(path, part_dir, name))
+    shutil.rmtree(staging)
+
+    if extra:
+        pq.write_metadata(schema, os.path.join(path, SCHEMA_FILE + '.tmp'))
+        os.replace(os.path.join(path, SCHEMA_FILE + '.tmp'), os.path.join(path, SCHEMA_FILE))
+
+    # The manifest commits the batch; a crash before this re-appends it under the same file names
+    counts = manifest.get('record_types', {})
+    for record_type, n in typed['record_type'].value_counts().items():
+        counts[record_type] = counts.get(record_type, 0) + int(n)
+    manifest.update(rows=manifest['rows'] + len(typed), record_types=counts,
+                    batches=batch, index_segments=segments)
+    _write_manifest(path, manifest)
+
+    # Segments merged away are no longer referenced
+    for name in os.listdir(os.path.join(path, INDEX_DIR)):
+        if name not in segments:
+            os.remove(os.path.join(path, INDEX_DIR, name))
+    return df
+
+def read_appended(path=STORE_PATH):
+    """Records added by append_processed() since the store was last written (empty if none)."""
+    if not has_store(path):
+        return pd.DataFrame()
+    files = sorted(os.path.join(path, part, name) for part in os.listdir(path)
+                   if part.startswith('record_type=')
+                   for name in os.listdir(os.path.join(path, part)) if name.startswith('batch-'))
+    if not files:
+        return pd.DataFrame()
+    dataset = ds.dataset(files, format='parquet', partitioning='hive', partition_base_dir=path,
+                         schema=store_schema(path))
+    return dataset.to_table().to_pandas()
+
+def append_csv(df, csv_path=ENRICHED_CSV):
+    """
+    Appends records to the enriched CSV in its existing column order (only
+    the header is read). Records bringing new columns first widen the CSV:
+    it is rewritten once with those columns added (empty for older rows).
+    """
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    extra = [col for col in df.columns if col not in columns]
+    if extra:
+        # Read as text, so existing values are written back unchanged
+        existing = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+        columns = columns.append(pd.Index(extra))
+        existing.reindex(columns=columns, fill_value='').to_csv(csv_path + '.tmp', index=False)
+        os.replace(csv_path + '.tmp', csv_path)
+    df.reindex(columns=columns).to_csv(csv_path, mode='a', header=False, index=False)
+
+def has_store(path=STORE_PATH):
+    """True if a complete Parquet store exists at path."""
+    return os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+def read_processed(columns=None, record_types=None, filters=None, path=STORE_PATH):
+    """
+    Reads the Parquet store with column projection and predicate pushdown.
+
+    Args:
+        columns (list): Columns to load (all by default).
+        record_types (list): Only load these record_type partitions.
+        filters (list): Extra pyarrow filters, e.g. [('year', '>=', 2017)].
+
+    Returns:
+        pd.DataFrame
+    """
+    # Memory-mapped local files; '_manifest.json' etc. are skipped by the '_' prefix rule
+    # The shared schema covers columns that only appended batches have
+    dataset = ds.dataset(os.path.abspath(path), format='parquet', partitioning='hive', schema=store_schema(path),
+                         filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    predicates = list(filters or [])
+    if record_types is not None:
+        predicates.append(('record_type', 'in', list(record_types)))
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+
+    table = dataset.to_table(
+        columns=columns,
+        filter=pq.filters_to_expression(predicates) if predicates else None,
+    )
+    return table.to_pandas()
+
+def load_enriched(columns=None, record_types=None, filters=None):
+    """
+    Loads the enriched dataset from the Parquet store, falling back to the
+    enriched CSV (with a derived 'year') when the store has not been built.
+    """
+    if has_store():
+        return read_processed(columns, record_types, filters)
+
+    if not os.path.exists(ENRICHED_CSV):
+        raise FileNotFoundError(f"Enriched data not found at {ENRICHED_CSV}. Please run task1_enrichment.py.")
+
+    df = pd.read_csv(ENRICHED_CSV)
+    if 'year' not in df.columns and 'observation_date' in df.columns:
+        df['year'] = pd.to_datetime(df['observation_date'], format='mixed', errors='coerce').dt.year
+    if record_types is not None:
+        df = df[df['record_type'].isin(record_types)]
+    for name, op, value in filters or []:
+        df = df[FILTER_OPS[op](df[name], value)]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.reset_index(drop=True)
@@ -0,0 +1,149 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from src.ingest_cache import path_fingerprint
+
+RESULTS_DIR = 'data/cache/forecasts'
+INDEX_FILE = '_index.json'
+# Least recently used results are evicted beyond this many bytes
+MAX_RESULTS_BYTES = 256 * 1024 * 1024
+
+def result_key(data_version, matrix_version, params):
+    """Content address of a result: hash of the input versions and the JSON of the parameters."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([data_version, matrix_version, params], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def input_version(*paths):
+    """Version of an input: the content hash of the first of `paths` that exists, else 'missing'."""
+    for path in paths:
+        if os.path.exists(path):
+            return path_fingerprint(path)
+    return 'missing'
+
+def load_index(results_dir=RESULTS_DIR):
+    """Cached runs by key: params, input versions, rows, bytes, created / last used times."""
+    index_path = os.path.join(results_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        # Entries of a corrupt index are simply recomputed
+        return {}
+    # Files removed by hand are forgotten
+    return {key: entry for key, entry in index.items()
+            if os.path.exists(os.path.join(results_dir, entry['file']))}
+
+def _save_index(results_dir, index):
+    os.makedirs(results_dir, exist_ok=True)
+    index_path = os.path.join(results_dir, INDEX_FILE)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, index_path)
+
+def get_result(key, results_dir=RESULTS_DIR):
+    """Returns the cached DataFrame for `key` (marking it used), or None."""
+    index = load_index(results_dir)
+    entry = index.get(key)
+    if entry is None:
+        return None
+    result = pd.read_parquet(os.path.join(results_dir, entry['file']))
+    entry['used'] = time.time()
+    _save_index(results_dir, index)
+    return result
+
+def evict(index, results_dir=RESULTS_DIR, max_bytes=MAX_RESULTS_BYTES, keep=()):
+    """Deletes least recently used results until the store fits in max_bytes; returns the evicted keys."""
+    evicted = []
+    total = sum(entry['bytes'] for entry in index.values())
+    for key in sorted(index, key=lambda k: index[k]['used']):
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        entry = index.pop(key)
+        total -= entry['bytes']
+        try:
+            os.remove(os.path.join(results_dir, entry['file']))
+        except FileNotFoundError:
+            pass
+        evicted.append(key)
+    return evicted
+
+def put_result(key, result, meta=None, results_dir=RESULTS_DIR, max_bytes=MAX_RESULTS_BYTES):
+    """
+    Stores a DataFrame under `key` and records it in the index, then evicts
+    least recently used results beyond max_bytes (never the new one).
+
+    Args:
+        key (str): Content address from result_key().
+        result (pd.DataFrame): Result to store.
+        meta (dict): Extra index fields (e.g. params and input versions).
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    name = f'{key}.parquet'
+    path = os.path.join(results_dir, name)
+    tmp_path = path + '.tmp'
+    result.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    now = time.time()
+    index = load_index(results_dir)
+    index[key] = {'file': name, 'rows': len(result), 'bytes': os.path.getsize(path),
+                  'created': now, 'used': now, **(meta or {})}
+    evict(index, results_dir, max_bytes, keep=(key,))
+    _save_index(results_dir, index)
+    return path
+
+def cached(key, compute, meta=None, results_dir=RESULTS_DIR, max_bytes=MAX_RESULTS_BYTES):
+    """The stored result for `key`, or compute() stored under it. Returns (result, hit)."""
+    result = get_result(key, results_dir)
+    if result is not None:
+        return result, True
+    result = compute()
+    put_result(key, result, meta, results_dir, max_bytes)
+    return result, False
+
+def list_results(results_dir=RESULTS_DIR):
+    """The index as a DataFrame, most recently used first."""
+    index = load_index(results_dir)
+    if not index:
+        return pd.DataFrame(columns=['key', 'rows', 'bytes', 'created', 'used'])
+    df = pd.DataFrame.from_dict(index, orient='index').rename_axis('key').reset_index()
+    for col in ['created', 'used']:
+        df[col] = pd.to_datetime(df[col], unit='s')
+    return df.sort_values('used', ascending=False, ignore_index=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or clear cached forecast results.")
+    parser.add_argument('--clear', action='store_true', help="Delete every cached result.")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        index = load_index()
+        evict(index, max_bytes=-1)
+        _save_index(RESULTS_DIR, index)
+        print(f"🧹 Cleared {RESULTS_DIR}")
+        return 0
+
+    results = list_results()
+    if results.empty:
+        print("No cached forecast results.")
+        return 0
+    columns = [c for c in ['key', 'kind', 'rows', 'bytes', 'used', 'params'] if c in results.columns]
+    results['key'] = results['key'].str[:12]
+    print(results[columns].to_string(index=False))
+    print(f"\n{len(results)} results, {results['bytes'].sum() / 1e6:.2f} MB in {RESULTS_DIR}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
+
+# Points per series sent to a chart; longer series are downsampled with LTTB
+MAX_POINTS = 1000
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points. The points between them are split into
+    n_out - 2 equal buckets, and each bucket keeps the point forming the
+    largest triangle with the previously kept point and the average of the
+    next bucket. Peaks, dips and trend changes survive, unlike with every-k-th
+    sampling.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): y values.
+        n_out (int): Number of points to keep (at least 3).
+
+    Returns:
+        np.ndarray: Sorted positions of the kept points (all of them if the
+        series has at most n_out points).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError(f"n_out must be >= 3, got {n_out}")
+
+    # Bucket edges over the interior points 1 .. n-2
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    # Average of every bucket, with the last point as the bucket after the last
+    sums_x, sums_y = np.add.reduceat(x[1:n - 1], edges[:-1] - 1), np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Twice the triangle area for every candidate of the bucket
+        area = np.abs((x[prev] - avg_x[b + 1]) * (y[lo:hi] - y[prev])
+                      - (x[prev] - x[lo:hi]) * (avg_y[b + 1] - y[prev]))
+        prev = lo + int(np.argmax(area))
+        kept[b + 1] = prev
+    return kept
+
+class SeriesIndex:
+    """
+    Per-key (e.g. per indicator) series stored as contiguous slices of
+    arrays sorted by key, then x.
+
+    Built once per data version, so looking up a series is a dictionary
+    access and an array slice instead of a boolean scan of the whole frame.
+    """
+
+    def __init__(self, keys, offsets, x, y):
+        self.keys = pd.Index(keys)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.x = x
+        self.y = y
+        self._pos = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    @instrumented('series_index_build')
+    def build(cls, df, key='indicator_code', x='year', y='value_numeric'):
+        """
+        Args:
+            df (pd.DataFrame): Records with `key`, `x` and `y` columns; rows
+                missing any of them are skipped.
+            key (str): Column the series are grouped by.
+            x, y (str): Columns of the series points.
+
+        Returns:
+            SeriesIndex
+        """
+        data = df[[key, x, y]].dropna()
+        # Sorting integer codes instead of the strings themselves
+        codes, unique = pd.factorize(data[key].astype(str), sort=True)
+        xs = data[x].to_numpy()
+        # Stable, so points sharing an x keep their row order
+        order = np.lexsort((xs, codes))
+        offsets = np.searchsorted(codes[order], np.arange(len(unique) + 1))
+        return cls(unique, offsets, np.ascontiguousarray(xs[order]),
+                   np.ascontiguousarray(data[y].to_numpy(dtype=float)[order]))
+
+    @property
+    def shape(self):
+        """(points, series)."""
+        return len(self.x), len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._pos
+
+    def series(self, key, max_points=None):
+        """
+        Returns the (x, y) arrays of one series, sorted by x; empty arrays
+        for an unknown key. With max_points, longer series are LTTB-downsampled.
+        """
+        pos = self._pos.get(key)
+        if pos is None:
+            return self.x[:0], self.y[:0]
+        lo, hi = self.offsets[pos], self.offsets[pos + 1]
+        x, y = self.x[lo:hi], self.y[lo:hi]
+        if max_points is not None and len(x) > max_points:
+            kept = lttb(x, y, max_points)
+            x, y = x[kept], y[kept]
+        return x, y
+
+    def latest(self, key, n=2):
+        """The last n values of a series (fewer if it is shorter)."""
+        return self.series(key)[1][-n:]
+
+    def frame(self, keys, max_points=MAX_POINTS, key_name='indicator_code', x_name='year', y_name='value_numeric'):
+        """Long frame of the (downsampled) series of `keys`, ready for px.line."""
+        parts = [self.series(k, max_points) for k in keys]
+        return pd.DataFrame({
+            key_name: np.repeat(list(keys), [len(x) for x, _ in parts]),
+            x_name: np.concatenate([x for x, _ in parts]) if parts else [],
+            y_name: np.concatenate([y for _, y in parts]) if parts else [],
+        })
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.generate_matrix import prepare_events
+from src.impact_matrix import ImpactMatrix
+from src.impact_modeling import month_ordinal
+from src.instrumentation import count_cache, instrumented
+
+# Event impact multipliers per scenario (applied to the matrix shocks)
+SCENARIO_MULTIPLIERS = {'Base': 1.0, 'Optimistic': 1.2, 'Pessimistic': 0.5}
+
+def to_percentage_points(shock):
+    """
+    Matrix values below 1.0 are decimal fractions (0.05 = 5pp); larger values
+    are already percentage points. Works on scalars and arrays.
+    """
+    shock = np.asarray(shock, dtype=float)
+    small = (np.abs(shock) < 1.0) & (np.abs(shock) > 0.0001)
+    return np.where(small, shock * 100, shock)
+
+def from_percentage_points(points):
+    """
+    Inverse of to_percentage_points: encodes percentage points so that
+    to_percentage_points reads them back unchanged (decimal fractions below
+    100pp; values too small to survive the round trip become 0).
+    """
+    points = np.asarray(points, dtype=float)
+    fraction = points / 100
+    encoded = np.where(np.abs(points) < 100, fraction, points)
+    return np.where(np.abs(encoded) > 0.0001, encoded, 0.0)
+
+def _label_year(label):
+    """Legacy fallback: reads the year out of a 'Event Name (YYYY)' row label."""
+    label = str(label)
+    if '(' in label and ')' in label:
+        year_str = label.split('(')[-1].replace(')', '')
+        if year_str.isdigit():
+            return int(year_str)
+    return None
+
+class ShockIndex:
+    """
+    Sparse period x indicator table of event shocks, built once from the
+    event-indicator matrix and the event dates.
+
+    The table is the product of a period x event incidence matrix (each
+    event in the period of its observation_date) with the sparse event x
+    indicator matrix, so looking up the shock vector for a period (and a
+    scenario) is a single row access instead of a scan over all events.
+    """
+
+    def __init__(self, periods, indicators, shocks, freq='year'):
+        self.periods = np.asarray(periods, dtype=int)
+        self.indicators = pd.Index(indicators)
+        self.shocks = sparse.csr_matrix(shocks, shape=(len(self.periods), len(self.indicators)), dtype=float)
+        self.freq = freq
+        self._start = self.periods[0] if len(self.periods) else 0
+        self._tables = {}
+
+    @property
+    def shape(self):
+        """(periods, indicators) of the shock table."""
+        return self.shocks.shape
+
+    @classmethod
+    @instrumented('shock_index_build')
+    def build(cls, matrix, events=None, freq='year'):
+        """
+        Args:
+            matrix (ImpactMatrix or pd.DataFrame): Event-indicator matrix (rows: event display names).
+            events (pd.DataFrame): Unified records; dates of events the matrix
+                has no date for are taken from the 'observation_date' of the
+                matching event record.
+            freq (str): 'year' or 'month' resolution of the period axis.
+
+        Returns:
+            ShockIndex
+        """
+        if freq not in ('year', 'month'):
+            raise ValueError(f"Unknown freq: {freq}")
+        if isinstance(matrix, pd.DataFrame):
+            matrix = ImpactMatrix.from_frame(matrix)
+        if matrix.empty:
+            return cls([], matrix.indicators, sparse.csr_matrix((0, len(matrix.indicators))), freq=freq)
+
+        dates = matrix.event_dates
+        if events is not None and not events.empty and dates.isna().any():
+            lookup = prepare_events(events).dropna(subset=['event_date'])
+            lookup = lookup.drop_duplicates('event_display_name').set_index('event_display_name')['event_date']
+            dates = dates.fillna(lookup.reindex(matrix.events))
+
+        if freq == 'year':
+            periods = pd.Series(pd.DatetimeIndex(dates).year, index=matrix.events, dtype='float')
+        else:
+            periods = pd.Series(month_ordinal(dates), index=matrix.events, dtype='float')
+
+        # Rows without an event date fall back to the "(YYYY)" label convention
+        missing = periods.isna()
+        if missing.any():
+            label_years = pd.Series([_label_year(name) for name in matrix.events[missing]],
+                                    index=matrix.events[missing], dtype='float')
+            if freq == 'month':
+                label_years = label_years * 12
+            periods[missing] = label_years
+
+        dated = np.flatnonzero(periods.notna().to_numpy())
+        if not len(dated):
+            return cls([], matrix.indicators, sparse.csr_matrix((0, len(matrix.indicators))), freq=freq)
+
+        event_periods = periods.to_numpy()[dated].astype(int)
+        start = event_periods.min()
+        axis = np.arange(start, event_periods.max() + 1)
+
+        # Period x event incidence times event x indicator impacts sums each period's shocks
+        incidence = sparse.csr_matrix((np.ones(len(dated)), (event_periods - start, dated)),
+                                      shape=(len(axis), matrix.shape[0]))
+        return cls(axis, matrix.indicators, incidence @ matrix.matrix, freq=freq)
+
+    @staticmethod
+    def _scaled(shocks, multiplier):
+        """Applies a multiplier and the percentage-point convention to the stored (non-zero) shocks."""
+        shocks = shocks.copy()
+        shocks.data = to_percentage_points(shocks.data * multiplier)
+        return shocks
+
+    def table(self, scenario='Base'):
+        """Returns the sparse period x indicator shock table for a scenario, in percentage points."""
+        count_cache('shock_tables', scenario in self._tables)
+        if scenario not in self._tables:
+            self._tables[scenario] = self._scaled(self.shocks, SCENARIO_MULTIPLIERS.get(scenario, 1.0))
+        return self._tables[scenario]
+
+    def vector(self, period, scenario='Base'):
+        """Dense shock vector over all indicators for one period."""
+        pos = int(period) - self._start
+        if pos < 0 or pos >= len(self.periods):
+            return np.zeros(len(self.indicators))
+        return self.table(scenario)[pos].toarray().ravel()
+
+    def shock(self, period, indicator_code, scenario='Base'):
+        """Shock for a single (period, indicator) pair."""
+        if indicator_code not in self.indicators:
+            return 0.0
+        return float(self.vector(period, scenario)[self.indicators.get_loc(indicator_code)])
+
+    def window(self, periods, scenario='Base', indicators=None, multiplier=None):
+        """
+        Returns the dense shocks for `periods` x `indicators` (all indicators by default).
+        Periods or indicators not covered by the index get a zero shock.
+        An explicit `multiplier` overrides the scenario's multiplier.
+        """
+        periods = np.asarray(periods, dtype=int)
+        cols = self.indicators if indicators is None else pd.Index(indicators)
+        out = np.zeros((len(periods), len(cols)))
+        if not len(self.periods):
+            return out
+
+        rows = periods - self._start
+        row_ok = (rows >= 0) & (rows < len(self.periods))
+        col_pos = self.indicators.get_indexer(cols)
+        col_ok = col_pos >= 0
+
+        if multiplier is None:
+            block = self.table(scenario)[rows[row_ok]][:, col_pos[col_ok]]
+        else:
+            block = self._scaled(self.shocks[rows[row_ok]][:, col_pos[col_ok]], multiplier)
+        out[np.ix_(row_ok, col_ok)] = block.toarray()
+        return out
+
+    def cumulative(self, periods, scenario='Base', indicators=None, adjustment=0.0, multiplier=None):
+        """Carry-over shock: running sum of (shock + adjustment) over `periods`."""
+        return np.cumsum(self.window(periods, scenario, indicators, multiplier) + adjustment, axis=0)
@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.ingest_cache import cache_frames
+
+# Column order of the unified schema (as in the workbook's Impact_sheet)
+UNIFIED_COLUMNS = [
+    'record_id', 'parent_id', 'record_type', 'category', 'pillar', 'indicator', 'indicator_code',
+    'indicator_direction', 'value_numeric', 'value_text', 'value_type', 'unit',
+    'observation_date', 'period_start', 'period_end', 'fiscal_year', 'gender', 'location',
+    'region', 'source_name', 'source_type', 'source_url', 'confidence', 'related_indicator',
+    'relationship_type', 'impact_direction', 'impact_magnitude', 'impact_estimate',
+    'lag_months', 'evidence_basis', 'comparable_country', 'collected_by', 'collection_date',
+    'original_text', 'notes',
+]
+
+RAW_PATH = 'data/raw/ethiopia_fi_unified_data.xlsx'
+
+PILLARS = np.array(['ACCESS', 'USAGE', 'QUALITY', 'AFFORDABILITY'], dtype=object)
+EVENT_CATEGORIES = np.array(['product_launch', 'market_entry', 'policy', 'infrastructure', 'regulation'], dtype=object)
+CONFIDENCE_LEVELS = np.array(['high', 'medium', 'low'], dtype=object)
+LAG_MONTHS = np.array([0, 3, 6, 12, 18, 24])
+
+def _random_dates(rng, n, start, end):
+    """Uniform random dates between two 'YYYY-MM-DD' strings."""
+    lo = pd.Timestamp(start).value // 86400_000_000_000
+    hi = pd.Timestamp(end).value // 86400_000_000_000
+    return pd.to_datetime(rng.integers(lo, hi + 1, size=n), unit='D')
+
+def _ids(prefix, n, width):
+    return np.array([f'{prefix}_{i:0{width}d}' for i in range(1, n + 1)], dtype=object)
+
+def generate_unified_dataset(n_observations=1000, n_events=50, n_indicators=20, links_per_event=3, seed=0):
+    """
+    Builds a synthetic dataset in the unified schema (observations, events,
+    impact_links) for scaling tests.
+
+    Each indicator follows a linear trend plus noise; events are spread over
+    2011-2026 and each one links to `links_per_event` random indicators.
+
+    Args:
+        n_observations (int): Observation records.
+        n_events (int): Event records.
+        n_indicators (int): Distinct indicator codes.
+        links_per_event (int): Impact links per event.
+        seed (int): RNG seed; the same arguments always give the same frame.
+
+    Returns:
+        pd.DataFrame: Records with the UNIFIED_COLUMNS.
+    """
+    rng = np.random.default_rng(seed)
+    codes = _ids('SYN', n_indicators, 3)
+    names = np.array([f'Synthetic Indicator {i}' for i in range(1, n_indicators + 1)], dtype=object)
+    pillars = PILLARS[rng.integers(len(PILLARS), size=n_indicators)]
+
+    # A. Observations: trend + noise per indicator, mostly national aggregates
+    ind = rng.integers(n_indicators, size=n_observations)
+    obs_dates = _random_dates(rng, n_observations, '2011-01-01', '2024-12-31')
+    intercept = rng.uniform(5, 40, size=n_indicators)
+    slope = rng.uniform(0.5, 4, size=n_indicators)
+    values = intercept[ind] + slope[ind] * (obs_dates.year.to_numpy() - 2011) + rng.normal(0, 2, size=n_observations)
+    values[rng.random(n_observations) < 0.005] = np.nan
+    observations = pd.DataFrame({
+        'record_id': _ids('REC', n_observations, 7),
+        'record_type': 'observation',
+        'pillar': pillars[ind],
+        'indicator': names[ind],
+        'indicator_code': codes[ind],
+        'indicator_direction': 'higher_better',
+        'value_numeric': values.round(2),
+        'value_type': 'percentage',
+        'unit': '%',
+        'observation_date': obs_dates,
+        'fiscal_year': obs_dates.year.astype(str),
+        'gender': rng.choice(np.array(['all', 'male', 'female'], dtype=object), size=n_observations, p=[0.8, 0.1, 0.1]),
+        'location': rng.choice(np.array(['national', 'urban', 'rural'], dtype=object), size=n_observations, p=[0.8, 0.1, 0.1]),
+        'source_name': 'Synthetic Survey',
+        'source_type': 'survey',
+        'confidence': CONFIDENCE_LEVELS[rng.integers(3, size=n_observations)],
+    })
+
+    # B. Events: unique display names, dated across the forecast horizon too
+    event_ids = _ids('EVT', n_events, 5)
+    evt_dates = _random_dates(rng, n_events, '2011-01-01', '2026-12-31')
+    events = pd.DataFrame({
+        'record_id': event_ids,
+        'record_type': 'event',
+        'category': EVENT_CATEGORIES[rng.integers(len(EVENT_CATEGORIES), size=n_events)],
+        'indicator': [f'Synthetic Event {i}' for i in range(1, n_events + 1)],
+        'indicator_code': [f'EVT_SYN_{i}' for i in range(1, n_events + 1)],
+        'value_text': 'Launched',
+        'value_type': 'categorical',
+        'observation_date': evt_dates,
+        'fiscal_year': evt_dates.year.astype(str),
+        'source_name': 'Synthetic News',
+        'source_type': 'news',
+        'confidence': CONFIDENCE_LEVELS[rng.integers(3, size=n_events)],
+    })
+
+    # C. Impact links: decimal magnitudes (0.05 = 5pp), some negative
+    n_links = n_events * links_per_event
+    magnitude = rng.uniform(-0.05, 0.15, size=n_links).round(3)
+    links = pd.DataFrame({
+        'record_id': _ids('IMP', n_links, 6),
+        'record_type': 'impact_link',
+        'parent_id': np.repeat(event_ids, links_per_event),
+        'pillar': pillars[rng.integers(n_indicators, size=n_links)],
+        'related_indicator': codes[rng.integers(n_indicators, size=n_links)],
+        'impact_direction': np.where(magnitude < 0, 'negative', 'positive'),
+        'impact_magnitude': magnitude,
+        'lag_months': LAG_MONTHS[rng.integers(len(LAG_MONTHS), size=n_links)],
+        'evidence_basis': 'Synthetic',
+        'confidence': CONFIDENCE_LEVELS[rng.integers(3, size=n_links)],
+    })
+
+    df = pd.concat([observations, events, links], ignore_index=True)
+    return df.reindex(columns=UNIFIED_COLUMNS)
+
+def write_synthetic_workspace(root, df, raw_path=RAW_PATH):
+    """
+    Lays out `df` as the first sheet of the raw workbook of a project tree
+    under `root`, so the pipeline stages (which use relative 'data/...' paths)
+    can run there.
+
+    Real Excel files are capped at ~1M rows, so the workbook is a small
+    placeholder and the frame is registered directly in root's Arrow cache,
+    which is what the enrichment stage reads.
+
+    Returns:
+        str: Absolute path of the placeholder workbook.
+    """
+    path = os.path.join(root, raw_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.makedirs(os.path.join(root, 'data', 'processed'), exist_ok=True)
+
+    counts = df['record_type'].value_counts().to_dict()
+    with open(path, 'w') as f:
+        f.write(f"synthetic unified dataset: {sorted(counts.items())}, {pd.util.hash_pandas_object(df).sum()}\n")
+
+    cache_frames(path, {'ethiopia_fi_unified_data': df}, cache_dir=os.path.join(root, 'data', 'cache'))
+    return os.path.abspath(path)
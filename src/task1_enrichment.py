@@ -3,6 +3,12 @@ import numpy as np
 from datetime import datetime
 import os
 
+from src.ingest_cache import file_sha256, read_workbook
+from src.instrumentation import instrumented, record_size
+from src.processed_store import (ENRICHED_CSV, STORE_PATH, append_csv, append_processed, has_store,
+                                 load_manifest, read_appended, write_processed)
+
+@instrumented('enrichment')
 def run_enrichment():
     # Update paths to match your .xlsx files in the screenshot
     raw_path = 'data/raw/ethiopia_fi_unified_data.xlsx'
@@ -11,8 +17,8 @@ def run_enrichment():
         print(f"Error: Starter dataset not found at {raw_path}")
         return
 
-    # Reading from Excel instead of CSV
-    df = pd.read_excel(raw_path)
+    # Reading from Excel instead of CSV (via the Arrow cache, converted once per workbook version)
+    df = read_workbook(raw_path)
     print(f"Initial dataset loaded: {len(df)} records.")
 
     # 1. Define Enrichment Data
@@ -65,18 +71,33 @@ def run_enrichment():
         'collection_date': datetime.now().strftime('%Y-%m-%d')
     }
 
-    # 2. Append and Save to Processed folder as CSV for easier use in EDA
+    # 2. Append to the typed Parquet store (and the CSV copy kept for EDA).
+    # The store is only rebuilt when the starter workbook changes; records are
+    # appended through the dedup index, so re-running adds nothing twice.
     enriched_records = pd.DataFrame([new_obs, new_evt, new_link])
-    df_final = pd.concat([df, enriched_records], ignore_index=True)
+    output_file = ENRICHED_CSV
+    source = file_sha256(raw_path)
 
-    os.makedirs('data/processed', exist_ok=True)
-    
-    # We save as CSV in processed because it's faster for Task 2 (EDA)
-    output_file = 'data/processed/ethiopia_fi_enriched.csv'
-    df_final.to_csv(output_file, index=False)
-    
-    print(f"\nEnrichment complete. Total records: {len(df_final)}")
+    if not has_store() or load_manifest().get('source') != source or not os.path.exists(output_file):
+        # Records streamed in since the last build are carried over
+        streamed = read_appended()
+        os.makedirs('data/processed', exist_ok=True)
+        df.to_csv(output_file, index=False)
+        write_processed(df, source=source)
+        print(f"Rebuilt typed store from {raw_path}.")
+        if len(streamed):
+            append_csv(append_processed(streamed), output_file)
+
+    added = append_processed(enriched_records)
+    if len(added):
+        append_csv(added, output_file)
+
+    manifest = load_manifest()
+    record_size(manifest['rows'], len(manifest['columns']))
+    print(f"\nEnrichment complete. {len(added)} new records appended "
+          f"({len(enriched_records) - len(added)} already present). Total records: {manifest['rows']}")
     print(f"File saved to: {output_file}")
+    print(f"Typed store saved to: {STORE_PATH}")
 
 if __name__ == "__main__":
     run_enrichment()
\ No newline at end of file
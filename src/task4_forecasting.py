@@ -1,23 +1,33 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import os
+
+from src.impact_matrix import MATRIX_CSV, MATRIX_NPZ, ImpactMatrix, load_impact_matrix
+from src.instrumentation import instrumented
+from src.processed_store import ENRICHED_CSV, STORE_PATH, load_enriched
+from src.result_store import cached, get_result, input_version, result_key
+from src.shock_index import SCENARIO_MULTIPLIERS, ShockIndex
+
+# Flat annual adjustment (pp) added on top of event shocks in each scenario
+SCENARIO_ADJUSTMENTS = {'Optimistic': 1.0, 'Pessimistic': -1.0}
+
+FUTURE_YEARS = [2025, 2026, 2027]
+SCENARIOS = ['Base', 'Optimistic', 'Pessimistic']
+FORECAST_PATH = 'data/processed/forecasting_results.csv'
 
 def load_data():
-    """Loads enriched data and event matrix."""
-    enc_path = 'data/processed/ethiopia_fi_enriched.csv'
-    matrix_path = 'data/processed/event_indicator_matrix.csv'
-    
-    if not os.path.exists(enc_path):
-        raise FileNotFoundError(f"Enriched data not found at {enc_path}. Please run task1_enrichment.py.")
-        
-    df = pd.read_csv(enc_path)
+    """Loads enriched data (typed store, or CSV fallback) and the sparse event matrix."""
+    df = load_enriched()
     
     # Load Matrix if exists, else return empty
-    if os.path.exists(matrix_path):
-        matrix = pd.read_csv(matrix_path, index_col=0)
-    else:
-        matrix = pd.DataFrame()
+    matrix = load_impact_matrix()
+    if matrix is None:
+        matrix = ImpactMatrix.from_frame(pd.DataFrame())
         print("Warning: Event matrix not found. Shocks will not be applied.")
         
     return df, matrix
@@ -29,6 +39,9 @@ def calculate_baseline(history_df, target_year):
     """
     if history_df.empty or len(history_df) < 2:
         return None, None
+
+    # sklearn takes over a second to import; only this legacy helper needs it
+    from sklearn.linear_model import LinearRegression
         
     X = history_df[['year']].values.reshape(-1, 1)
     y = history_df['value_numeric'].values
@@ -41,125 +54,618 @@ def calculate_baseline(history_df, target_year):
     
     return projection, model
 
-def apply_shocks(year, matrix, indicator_code, scenario='Base'):
+def apply_shocks(year, matrix, indicator_code, scenario='Base', index=None):
     """
     Applies shocks from the matrix. Returns the shock value for that year.
+    Pass a prebuilt ShockIndex as `index` to avoid rebuilding it on every call.
     """
-    if matrix.empty:
+    if matrix.empty and index is None:
         return 0.0 # Return shock component only
-        
-    total_shock = 0.0
-    
-    # Iterate through events to find those applicable to this year
-    # Assuming Event Name format "Event Name (YYYY)"
-    for event_name, row in matrix.iterrows():
-        try:
-            # Simple heuristic to extract year
-            if '(' in str(event_name) and ')' in str(event_name):
-                 event_year_str = str(event_name).split('(')[-1].replace(')', '')
-                 if event_year_str.isdigit():
-                     event_year = int(event_year_str)
-                     
-                     if event_year == year:
-                        shock = row.get(indicator_code, 0.0)
-                        
-                        # Apply Scenario Multiplier
-                        if scenario == 'Optimistic':
-                            shock *= 1.2
-                        elif scenario == 'Pessimistic':
-                            shock *= 0.5
-                        
-                        total_shock += shock
-        except ValueError:
-            continue
-            
-    # Assuming Matrix values are decimal format of Percentage Points? e.g. 0.05 = 5pp?
-    # Or 0.05 = 0.05pp?
-    # Based on checking the matrix content previously: 0.05.
-    # If the user meant 5%, usually they write 5.0 or 0.05.
-    # Given the hardcoded code had "3.0" for 3pp.
-    # I will assume the matrix values need to be scaled by 100 if they are small (<1).
-    # Heuristic: if shock < 1.0, multiply by 100.
-    
-    if abs(total_shock) < 1.0 and abs(total_shock) > 0.0001:
-        total_shock *= 100
-        
-    return total_shock
 
-def run_forecasting_scenarios():
-    print("--- Starting Forecasting (Trend + Shocks) ---")
-    
+    if index is None:
+        index = ShockIndex.build(matrix)
+
+    # Matrix values < 1.0 are read as decimal fractions and scaled to pp
+    return index.shock(year, indicator_code, scenario)
+
+def add_year_column(df):
+    """Derives an integer 'year' column from 'observation_date' when missing."""
+    if 'year' not in df.columns:
+        dates = pd.to_datetime(df['observation_date'], format='mixed', errors='coerce')
+        df = df.assign(year=dates.dt.year)
+    return df
+
+def national_series(df):
+    """
+    Returns observation rows for the national, all-gender series of each indicator.
+    Breakdown rows (male/female, urban/rural, regions) would otherwise be mixed
+    into the national trend.
+    """
+    obs = df
+    if 'record_type' in obs.columns:
+        obs = obs[obs['record_type'] == 'observation']
+    if 'gender' in obs.columns:
+        obs = obs[obs['gender'].isna() | (obs['gender'] == 'all')]
+    if 'location' in obs.columns:
+        obs = obs[obs['location'].isna() | (obs['location'] == 'national')]
+    return obs
+
+def fit_trend_batch(history_df, target_years, series_keys=('indicator_code',)):
+    """
+    Fits a closed-form OLS trend to every series in history_df in one NumPy pass.
+
+    Observations are grouped once by `series_keys`; all per-series sums are then
+    accumulated with np.bincount, so the cost is linear in the number of rows
+    regardless of how many series there are.
+
+    Args:
+        history_df (pd.DataFrame): Rows with the key columns, 'year' and 'value_numeric'.
+        target_years (list): Years to project each trend to.
+        series_keys (tuple): Columns that identify one series.
+
+    Returns:
+        dict: 'series' (pd.Index or pd.MultiIndex of series keys), 'years',
+        and arrays 'n_obs', 'slope', 'intercept', 'rse', 'slope_se', 'x_mean',
+        'sxx' (one entry per series) plus 'projections' (series x target_years).
+        Series with fewer than two distinct years get NaN coefficients.
+    """
+    keys = list(series_keys)
+    data = history_df.dropna(subset=keys + ['year', 'value_numeric'])
+    target_years = np.asarray(target_years, dtype=float)
+
+    if len(keys) == 1:
+        codes, series = pd.factorize(data[keys[0]], sort=True)
+        series = pd.Index(np.asarray(series), name=keys[0])
+    else:
+        codes, series = pd.MultiIndex.from_frame(data[keys]).factorize(sort=True)
+    n_series = len(series)
+
+    x = data['year'].to_numpy(dtype=float)
+    y = data['value_numeric'].to_numpy(dtype=float)
+
+    n = np.bincount(codes, minlength=n_series).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Centre on the per-series means to avoid cancellation with year-sized x
+        x_mean = np.bincount(codes, weights=x, minlength=n_series) / n
+        y_mean = np.bincount(codes, weights=y, minlength=n_series) / n
+        dx = x - x_mean[codes]
+        dy = y - y_mean[codes]
+        sxx = np.bincount(codes, weights=dx * dx, minlength=n_series)
+        sxy = np.bincount(codes, weights=dx * dy, minlength=n_series)
+
+        valid = (n >= 2) & (sxx > 0)
+        slope = np.where(valid, sxy / np.where(valid, sxx, 1.0), np.nan)
+        intercept = y_mean - slope * x_mean
+
+        residuals = y - (intercept[codes] + slope[codes] * x)
+        ssr = np.bincount(codes, weights=residuals * residuals, minlength=n_series)
+        # Population std of residuals, matching np.std(residuals) in the CI logic
+        rse = np.where(valid, np.sqrt(ssr / n), np.nan)
+        dof = n - 2
+        slope_se = np.where(valid & (dof > 0), np.sqrt(ssr / np.where(dof > 0, dof, 1.0) / sxx), np.nan)
+
+    projections = intercept[:, None] + slope[:, None] * target_years[None, :]
+
+    return {
+        'series': series,
+        'years': target_years.astype(int),
+        'n_obs': n.astype(int),
+        'slope': slope,
+        'intercept': intercept,
+        'rse': rse,
+        'slope_se': slope_se,
+        'x_mean': x_mean,
+        'sxx': sxx,
+        'projections': projections,
+    }
+
+# Fitted per-series models, keyed by a fingerprint of the series and the fit settings
+MODEL_CACHE = 'data/cache/model_fits.json'
+# Bump when a model's fitting code changes, so cached fits are not reused
+MODEL_CACHE_VERSION = 3
+MAX_CACHED_FITS = 20000
+# Fewer series are fitted in-process: each pool worker pays ~1.5 s to import statsmodels
+MIN_PARALLEL_SERIES = 32
+
+# Trend models by name: fit(x, y, future_x, cap) -> dict with 'params',
+# 'fitted' (at x), 'forecast' (at future_x) and 'n_params', or None if the
+# model does not apply to the series. register_model() adds new ones.
+# Curves need more scored points (all but the first) than parameters: on
+# shorter series they interpolate the data, which only looks better than a line.
+MODELS = {}
+
+def register_model(name, min_obs=2):
+    """Decorator adding a fit function to MODELS; it is only tried on series with >= min_obs points."""
+    def decorator(fit):
+        fit.min_obs = min_obs
+        MODELS[name] = fit
+        return fit
+    return decorator
+
+@register_model('linear', min_obs=2)
+def fit_linear(x, y, future_x, cap=None):
+    slope, intercept = np.polyfit(x - x[-1], y, 1)
+    return {'params': {'intercept': intercept, 'slope': slope, 'origin': x[-1]},
+            'fitted': intercept + slope * (x - x[-1]),
+            'forecast': intercept + slope * (future_x - x[-1]),
+            'n_params': 2}
+
+def _saturation_fit(curve, linearize, x, y, future_x, cap):
+    """
+    Shared fit of a saturating curve(t, cap, a, b) with t = x - x[-1].
+
+    With a known cap (percentages) only a and b are fitted; otherwise the
+    cap is fitted too, between 1.01x and 10x the largest value. Starting
+    values come from a straight-line fit of the linearized curve.
+    """
+    from scipy.optimize import least_squares
+
+    top = y.max()
+    if (y <= 0).any() or (cap is not None and top >= cap):
+        return None
+    t, ft = x - x[-1], future_x - x[-1]
+    guess_cap = cap if cap is not None else 1.5 * top
+    b0, a0 = np.polyfit(t, linearize(y / guess_cap), 1)
+
+    if cap is None:
+        start = [guess_cap, a0, b0]
+        bounds = ([1.01 * top, -np.inf, -3.0], [10.0 * top, np.inf, 3.0])
+        model = lambda p, tt: curve(tt, p[0], p[1], p[2])
+    else:
+        start = [a0, b0]
+        bounds = ([-np.inf, -3.0], [np.inf, 3.0])
+        model = lambda p, tt: curve(tt, cap, p[0], p[1])
+    start = np.clip(start, np.asarray(bounds[0]) + 1e-6, np.asarray(bounds[1]) - 1e-6)
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        result = least_squares(lambda p: model(p, t) - y, start, bounds=bounds)
+        fitted, forecast = model(result.x, t), model(result.x, ft)
+    if not (np.isfinite(fitted).all() and np.isfinite(forecast).all()):
+        return None
+    names = (['cap'] if cap is None else []) + ['a', 'b']
+    return {'params': dict(zip(names, result.x), origin=x[-1], **({'cap': cap} if cap is not None else {})),
+            'fitted': fitted, 'forecast': forecast, 'n_params': len(start)}
+
+@register_model('logistic', min_obs=5)
+def fit_logistic(x, y, future_x, cap=None):
+    """cap / (1 + exp(-(a + b t))): symmetric S-curve towards the cap."""
+    return _saturation_fit(lambda t, c, a, b: c / (1.0 + np.exp(-(a + b * t))),
+                           lambda share: np.log(share / (1.0 - share)), x, y, future_x, cap)
+
+@register_model('gompertz', min_obs=5)
+def fit_gompertz(x, y, future_x, cap=None):
+    """cap * exp(-exp(-(a + b t))): S-curve that slows down earlier than the logistic."""
+    return _saturation_fit(lambda t, c, a, b: c * np.exp(-np.exp(-(a + b * t))),
+                           lambda share: -np.log(-np.log(share)), x, y, future_x, cap)
+
+def _annual_grid(x, y):
+    """Series on every year from the first to the last, interpolating gaps between surveys."""
+    grid = np.arange(x[0], x[-1] + 1)
+    return grid, np.interp(grid, x, y)
+
+def _survey_predictions(x, y, predict):
+    """
+    Fitted values of a model run on the annual grid: each observation is
+    predicted from the model state at the previous observation, because the
+    interpolated years in between already contain the value being predicted.
+    predict(origin, target) takes grid positions. The first observation
+    only initializes the model, so it is predicted as itself.
+    """
+    pos = (x - x[0]).astype(int)
+    return np.array([y[0]] + [predict(pos[i - 1], pos[i]) for i in range(1, len(pos))])
+
+@register_model('holt_damped', min_obs=7)
+def fit_holt_damped(x, y, future_x, cap=None):
+    """Holt's linear trend with a damped slope (statsmodels), on the annual grid."""
+    import warnings
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    grid, values = _annual_grid(x, y)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        # Least squares without the brute-force start search: same fit, a fraction of the time
+        result = ExponentialSmoothing(values, trend='add', damped_trend=True,
+                                      initialization_method='estimated').fit(method='least_squares', use_brute=False)
+    params = {name: float(result.params[name])
+              for name in ['smoothing_level', 'smoothing_trend', 'damping_trend', 'initial_level', 'initial_trend']}
+
+    # h-step forecast from the state after grid position t: l_t + (phi + ... + phi^h) b_t
+    phi = params['damping_trend']
+    def predict(origin, target):
+        h = np.arange(1, target - origin + 1)
+        return result.level[origin] + np.sum(phi ** h) * result.trend[origin]
+
+    last = len(grid) - 1
+    return {'params': params, 'fitted': _survey_predictions(x, y, predict),
+            'forecast': np.array([predict(last, last + int(year - x[-1])) if year > x[-1]
+                                  else result.fittedvalues[int(year - x[0])] for year in future_x]),
+            'n_params': 5}
+
+@register_model('arima', min_obs=4)
+def fit_arima(x, y, future_x, cap=None):
+    """
+    ARIMA(1,1,0) with drift, on the annual grid. The yearly change is
+    drift + AR(1) noise; drift is the mean change and phi the lag-1
+    autocorrelation of the changes (Yule-Walker estimates, in closed form).
+    """
+    grid, values = _annual_grid(x, y)
+    changes = np.diff(values)
+    drift = changes.mean()
+    noise = changes - drift
+    denom = np.sum(noise ** 2)
+    phi = float(np.sum(noise[1:] * noise[:-1]) / denom) if denom > 0 else 0.0
+    params = {'drift': float(drift), 'ar.L1': phi}
+
+    # From grid position t the h-step change forecast is drift + phi^h (change_t - drift)
+    def predict(origin, target):
+        h = np.arange(1, target - origin + 1)
+        last_noise = values[origin] - values[origin - 1] - drift if origin > 0 else 0.0
+        return values[origin] + np.sum(drift + phi ** h * last_noise)
+
+    last = len(grid) - 1
+    return {'params': params, 'fitted': _survey_predictions(x, y, predict),
+            'forecast': np.array([predict(last, last + int(year - x[-1])) if year > x[-1]
+                                  else values[int(year - x[0])] for year in future_x]),
+            'n_params': 2}
+
+def aic(residuals, n_params):
+    """AIC of a Gaussian fit from its residuals; the error variance counts as a parameter."""
+    n = len(residuals)
+    # Floored so an exact fit (e.g. a line through two points) stays finite
+    sse = max(float(np.sum(np.square(residuals))), 1e-12 * n)
+    return n * np.log(sse / n) + 2 * (n_params + 1)
+
+def _try_fit(name, x, y, future_x, cap):
+    if len(x) < MODELS[name].min_obs:
+        return None
     try:
-        df, matrix = load_data()
-    except FileNotFoundError as e:
-        print(e)
-        return
+        return MODELS[name](x, y, future_x, cap)
+    except (ValueError, np.linalg.LinAlgError):
+        return None
 
-    # Filter for Account Ownership
-    target_indicator = 'ACC_OWNERSHIP'
-    history = df[df['indicator_code'] == target_indicator].sort_values('year')
-    
-    if history.empty:
-        print(f"No history found for {target_indicator}")
+def select_model(x, y, future_x, cap=None, candidates=None, selection='aic', holdout=1):
+    """
+    Fits every candidate model to one series and keeps the best one.
+
+    Args:
+        x, y (np.ndarray): Observation years (sorted, distinct) and values.
+        future_x (np.ndarray): Years to forecast.
+        cap (float): Known ceiling of the indicator (100 for percentages).
+        candidates (list): Model names (all of MODELS by default).
+        selection (str): 'aic' (AIC of the in-sample fit) or 'backtest'
+            (mean absolute error on the last `holdout` points, fitting on
+            the earlier ones; falls back to AIC if too few points remain).
+        holdout (int): Points held out by 'backtest'.
+
+    Returns:
+        dict: 'model', 'params', 'forecast', 'rse' (std of the in-sample
+        residuals), 'n_obs' and the 'scores' of every candidate; None if
+        no candidate could be fitted.
+    """
+    candidates = list(candidates or MODELS)
+    x, y, future_x = (np.asarray(a, dtype=float) for a in (x, y, future_x))
+    fits = {name: _try_fit(name, x, y, future_x, cap) for name in candidates}
+    fits = {name: fit for name, fit in fits.items() if fit is not None}
+    if not fits:
+        return None
+
+    # The first point is left out of every model's AIC: it only initializes the grid models
+    scores = {name: aic(y[1:] - fit['fitted'][1:], fit['n_params']) for name, fit in fits.items()}
+    if selection == 'backtest' and len(x) - holdout >= 2:
+        for name in fits:
+            past = _try_fit(name, x[:-holdout], y[:-holdout], x[-holdout:], cap)
+            scores[name] = np.inf if past is None else float(np.mean(np.abs(past['forecast'] - y[-holdout:])))
+    elif selection not in ('aic', 'backtest'):
+        raise ValueError(f"Unknown model selection: {selection}")
+
+    # Ties keep the candidate order, simplest first
+    best = min(fits, key=lambda name: (scores[name], candidates.index(name)))
+    fit = fits[best]
+    return {
+        'model': best,
+        'params': {k: float(v) for k, v in fit['params'].items()},
+        'forecast': [float(v) for v in fit['forecast']],
+        'rse': float(np.std(y - fit['fitted'])),
+        'n_obs': len(x),
+        'scores': {name: (None if np.isinf(s) else float(s)) for name, s in scores.items()},
+    }
+
+def _select_model_task(task):
+    """Worker task: select_model() on one series."""
+    return select_model(*task)
+
+def series_fingerprint(x, y, future_x, cap, candidates, selection, holdout):
+    """Hash of one series and the fit settings; the key of its cached fit."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([MODEL_CACHE_VERSION, cap, list(candidates), selection, holdout]).encode())
+    for values in (x, y, future_x):
+        digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return digest.hexdigest()
+
+def _load_model_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt cache only costs a refit
+        return {}
+
+def _save_model_cache(path, cache):
+    if len(cache) > MAX_CACHED_FITS:
+        # Drop the least recently used fits
+        recent = sorted(cache, key=lambda key: cache[key]['used'])[-MAX_CACHED_FITS:]
+        cache = {key: cache[key] for key in recent}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+def fit_models(points, future_years, candidates=None, selection='aic', holdout=1, caps=None,
+               workers=None, cache_path=MODEL_CACHE):
+    """
+    Model selection for every series of `points`, in parallel.
+
+    Series whose data and settings match a fit in the disk cache are not
+    refitted; the others are spread over a process pool (workers=1, or
+    fewer than MIN_PARALLEL_SERIES series, fits in the current process).
+
+    Args:
+        points (pd.DataFrame): 'indicator_code', 'year', 'value_numeric', one row per series and year.
+        future_years (list): Forecast years.
+        candidates (list): Model names (all of MODELS by default).
+        selection (str): 'aic' or 'backtest' (see select_model).
+        holdout (int): Points held out by 'backtest'.
+        caps (dict): Known ceiling per indicator_code.
+        workers (int): Process pool size.
+        cache_path (str): JSON cache of fitted models; None disables it.
+
+    Returns:
+        dict: 'series' (pd.Index), 'model', 'projections' (series x
+        future_years), 'rse', 'n_obs' and 'params' / 'scores' (lists of
+        dicts). Series no model could fit are left out.
+    """
+    candidates = list(candidates or MODELS)
+    unknown = [name for name in candidates if name not in MODELS]
+    if unknown:
+        raise ValueError(f"Unknown models: {unknown}")
+    caps = caps or {}
+    future_x = np.asarray(future_years, dtype=float)
+
+    points = points.sort_values(['indicator_code', 'year'])
+    series = pd.Index(points['indicator_code'].unique())
+    groups = points.groupby('indicator_code', sort=False)
+    tasks = [(g['year'].to_numpy(dtype=float), g['value_numeric'].to_numpy(dtype=float), future_x,
+              caps.get(code), candidates, selection, holdout) for code, g in groups]
+    keys = [series_fingerprint(*task) for task in tasks]
+
+    cache = _load_model_cache(cache_path)
+    todo = [i for i, key in enumerate(keys) if key not in cache]
+    if todo:
+        print(f"Fitting {len(candidates)} models to {len(todo)} series ({len(keys) - len(todo)} cached)")
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(todo) < MIN_PARALLEL_SERIES:
+            results = list(map(_select_model_task, [tasks[i] for i in todo]))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                results = list(pool.map(_select_model_task, [tasks[i] for i in todo],
+                                        chunksize=max(len(todo) // (4 * workers), 1)))
+        for i, result in zip(todo, results):
+            cache[keys[i]] = {'fit': result}
+
+    now = time.time()
+    fits = []
+    for key in keys:
+        cache[key]['used'] = now
+        fits.append(cache[key]['fit'])
+    if cache_path:
+        _save_model_cache(cache_path, cache)
+
+    fitted = [i for i, fit in enumerate(fits) if fit is not None]
+    fits = [fits[i] for i in fitted]
+    return {
+        'series': series[fitted],
+        'model': np.array([fit['model'] for fit in fits], dtype=object),
+        'projections': np.array([fit['forecast'] for fit in fits], dtype=float).reshape(len(fits), len(future_x)),
+        'rse': np.array([fit['rse'] for fit in fits], dtype=float),
+        'n_obs': np.array([fit['n_obs'] for fit in fits], dtype=int),
+        'params': [fit['params'] for fit in fits],
+        'scores': [fit['scores'] for fit in fits],
+    }
+
+@instrumented('baseline_fit')
+def fit_national_baselines(df, future_years, models=None, selection='aic', workers=None, cache_path=MODEL_CACHE):
+    """
+    Fits the national trend of every indicator and returns a dict with
+    'indicators', 'base_pred' (indicators x future_years), the 95% CI
+    half-width 'ci_95' and 'n_obs'. Only series with a fitted trend are kept.
+
+    By default every trend is a straight line (one fit_trend_batch pass), and
+    the dict also has the trend 'slope' / 'intercept'. Given a list of
+    `models` (names in MODELS), the best of them per indicator is chosen by
+    fit_models() instead, and 'model' names the chosen one.
+    """
+    history = national_series(add_year_column(df))
+    if models is not None:
+        return _fit_selected_baselines(history, future_years, models, selection, workers, cache_path)
+
+    fit = fit_trend_batch(history, future_years)
+    fitted = ~np.isnan(fit['slope'])
+
+    if 'ACC_OWNERSHIP' not in fit['series'][fitted]:
+        print("No history found for ACC_OWNERSHIP")
         # Build dummy history for robustness if file is empty but exists
-        history = pd.DataFrame({
+        dummy = pd.DataFrame({
+             'indicator_code': 'ACC_OWNERSHIP',
              'year': [2011, 2014, 2017, 2021],
              'value_numeric': [22, 22, 35, 46]
         })
+        history = pd.concat([history, dummy], ignore_index=True)
+        fit = fit_trend_batch(history, future_years)
+        fitted = ~np.isnan(fit['slope'])
         print("Using dummy history.")
-    
-    print(f"Historical Data Points: {len(history)}")
-    
-    # Calculate RSE for CI
-    # Pre-calc to use in loop
-    X = history[['year']].values.reshape(-1, 1)
-    y = history['value_numeric'].values
-    model_rse = LinearRegression()
-    model_rse.fit(X, y)
-    residuals = y - model_rse.predict(X)
-    rse = np.std(residuals)
-    ci_95 = 1.96 * rse if len(history) > 2 else 2.0
-    
-    future_years = [2025, 2026, 2027]
-    scenarios = ['Base', 'Optimistic', 'Pessimistic']
-    
+
+    n_obs = fit['n_obs'][fitted]
+    return {
+        'indicators': fit['series'][fitted],
+        'base_pred': fit['projections'][fitted],
+        # CI from the residual spread of each series
+        'ci_95': np.where(n_obs > 2, 1.96 * fit['rse'][fitted], 2.0),
+        'n_obs': n_obs,
+        'slope': fit['slope'][fitted],
+        'intercept': fit['intercept'][fitted],
+    }
+
+def indicator_caps(history):
+    """Ceiling of 100 for every indicator whose most common unit is '%'."""
+    if 'unit' not in history.columns:
+        return {}
+    counts = (history.dropna(subset=['indicator_code', 'unit']).astype({'indicator_code': str, 'unit': str})
+              .groupby(['indicator_code', 'unit']).size().sort_values(ascending=False, kind='stable'))
+    units = counts.reset_index().drop_duplicates('indicator_code').set_index('indicator_code')['unit']
+    return {code: 100.0 for code in units.index[units == '%']}
+
+def _fit_selected_baselines(history, future_years, models, selection, workers, cache_path):
+    points = history.dropna(subset=['indicator_code', 'year', 'value_numeric'])
+    points = points.assign(indicator_code=points['indicator_code'].astype(str), year=points['year'].astype(int))
+    # One point per year, so every model sees the same series
+    points = points.groupby(['indicator_code', 'year'], as_index=False)['value_numeric'].mean()
+
+    fit = fit_models(points, future_years, models, selection, caps=indicator_caps(history),
+                     workers=workers, cache_path=cache_path)
+    return {
+        'indicators': fit['series'],
+        'base_pred': fit['projections'],
+        'ci_95': np.where(fit['n_obs'] > 2, 1.96 * fit['rse'], 2.0),
+        'n_obs': fit['n_obs'],
+        'model': fit['model'],
+    }
+
+@instrumented('shock_application')
+def scenario_forecast(base_pred, shock_index, indicators, future_years, scenario='Base', multiplier=None):
+    """
+    Trend + cumulative event shocks for one scenario.
+
+    Args:
+        base_pred (np.ndarray): Trend projections, indicators x future_years.
+        shock_index (ShockIndex): Prebuilt event shock index.
+        indicators (list): Indicator codes matching the rows of base_pred.
+        future_years (list): Forecast years.
+        scenario (str): Sets the flat adjustment and, unless `multiplier`
+            is given, the event multiplier.
+        multiplier (float): Optional custom event impact multiplier.
+
+    Returns:
+        np.ndarray: Forecasts, indicators x future_years.
+    """
+    # Additional Scenario tweaks on top of the event shocks
+    cumulative_shock_carryover = shock_index.cumulative(
+        future_years, scenario, indicators,
+        adjustment=SCENARIO_ADJUSTMENTS.get(scenario, 0.0), multiplier=multiplier)
+    return base_pred + cumulative_shock_carryover.T
+
+def forecast_scenarios(df, matrix, future_years=FUTURE_YEARS, scenarios=SCENARIOS, models=None, selection='aic',
+                       workers=None):
+    """
+    Trend + shock forecasts of every indicator in every scenario, each
+    trend chosen among `models` (all of MODELS by default) by `selection`
+    ('aic' or 'backtest').
+
+    Returns:
+        pd.DataFrame: 'Scenario', 'Indicator', 'Model', 'Year',
+        'Predicted_Value', 'Lower_CI', 'Upper_CI'.
+    """
+    future_years = list(future_years)
+    baselines = fit_national_baselines(df, future_years, models=list(models or MODELS), selection=selection,
+                                       workers=workers)
+    indicators = baselines['indicators']
+    base_pred = baselines['base_pred']
+    ci_95 = baselines['ci_95']
+    print(f"Indicators with a fitted trend: {len(indicators)} ({baselines['n_obs'].sum()} data points)")
+    chosen = pd.Series(baselines['model']).value_counts()
+    print("Selected models: " + ", ".join(f"{name} ({count})" for name, count in chosen.items()))
+
+    # Event shocks keyed on each event's observation_date
+    shock_index = ShockIndex.build(matrix, df)
+
     results = []
     
     for sc in scenarios:
-        cumulative_shock_carryover = 0.0
-        
-        for i, year in enumerate(future_years):
-            base_pred, _ = calculate_baseline(history, year)
-            
-            # Current year shock
-            current_shock = apply_shocks(year, matrix, target_indicator, sc)
-            
-            # Additional Scenario tweaks
-            if sc == 'Optimistic':
-                current_shock += 1.0 
-            elif sc == 'Pessimistic':
-                current_shock -= 1.0
-                
-            cumulative_shock_carryover += current_shock
-            
-            final_pred = base_pred + cumulative_shock_carryover
-            
-            results.append({
-                'Scenario': sc,
-                'Year': year,
-                'Predicted_Ownership': round(final_pred, 2),
-                'Lower_CI': round(final_pred - ci_95, 2),
-                'Upper_CI': round(final_pred + ci_95, 2)
-            })
-
-    results_df = pd.DataFrame(results)
+        final_pred = scenario_forecast(base_pred, shock_index, indicators, future_years, sc)
+
+        results.append(pd.DataFrame({
+            'Scenario': sc,
+            'Indicator': np.repeat(np.asarray(indicators), len(future_years)),
+            'Model': np.repeat(baselines['model'], len(future_years)),
+            'Year': np.tile(future_years, len(indicators)),
+            'Predicted_Value': final_pred.ravel().round(2),
+            'Lower_CI': (final_pred - ci_95[:, None]).ravel().round(2),
+            'Upper_CI': (final_pred + ci_95[:, None]).ravel().round(2)
+        }))
+
+    return pd.concat(results, ignore_index=True)
+
+def forecast_params(future_years=FUTURE_YEARS, scenarios=SCENARIOS, models=None, selection='aic'):
+    """Everything besides the inputs that determines forecast_scenarios()' result."""
+    return {
+        'future_years': list(future_years),
+        'scenarios': list(scenarios),
+        'models': list(models or MODELS),
+        'selection': selection,
+        'model_version': MODEL_CACHE_VERSION,
+        'scenario_adjustments': SCENARIO_ADJUSTMENTS,
+        'scenario_multipliers': SCENARIO_MULTIPLIERS,
+    }
+
+def forecast_key(params):
+    """Result store key of the forecasts for the current enriched data and event matrix."""
+    return result_key(input_version(STORE_PATH, ENRICHED_CSV), input_version(MATRIX_NPZ, MATRIX_CSV), params)
+
+def cached_forecast_results(future_years=FUTURE_YEARS, scenarios=SCENARIOS, models=None, selection='aic',
+                            workers=None, compute=True):
+    """
+    The scenario forecasts for the current inputs from the result store
+    (see src/result_store.py), computed and stored on a miss. With
+    compute=False a miss returns None instead.
+    """
+    params = forecast_params(future_years, scenarios, models, selection)
+    key = forecast_key(params)
+
+    def run():
+        df, matrix = load_data()
+        return forecast_scenarios(df, matrix, future_years, scenarios, models, selection, workers)
+
+    if not compute:
+        return get_result(key)
+    results_df, hit = cached(key, run, meta={'kind': 'forecast_scenarios', 'params': params})
+    if hit:
+        print(f"Using cached forecast results ({key[:12]})")
+    return results_df
+
+def run_forecasting_scenarios(models=None, selection='aic', workers=None):
+    """
+    Writes the scenario forecasts of every indicator (see forecast_scenarios),
+    reusing the stored result when the inputs and parameters are unchanged.
+    """
+    print("--- Starting Forecasting (Trend + Shocks) ---")
+    
+    try:
+        results_df = cached_forecast_results(models=models, selection=selection, workers=workers)
+    except FileNotFoundError as e:
+        print(e)
+        return
+
     print("\n--- Forecasting Results (2025-2027) ---")
-    print(results_df)
+    print(results_df[results_df['Indicator'] == 'ACC_OWNERSHIP'])
     
-    output_path = 'data/processed/forecasting_results.csv'
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    results_df.to_csv(output_path, index=False)
-    print(f"\nSaved to {output_path}")
+    os.makedirs(os.path.dirname(FORECAST_PATH), exist_ok=True)
+    # Written aside and renamed, so the dashboard's watcher never reads a partial file
+    tmp_path = FORECAST_PATH + '.tmp'
+    results_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, FORECAST_PATH)
+    print(f"\nSaved to {FORECAST_PATH}")
 
 if __name__ == "__main__":
-    run_forecasting_scenarios()
\ No newline at end of file
+    run_forecasting_scenarios()
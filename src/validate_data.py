@@ -1,133 +1,257 @@
-import pandas as pd
-import sys
+import argparse
+import json
 import os
-from dateutil import parser
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Temporal range of the Findex-era data
+MIN_YEAR, MAX_YEAR = 2011, 2024
+
+# Offender indexes listed per rule in the report (the count is always exact)
+MAX_OFFENDERS = 10000
+
+class Rule:
+    """
+    A vectorized validation rule.
+
+    `check(chunk, state)` returns a boolean offender mask for the chunk, or
+    None when the chunk lacks the columns the rule needs. Rules that need
+    the whole file (e.g. referential integrity) collect what they need in
+    `state` and report through `finalize(state)`, which returns offender
+    row indexes.
+    """
+
+    def __init__(self, name, description, columns, check, finalize=None):
+        self.name = name
+        self.description = description
+        self.columns = columns
+        self.check = check
+        self.finalize = finalize
+
+RULES = {}
+
+def register_rule(name, description, columns, finalize=None):
+    """Decorator adding a check function to the rule registry."""
+    def decorator(check):
+        RULES[name] = Rule(name, description, columns, check, finalize)
+        return check
+    return decorator
+
+@register_rule('missing_value_numeric', "Observations must have a 'value_numeric'.",
+               columns=['record_type', 'value_numeric'])
+def check_missing_value(chunk, state):
+    if 'value_numeric' not in chunk.columns:
+        return None
+    return (chunk['record_type'] == 'observation') & chunk['value_numeric'].isnull()
+
+@register_rule('event_pillar_neutral', "Events should be neutral (no pillar assigned).",
+               columns=['record_type', 'pillar'])
+def check_event_pillar(chunk, state):
+    if 'pillar' not in chunk.columns:
+        return None
+    return (chunk['record_type'] == 'event') & chunk['pillar'].notnull()
+
+@register_rule('temporal_range', f"'year' / 'date' must fall within {MIN_YEAR}-{MAX_YEAR}.",
+               columns=['year', 'date'])
+def check_temporal_range(chunk, state):
+    mask = None
+    if 'year' in chunk.columns:
+        year = pd.to_numeric(chunk['year'], errors='coerce')
+        mask = year.notnull() & ~year.between(MIN_YEAR, MAX_YEAR)
+    if 'date' in chunk.columns:
+        # Unparseable dates count as out of range
+        dates = pd.to_datetime(chunk['date'], format='mixed', errors='coerce')
+        date_mask = chunk['date'].notnull() & ~dates.dt.year.between(MIN_YEAR, MAX_YEAR)
+        mask = date_mask if mask is None else mask | date_mask
+    return mask
+
+def _unknown_parents(state):
+    refs = state.get('link_refs', [])
+    if not refs:
+        return np.array([], dtype=np.int64)
+    index = np.concatenate([r[0] for r in refs])
+    parents = np.concatenate([r[1] for r in refs])
+    known = np.isin(parents, np.array(sorted(state['event_ids']), dtype=object))
+    return index[~known]
+
+@register_rule('referential_integrity', "Impact links must reference an existing event.",
+               columns=['record_type', 'record_id', 'parent_id'], finalize=_unknown_parents)
+def check_link_parents(chunk, state):
+    if 'parent_id' not in chunk.columns:
+        return None
+    is_event = (chunk['record_type'] == 'event').to_numpy()
+    is_link = (chunk['record_type'] == 'impact_link').to_numpy()
+
+    # Event ids may live in parent_id (enrichment) or record_id (starter data)
+    event_ids = chunk['parent_id'][is_event]
+    if 'record_id' in chunk.columns:
+        event_ids = event_ids.fillna(chunk['record_id'][is_event])
+    state.setdefault('event_ids', set()).update(event_ids.dropna().astype(str).str.strip())
+
+    parents = chunk['parent_id'][is_link].astype(str).str.strip()
+    state.setdefault('link_refs', []).append((chunk.index[is_link].to_numpy(), parents.to_numpy(dtype=object)))
+    return None
+
+def iter_chunks(file_path, columns=None, chunksize=100000):
+    """
+    Yields DataFrame chunks of a CSV, Parquet (file or dataset directory) or
+    XLSX file. Chunk indexes are absolute row positions in the file.
+    """
+    wanted = None if columns is None else set(columns)
+
+    if file_path.endswith('.csv'):
+        usecols = None if wanted is None else (lambda c: c in wanted)
+        yield from pd.read_csv(file_path, usecols=usecols, chunksize=chunksize)
+        return
 
-def validate_dataset(file_path):
+    # Arrow is only loaded for the formats that need it (CSV checks stay light)
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from src.ingest_cache import sheet_arrow_path
+
+    if file_path.endswith('.parquet') or os.path.isdir(file_path):
+        dataset = ds.dataset(file_path, format='parquet', partitioning='hive')
+        names = dataset.schema.names if wanted is None else [c for c in dataset.schema.names if c in wanted]
+        batches = dataset.to_batches(columns=names, batch_size=chunksize)
+    elif file_path.endswith('.xlsx'):
+        # The Excel workbook is converted once to Arrow by the ingestion cache
+        reader = pa.ipc.open_file(pa.memory_map(sheet_arrow_path(file_path)))
+        names = reader.schema.names if wanted is None else [c for c in reader.schema.names if c in wanted]
+        batches = (reader.get_batch(i).select(names) for i in range(reader.num_record_batches))
+    else:
+        raise ValueError("Unsupported file format. Please use .csv, .parquet or .xlsx")
+
+    offset = 0
+    for batch in batches:
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+def validate_dataset(file_path, rules=None, chunksize=100000, verbose=True):
     """
-    Validates the Ethiopia Financial Inclusion Unified Dataset.
+    Validates the Ethiopia Financial Inclusion Unified Dataset in a single
+    chunked pass with every registered rule.
+
+    Args:
+        file_path (str): CSV, Parquet or XLSX file.
+        rules (list): Rule names to run (all registered rules by default).
+        chunksize (int): Rows per chunk.
+        verbose (bool): Print a [PASS]/[FAIL] summary.
+
+    Returns:
+        dict: Report with per-rule status, offender count and row indexes.
     """
-    print(f"Validating file: {file_path}")
-    
-    # Check if file exists
     if not os.path.exists(file_path):
-        print(f"Error: File not found at {file_path}")
-        sys.exit(1)
-
-    # Load data
-    try:
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file_path.endswith('.xlsx'):
-            df = pd.read_excel(file_path)
+        raise FileNotFoundError(f"File not found at {file_path}")
+
+    active = [RULES[name] for name in (rules or RULES)]
+    columns = sorted({col for rule in active for col in rule.columns})
+
+    state = {rule.name: {} for rule in active}
+    offenders = {rule.name: [] for rule in active}
+    applicable = {rule.name: False for rule in active}
+    n_rows = 0
+
+    for chunk in iter_chunks(file_path, columns, chunksize):
+        n_rows += len(chunk)
+        for rule in active:
+            mask = rule.check(chunk, state[rule.name])
+            if mask is not None:
+                offenders[rule.name].append(chunk.index[np.asarray(mask, dtype=bool)].to_numpy())
+            if mask is not None or (rule.finalize is not None and state[rule.name]):
+                applicable[rule.name] = True
+
+    results = {}
+    for rule in active:
+        found = offenders[rule.name]
+        if rule.finalize is not None and applicable[rule.name]:
+            found.append(np.asarray(rule.finalize(state[rule.name]), dtype=np.int64))
+        rows = np.sort(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+        if not applicable[rule.name]:
+            status = 'skipped'
         else:
-            print("Error: Unsupported file format. Please use .csv or .xlsx")
-            sys.exit(1)
-    except Exception as e:
-        print(f"Error loading file: {e}")
-        sys.exit(1)
-
-    print(f"Loaded {len(df)} records.\n")
-    
-    issues_found = 0
-
-    # 1. Check for Missing Values in value_numeric
-    # Only applies to 'observation' and 'impact_link' types where value is expected? 
-    # The prompt says "Missing values in value_numeric", implying generally.
-    # However, 'event' records might not have 'value_numeric' if strictly descriptive, 
-    # but based on schema, value_numeric for events might be null.
-    # Let's check based on record_type
-    
-    # According to README:
-    # Observations: Must include value_numeric
-    # Impact Links: Contain magnitude/confidence/lag, might use value_numeric for magnitude? 
-    # The schema usually has 'value_numeric' for observations.
-    
-    missing_val_obs = df[
-        (df['record_type'] == 'observation') & 
-        (df['value_numeric'].isnull())
-    ]
-    
-    if not missing_val_obs.empty:
-        print(f"[FAIL] Found {len(missing_val_obs)} observations with missing 'value_numeric'.")
-        print(missing_val_obs[['record_id', 'record_type', 'indicator_code']])
-        issues_found += 1
-    else:
-        print("[PASS] No missing 'value_numeric' in observations.")
-
-    # 2. Logic Check: Event types must not have a pillar assigned
-    event_pillar_issues = df[
-        (df['record_type'] == 'event') & 
-        (df['pillar'].notnull())
-    ]
-    
-    if not event_pillar_issues.empty:
-        print(f"[FAIL] Found {len(event_pillar_issues)} events with a assigned pillar (Events should be neutral).")
-        print(event_pillar_issues[['record_id', 'event_name', 'pillar']])
-        issues_found += 1
-    else:
-        print("[PASS] All events have empty pillar assignment.")
-
-    # 3. Temporal Range Check (2011-2024)
-    # Check 'year' column if it exists, or parse 'date'
-    
-    invalid_date_records = []
-    
-    if 'year' in df.columns:
-        # Check year column directly
-        out_of_range = df[
-            (df['year'].notnull()) & 
-            (~df['year'].between(2011, 2024))
-        ]
-        if not out_of_range.empty:
-             print(f"[FAIL] Found {len(out_of_range)} records with year outside 2011-2024.")
-             invalid_date_records.extend(out_of_range['record_id'].tolist())
-             issues_found += 1
-    
-    if 'date' in df.columns:
-        # Check date column
-        # Filter for non-null dates
-        dates = df[df['date'].notnull()].copy()
-        
-        # Function to parse and check year
-        def check_year(d):
-            try:
-                dt = pd.to_datetime(d)
-                return 2011 <= dt.year <= 2024
-            except:
-                return False # Invalid format is also a fail, but here specifically range check
-
-        # This is a bit safer if mixed formats
-        dates['is_valid_range'] = pd.to_datetime(dates['date'], errors='coerce').dt.year.between(2011, 2024)
-        
-        out_of_range_dates = dates[~dates['is_valid_range']]
-        
-        if not out_of_range_dates.empty:
-            print(f"[FAIL] Found {len(out_of_range_dates)} records with date outside 2011-2024.")
-            # print(out_of_range_dates[['record_id', 'date']])
-            issues_found += 1
+            status = 'pass' if len(rows) == 0 else 'fail'
+        results[rule.name] = {
+            'description': rule.description,
+            'status': status,
+            'count': int(len(rows)),
+            'offenders': rows[:MAX_OFFENDERS].tolist(),
+        }
+
+    report = {
+        'file': file_path,
+        'rows': n_rows,
+        'passed': all(r['status'] != 'fail' for r in results.values()),
+        'rules': results,
+    }
+    if verbose:
+        print_report(report)
+    return report
+
+def _validate_quietly(args):
+    file_path, chunksize = args
+    return validate_dataset(file_path, chunksize=chunksize, verbose=False)
+
+def validate_files(file_paths, chunksize=100000, workers=None):
+    """Validates several files in parallel, one process per file."""
+    if len(file_paths) == 1:
+        return [validate_dataset(file_paths[0], chunksize=chunksize, verbose=False)]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_validate_quietly, [(path, chunksize) for path in file_paths]))
+
+def print_report(report):
+    print(f"Validating file: {report['file']}")
+    print(f"Checked {report['rows']} records.\n")
+    for name, result in report['rules'].items():
+        if result['status'] == 'pass':
+            print(f"[PASS] {name}: {result['description']}")
+        elif result['status'] == 'fail':
+            print(f"[FAIL] {name}: {result['count']} offending rows. {result['description']}")
+            print(f"       rows: {result['offenders'][:20]}{' ...' if result['count'] > 20 else ''}")
         else:
-             print("[PASS] All dates are within 2011-2024 range.")
-    
-    if not ('year' in df.columns or 'date' in df.columns):
-        print("[WARN] No 'year' or 'date' column found to validate temporal range.")
-    
-    if issues_found == 0:
-        print("\n\u2705 Dataset validation passed successfully!")
+            print(f"[WARN] {name}: required columns not found, rule skipped.")
+
+    if report['passed']:
+        print("\n✅ Dataset validation passed successfully!")
     else:
-        print(f"\n\u274c Dataset validation failed with {issues_found} issues.")
+        failed = sum(r['status'] == 'fail' for r in report['rules'].values())
+        print(f"\n❌ Dataset validation failed with {failed} issues.")
 
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate unified-format data files.")
     # Default path, but can be overridden
-    default_path = "data/raw/ethiopia_fi_unified_data.xlsx"
-    
-    if len(sys.argv) > 1:
-        target_file = sys.argv[1]
-    else:
-        target_file = default_path
-        
-    # Adjust for script location if running from root
-    if not os.path.exists(target_file) and os.path.exists(os.path.join("..", target_file)):
-         target_file = os.path.join("..", target_file)
+    parser.add_argument('files', nargs='*', default=["data/raw/ethiopia_fi_unified_data.xlsx"])
+    parser.add_argument('--output', help="Write the JSON report to this path.")
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    files = []
+    for target_file in args.files:
+        # Adjust for script location if running from root
+        if not os.path.exists(target_file) and os.path.exists(os.path.join("..", target_file)):
+            target_file = os.path.join("..", target_file)
+        if not os.path.exists(target_file):
+            print(f"Error: File not found at {target_file}")
+            return 1
+        files.append(target_file)
+
+    reports = validate_files(files, chunksize=args.chunksize, workers=args.workers)
+    for report in reports:
+        print_report(report)
+        print()
 
-    validate_dataset(target_file)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+    return 0 if all(report['passed'] for report in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
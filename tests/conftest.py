@@ -0,0 +1,10 @@
+import pytest
+
+import src.instrumentation as instrumentation
+
+@pytest.fixture(autouse=True)
+def metrics_log(tmp_path, monkeypatch):
+    """Keeps stage metrics written by tests out of data/processed."""
+    path = str(tmp_path / 'metrics.jsonl')
+    monkeypatch.setattr(instrumentation, 'METRICS_PATH', path)
+    return path
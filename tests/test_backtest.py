@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest import observed_points, run_backtest, summarize_backtest
+from src.task4_forecasting import fit_models
+
+@pytest.fixture
+def records():
+    years = [2011, 2014, 2017, 2021, 2024]
+    obs = pd.DataFrame({
+        'record_type': 'observation',
+        'indicator_code': ['LINEAR'] * 5 + ['SHOCKED'] * 5,
+        'value_numeric': [10 + 2 * (y - 2011) for y in years] + [5 + (y - 2011) + (10 if y >= 2021 else 0) for y in years],
+        'observation_date': [f'{y}-12-31' for y in years] * 2,
+        'gender': 'all',
+    })
+    event = pd.DataFrame({'record_type': ['event'], 'record_id': ['EVT_1'], 'indicator': ['Reform'],
+                          'observation_date': ['2019-06-01']})
+    return pd.concat([obs, event], ignore_index=True)
+
+def test_backtest_replays_trend_and_shocks(records):
+    matrix = pd.DataFrame({'SHOCKED': [10.0]}, index=['Reform'])
+    results = run_backtest(records, matrix, workers=1, cache_path=None)
+
+    # 2011 and 2014 are enough history for the 2014 origin
+    assert set(results['Cutoff']) == {2014, 2017, 2021}
+    linear = results[results['Indicator'] == 'LINEAR']
+    assert np.allclose(linear['Abs_Error'], 0)
+    assert linear['Covered'].all()
+
+    # The 2019 event is applied to forecasts from the 2014 and 2017 origins only
+    shocked = results[results['Indicator'] == 'SHOCKED'].set_index(['Cutoff', 'Year'])
+    assert shocked.loc[(2017, 2021), 'Abs_Error'] == pytest.approx(0.0)
+    assert shocked.loc[(2017, 2024), 'Abs_Error'] == pytest.approx(0.0)
+
+    no_events = run_backtest(records, pd.DataFrame(), workers=1, cache_path=None)
+    assert no_events.set_index(['Indicator', 'Cutoff', 'Year']).loc[('SHOCKED', 2017, 2021), 'Error'] == pytest.approx(-10.0)
+
+def test_backtest_replays_the_selected_model(records):
+    results = run_backtest(records, pd.DataFrame(), cutoffs=(2017,), workers=1, cache_path=None)
+    points = observed_points(records)
+    fit = fit_models(points[points['year'] <= 2017], [2021, 2024], workers=1, cache_path=None)
+
+    expected = pd.DataFrame(fit['projections'], index=fit['series'], columns=[2021, 2024]).stack()
+    predicted = results.set_index(['Indicator', 'Year'])['Predicted']
+    assert np.allclose(predicted, expected.loc[predicted.index])
+
+def test_backtest_is_independent_of_workers(records, monkeypatch):
+    matrix = pd.DataFrame({'SHOCKED': [10.0]}, index=['Reform'])
+    serial = run_backtest(records, matrix, workers=1, cache_path=None)
+    monkeypatch.setattr('src.task4_forecasting.MIN_PARALLEL_SERIES', 2)
+    parallel = run_backtest(records, matrix, workers=2, cache_path=None)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+def test_summarize_backtest(records):
+    results = run_backtest(records, pd.DataFrame(), workers=1, cache_path=None)
+    summary = summarize_backtest(results).set_index('Cutoff')
+
+    assert summary.loc['All', 'N'] == len(results)
+    assert summary.loc['All', 'MAE'] == pytest.approx(results['Abs_Error'].mean())
+    assert summary.loc[2021, 'Coverage'] == pytest.approx(results.loc[results['Cutoff'] == 2021, 'Covered'].mean())
+
+def test_observed_points_averages_national_series(records):
+    extra = pd.DataFrame({'record_type': 'observation', 'indicator_code': ['LINEAR', 'LINEAR'],
+                          'value_numeric': [20.0, 99.0], 'observation_date': ['2011-06-30', '2011-06-30'],
+                          'gender': ['all', 'female']})
+    points = observed_points(pd.concat([records, extra], ignore_index=True))
+    assert points.set_index(['indicator_code', 'year']).loc[('LINEAR', 2011), 'value_numeric'] == 15.0
@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+
+from src.benchmarks import compare_to_baseline, run_benchmarks
+from src.ingest_cache import read_workbook
+from src.synthetic_data import UNIFIED_COLUMNS, generate_unified_dataset, write_synthetic_workspace
+
+def test_generate_unified_dataset_schema_and_determinism():
+    df = generate_unified_dataset(n_observations=500, n_events=10, n_indicators=5, links_per_event=2, seed=1)
+
+    assert list(df.columns) == UNIFIED_COLUMNS
+    assert df['record_type'].value_counts().to_dict() == {'observation': 500, 'impact_link': 20, 'event': 10}
+    assert df.loc[df['record_type'] == 'observation', 'indicator_code'].nunique() <= 5
+    links = df[df['record_type'] == 'impact_link']
+    assert set(links['parent_id']) <= set(df.loc[df['record_type'] == 'event', 'record_id'])
+
+    again = generate_unified_dataset(n_observations=500, n_events=10, n_indicators=5, links_per_event=2, seed=1)
+    pd.testing.assert_frame_equal(df, again)
+
+def test_synthetic_workspace_reads_through_cache(tmp_path):
+    df = generate_unified_dataset(n_observations=50, n_events=3, n_indicators=2)
+    path = write_synthetic_workspace(str(tmp_path), df)
+
+    loaded = read_workbook(path, cache_dir=os.path.join(str(tmp_path), 'data', 'cache'))
+    assert len(loaded) == len(df)
+    assert list(loaded.columns) == UNIFIED_COLUMNS
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {'tiny': {'stages': {
+        'matrix': {'seconds': 1.0, 'peak_mb': 10.0},
+        'forecast': {'seconds': 1.0, 'peak_mb': 10.0},
+    }}}
+    results = {'scale': 'tiny', 'stages': {
+        'matrix': {'seconds': 1.1, 'peak_mb': 20.0},    # memory regression only
+        'forecast': {'seconds': 2.0, 'peak_mb': 10.0},  # time regression only
+        'enrich': {'seconds': 9.0, 'peak_mb': 90.0},    # no baseline, ignored
+    }}
+
+    regressions = compare_to_baseline(results, baseline)
+    assert sorted((name, metric) for name, metric, _, _ in regressions) == [
+        ('forecast', 'seconds'), ('matrix', 'peak_mb')]
+    assert compare_to_baseline(dict(results, scale='large'), baseline) == []
+
+def test_run_benchmarks_tiny_scale(tmp_path):
+    results = run_benchmarks('tiny', stages=['enrich', 'matrix', 'dashboard_load'], repeat=1, workdir=str(tmp_path))
+
+    assert list(results['stages']) == ['enrich', 'matrix', 'dashboard_load']
+    for stage in results['stages'].values():
+        assert stage['seconds'] > 0
+        assert stage['peak_mb'] >= 0
+    # Stages ran against the synthetic tree, not the project data
+    matrix = pd.read_csv(tmp_path / 'data' / 'processed' / 'event_indicator_matrix.csv', index_col=0)
+    assert matrix.index.str.startswith('Synthetic Event').sum() == 20
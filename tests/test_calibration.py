@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.calibration import calibrate, curve_at, rollout_curve
+from src.impact_matrix import ImpactMatrix
+from src.impact_modeling import month_ordinal
+from src.shock_index import from_percentage_points, to_percentage_points
+
+EVENTS = pd.DataFrame({'event_display_name': ['A', 'B', 'C'],
+                       'event_date': pd.to_datetime(['2015-03-01', '2017-06-01', '2020-01-01'])})
+
+# (event, indicator) -> (magnitude in pp, effect_type, rollout_months)
+TRUE_IMPACTS = {
+    ('A', 'I1'): (5.0, 'sigmoid', 24),
+    ('B', 'I1'): (-3.0, 'linear', 12),
+    ('B', 'I2'): (8.0, 'linear', 12),
+    ('C', 'I2'): (4.0, 'decay', 6),
+}
+
+def _observations():
+    dates = pd.date_range('2012-01-31', '2024-12-31', freq='QE')
+    months = np.asarray(month_ordinal(dates))
+    starts = dict(zip(EVENTS['event_display_name'], month_ordinal(EVENTS['event_date'])))
+    frames = []
+    for indicator, (intercept, slope) in {'I1': (10, 1.0), 'I2': (20, 2.0)}.items():
+        values = intercept + slope * (months - months[0]) / 12
+        for (event, target), (magnitude, effect, rollout) in TRUE_IMPACTS.items():
+            if target == indicator:
+                values = values + magnitude * curve_at(months - starts[event], effect, rollout)
+        frames.append(pd.DataFrame({'record_type': 'observation', 'indicator_code': indicator,
+                                    'value_numeric': values, 'observation_date': dates}))
+    return pd.concat(frames, ignore_index=True)
+
+def _hand_set_matrix():
+    links = pd.DataFrame([
+        {'event_display_name': event, 'indicator_code': indicator, 'impact_magnitude': np.sign(m) * 0.01,
+         'lag_months': 0, 'confidence': 'medium'}
+        for (event, indicator), (m, _, _) in TRUE_IMPACTS.items()
+    ]).merge(EVENTS)
+    return ImpactMatrix.from_links(links)
+
+def test_rollout_curve_is_cached_and_complete():
+    assert rollout_curve('linear', 12) is rollout_curve('linear', 12)
+    assert np.allclose(curve_at(np.array([-1, 0, 11, 50]), 'linear', 12), [0, 1 / 12, 1, 1])
+
+def test_calibration_recovers_magnitudes_and_curves():
+    calibrated, report, summary = calibrate(_observations(), _hand_set_matrix(), prior_weight=1e-6)
+
+    assert summary['calibrated_rmse'] < 1e-4 < summary['prior_rmse']
+    fitted = report.set_index(['Event', 'Indicator'])
+    for key, (magnitude, effect, rollout) in TRUE_IMPACTS.items():
+        assert fitted.loc[key, 'Calibrated_pp'] == pytest.approx(magnitude, abs=1e-3)
+        assert fitted.loc[key, 'Effect_Type'] == effect
+        assert fitted.loc[key, 'Rollout_Months'] == rollout
+
+    # Written back in the matrix convention, so shocks read the calibrated pp
+    frame = calibrated.to_frame()
+    assert to_percentage_points(frame.loc['B', 'I2']) == pytest.approx(8.0, abs=1e-3)
+    assert set(calibrated.links['impact_direction']) == {'positive', 'negative'}
+
+def test_strong_prior_keeps_hand_set_values(tmp_path):
+    matrix = _hand_set_matrix()
+    calibrated, report, _ = calibrate(_observations(), matrix, prior_weight=1e6)
+    assert np.allclose(report['Calibrated_pp'], report['Prior_pp'], atol=1e-3)
+
+    loaded = ImpactMatrix.load(calibrated.save(str(tmp_path / 'calibrated.npz')))
+    pd.testing.assert_frame_equal(loaded.links.reset_index(drop=True), calibrated.links.reset_index(drop=True),
+                                  check_dtype=False)
+
+def test_unidentified_links_are_left_alone():
+    matrix = _hand_set_matrix()
+    links = pd.DataFrame([{'event_display_name': 'C', 'indicator_code': 'NO_DATA', 'impact_magnitude': 0.02,
+                           'lag_months': 0, 'confidence': 'low'}]).merge(EVENTS)
+    other = ImpactMatrix.from_links(links)
+    calibrated, report, summary = calibrate(_observations(), other)
+    assert summary['links'] == 0
+    assert calibrated.to_frame().equals(other.to_frame())
+
+def test_from_percentage_points_round_trip():
+    points = np.array([0.5, 5.0, -3.0, 99.9, 150.0, -250.0])
+    assert np.allclose(to_percentage_points(from_percentage_points(points)), points)
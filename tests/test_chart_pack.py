@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+
+from src import chart_pack
+from src.chart_pack import build_panel, indicator_pairs, load_manifest, render_chart_pack
+
+def make_observations():
+    rows = []
+    for year in range(2014, 2022):
+        rows.append({'indicator_code': 'ACC', 'year': year, 'value_numeric': 10.0 + year - 2014, 'unit': '%'})
+        rows.append({'indicator_code': 'USG', 'year': year, 'value_numeric': 5.0 * (year - 2013), 'unit': '%'})
+        if year % 2 == 0:
+            rows.append({'indicator_code': 'INF', 'year': year, 'value_numeric': 3.0, 'unit': 'ETB'})
+    # Seen once only: shares too few years with anything to get a chart
+    rows.append({'indicator_code': 'GEN', 'year': 2014, 'value_numeric': 1.0, 'unit': 'pp'})
+    return pd.DataFrame(rows)
+
+def test_panel_and_pairs():
+    panel = build_panel(make_observations())
+    assert list(panel.columns) == ['ACC', 'GEN', 'INF', 'USG']
+    assert list(panel.index) == list(range(2014, 2022))
+    assert indicator_pairs(panel) == [('ACC', 'INF'), ('ACC', 'USG'), ('INF', 'USG')]
+
+def test_rerun_only_redraws_changed_charts(tmp_path):
+    df = make_observations()
+    pack_dir = str(tmp_path / 'pairs')
+
+    first = render_chart_pack(df, pack_dir=pack_dir, workers=1)
+    assert first == {'charts': 3, 'drawn': 3, 'cached': 0, 'removed': 0}
+    assert os.path.getsize(os.path.join(pack_dir, 'ACC__USG.png')) > 0
+    assert render_chart_pack(df, pack_dir=pack_dir, workers=1)['drawn'] == 0
+
+    # Only the two charts showing INF see the new value
+    df.loc[df['indicator_code'] == 'INF', 'value_numeric'] = 4.0
+    assert render_chart_pack(df, pack_dir=pack_dir, workers=1)['drawn'] == 2
+
+    # Dropping INF removes its charts
+    kept = df[df['indicator_code'] != 'INF']
+    assert render_chart_pack(kept, pack_dir=pack_dir, workers=1)['removed'] == 2
+    assert sorted(load_manifest(pack_dir)) == ['ACC__USG.png']
+
+def test_parallel_svg_pack(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_pack, 'MIN_PARALLEL_CHARTS', 2)
+    pack_dir = str(tmp_path / 'svg')
+    counts = render_chart_pack(make_observations(), pack_dir=pack_dir, fmt='svg', workers=2)
+    assert counts['drawn'] == 3
+    with open(os.path.join(pack_dir, 'ACC__INF.svg')) as f:
+        assert '<svg' in f.read()
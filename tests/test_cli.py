@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from src.__main__ import main
+
+def test_help_needs_no_heavy_imports():
+    code = ("import sys\n"
+            "from src.__main__ import main\n"
+            "try:\n"
+            "    main(['validate', '--help'])\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print(sorted(m for m in ('pandas', 'numpy', 'pyarrow', 'sklearn', 'matplotlib') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == '[]'
+
+def test_validate_command_forwards_arguments(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    pd.DataFrame({'record_type': ['observation'], 'value_numeric': [None], 'year': [2015]}).to_csv(path, index=False)
+    assert main(['validate', path, '--chunksize', '10']) == 1
+
+    pd.DataFrame({'record_type': ['observation'], 'value_numeric': [1.0], 'year': [2015]}).to_csv(path, index=False)
+    assert main(['validate', path]) == 0
+
+    with pytest.raises(SystemExit):
+        main(['forecast', '--kind', 'weekly'])
@@ -0,0 +1,111 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import dashboard_data
+from src.dashboard_data import DashboardData
+from src.forecast_service import ForecastService
+from src.processed_store import write_processed
+
+def write_csv(path, values):
+    # Same write-aside-and-rename as the pipeline's writers
+    pd.DataFrame({'value': values}).to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+def make_artifacts(tmp_path, calls):
+    paths = {name: str(tmp_path / f'{name}.csv') for name in ['records', 'forecasts', 'matrix']}
+    for path in paths.values():
+        write_csv(path, [1])
+
+    def loader(name):
+        def load():
+            calls.append(name)
+            return pd.read_csv(paths[name])
+        return load
+    return paths, {name: (loader(name), [path]) for name, path in paths.items()}
+
+def test_reload_swaps_in_only_the_changed_artifact(tmp_path):
+    calls = []
+    paths, artifacts = make_artifacts(tmp_path, calls)
+    data = DashboardData(artifacts=artifacts)
+    first = data.snapshot()
+    assert sorted(calls) == ['forecasts', 'matrix', 'records']
+    assert data.artifacts_for(paths['matrix']) == ['matrix']
+    assert data.artifacts_for(str(tmp_path / 'other.csv')) == []
+
+    calls.clear()
+    write_csv(paths['matrix'], [2])
+    assert data.reload('matrix')
+    # The forecast result is looked up by matrix version, so it is re-read too
+    assert calls == ['matrix', 'forecasts']
+    second = data.snapshot()
+    assert second.matrix['value'].tolist() == [2]
+    assert second.records is first.records
+    assert data.version('records', 'matrix') == (1, 2)
+    # A page run holding the old snapshot keeps a consistent view
+    assert first.matrix['value'].tolist() == [1]
+
+def test_failed_reload_keeps_previous_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(dashboard_data, 'MAX_RELOAD_ATTEMPTS', 1)
+    _, artifacts = make_artifacts(tmp_path, [])
+    data = DashboardData(artifacts=artifacts)
+    before = data.snapshot()
+
+    def broken():
+        raise ValueError("truncated file")
+    data.artifacts['records'] = (broken, artifacts['records'][1])
+    assert not data.reload('records')
+    assert data.snapshot() is before
+
+def test_watcher_reloads_rewritten_file(tmp_path):
+    paths, artifacts = make_artifacts(tmp_path, [])
+    data = DashboardData(reload_delay=0.1, artifacts=artifacts).start()
+    try:
+        data.snapshot()
+        write_csv(paths['records'], [5, 6])
+        deadline = time.time() + 10
+        while data.version('records') == (1,) and time.time() < deadline:
+            time.sleep(0.05)
+        assert data.snapshot().records['value'].tolist() == [5, 6]
+        assert data.version('matrix') == (1,)
+    finally:
+        data.stop()
+
+def test_snapshot_holds_the_forecast_service_inputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_processed(pd.DataFrame({
+        'record_id': ['REC_1', 'REC_2', 'REC_3', 'REC_4', 'EVT_1'],
+        'record_type': ['observation'] * 4 + ['event'],
+        'indicator': [np.nan] * 4 + ['Interop'],
+        'indicator_code': ['ACC_OWNERSHIP'] * 4 + [np.nan],
+        'value_numeric': [22.0, 35.0, 46.0, 49.0, np.nan],
+        'unit': ['%'] * 4 + [np.nan],
+        'observation_date': ['2014-12-31', '2017-12-31', '2021-12-31', '2024-11-29', '2026-03-01'],
+    }))
+
+    snapshot = DashboardData().snapshot()
+    assert sorted(snapshot.model_records['record_type']) == ['event'] + ['observation'] * 4
+    assert snapshot.versions['model_records'] == 1
+
+    service = ForecastService(snapshot.model_records, snapshot.matrix, cache_path=None)
+    assert list(service.indicators) == ['ACC_OWNERSHIP']
+    assert len(service.forecast('ACC_OWNERSHIP')) == 3
+
+def test_watcher_reloads_every_artifact_of_a_shared_file(tmp_path):
+    paths, artifacts = make_artifacts(tmp_path, [])
+    # Two views of one file, like 'records' and 'model_records' of the store
+    artifacts['model_records'] = (lambda: pd.read_csv(paths['records']), [paths['records']])
+    data = DashboardData(reload_delay=0.1, artifacts=artifacts).start()
+    try:
+        assert data.artifacts_for(paths['records']) == ['records', 'model_records']
+        data.snapshot()
+        write_csv(paths['records'], [1, 2, 9])
+        deadline = time.time() + 10
+        while data.version('records', 'model_records') != (2, 2) and time.time() < deadline:
+            time.sleep(0.05)
+        snapshot = data.snapshot()
+        assert snapshot.records['value'].tolist() == snapshot.model_records['value'].tolist() == [1, 2, 9]
+    finally:
+        data.stop()
@@ -2,7 +2,11 @@ import pytest
 import pandas as pd
 import numpy as np
 from unittest.mock import patch, MagicMock
-from src.task4_forecasting import calculate_baseline, apply_shocks, load_data
+from src.task4_forecasting import (calculate_baseline, apply_shocks, load_data, fit_trend_batch, fit_models,
+                                  fit_national_baselines, select_model, MODELS)
+from src.shock_index import ShockIndex
+from src.impact_matrix import ImpactMatrix
+from src.forecast_service import ForecastService
 
 def test_calculate_baseline_valid():
     # Create mock data
@@ -40,11 +44,11 @@ def test_apply_shocks_with_matrix():
     # Logic: 0.05 < 1.0 -> multiplied by 100 -> 5.0
     assert shock == 5.0
 
-@patch('src.task4_forecasting.os.path.exists')
-@patch('src.task4_forecasting.pd.read_csv')
-def test_load_data_success(mock_read_csv, mock_exists):
-    mock_exists.return_value = True
-    mock_read_csv.return_value = pd.DataFrame({'a': [1]})
+@patch('src.task4_forecasting.load_impact_matrix')
+@patch('src.task4_forecasting.load_enriched')
+def test_load_data_success(mock_load_enriched, mock_load_matrix):
+    mock_load_enriched.return_value = pd.DataFrame({'a': [1]})
+    mock_load_matrix.return_value = ImpactMatrix.from_frame(pd.DataFrame({'a': [1]}, index=['E']))
     
     df, matrix = load_data()
     assert not df.empty
@@ -54,4 +58,213 @@ def test_load_data_success(mock_read_csv, mock_exists):
 def test_load_data_failure(mock_exists):
     mock_exists.return_value = False
     with pytest.raises(FileNotFoundError):
-        load_data()
\ No newline at end of file
+        load_data()
+
+def test_fit_trend_batch_matches_sklearn():
+    df = pd.DataFrame({
+        'indicator_code': ['A', 'A', 'A', 'B', 'B', 'B', 'B', 'C'],
+        'year': [2011, 2014, 2021, 2014, 2017, 2021, 2024, 2024],
+        'value_numeric': [22, 35, 46, 5.0, 6.5, 9.0, 14.0, 3.0]
+    })
+    fit = fit_trend_batch(df, [2025, 2027])
+
+    assert list(fit['series']) == ['A', 'B', 'C']
+    assert fit['projections'].shape == (3, 2)
+
+    for i, code in enumerate(['A', 'B']):
+        history = df[df['indicator_code'] == code]
+        projection, model = calculate_baseline(history, 2027)
+        assert np.isclose(fit['slope'][i], model.coef_[0])
+        assert np.isclose(fit['projections'][i, 1], projection)
+
+        residuals = history['value_numeric'] - model.predict(history[['year']].values)
+        assert np.isclose(fit['rse'][i], np.std(residuals))
+
+    # A single observation cannot define a trend
+    assert np.isnan(fit['slope'][2])
+    assert np.isnan(fit['projections'][2]).all()
+
+def test_fit_trend_batch_multiple_keys():
+    df = pd.DataFrame({
+        'indicator_code': ['A'] * 4,
+        'gender': ['male', 'male', 'female', 'female'],
+        'year': [2017, 2021, 2017, 2021],
+        'value_numeric': [40, 56, 30, 36]
+    })
+    fit = fit_trend_batch(df, [2025], series_keys=('indicator_code', 'gender'))
+
+    assert list(fit['series']) == [('A', 'female'), ('A', 'male')]
+    assert np.allclose(fit['slope'], [1.5, 4.0])
+    assert np.allclose(fit['projections'][:, 0], [42.0, 72.0])
+
+def test_shock_index_uses_event_dates():
+    matrix = pd.DataFrame({
+        'ACC_OWNERSHIP': [0.05, 0.02],
+        'USG_P2P_COUNT': [0.0, 3.0],
+    }, index=['Fayda Rollout', 'EVT_0008'])
+    events = pd.DataFrame({
+        'record_type': ['event', 'event'],
+        'record_id': [np.nan, 'EVT_0008'],
+        'parent_id': ['EVT_FAYDA', np.nan],
+        'indicator': ['Fayda Rollout', np.nan],
+        'observation_date': ['2025-03-01', '2027-12-18 00:00:00'],
+    })
+    index = ShockIndex.build(matrix, events)
+
+    assert list(index.periods) == [2025, 2026, 2027]
+    assert index.shock(2025, 'ACC_OWNERSHIP') == 5.0
+    assert index.shock(2025, 'ACC_OWNERSHIP', 'Optimistic') == 6.0
+    assert index.shock(2026, 'ACC_OWNERSHIP') == 0.0
+    assert index.shock(2027, 'USG_P2P_COUNT', 'Pessimistic') == 1.5
+    assert index.shock(2030, 'ACC_OWNERSHIP') == 0.0
+    assert apply_shocks(2025, matrix, 'ACC_OWNERSHIP', index=index) == 5.0
+
+def test_shock_index_cumulative_window():
+    matrix = pd.DataFrame({'ACC_OWNERSHIP': [2.0, 3.0]}, index=['A (2025)', 'B (2027)'])
+    index = ShockIndex.build(matrix)
+
+    carry = index.cumulative([2025, 2026, 2027], indicators=['ACC_OWNERSHIP', 'UNKNOWN'], adjustment=1.0)
+    assert carry.shape == (3, 2)
+    assert list(carry[:, 0]) == [3.0, 4.0, 8.0]
+    assert list(carry[:, 1]) == [1.0, 2.0, 3.0]
+
+def test_forecast_service_runs_model_and_caches():
+    df = pd.DataFrame({
+        'record_type': ['observation'] * 4 + ['event'],
+        'indicator_code': ['ACC_OWNERSHIP'] * 4 + [np.nan],
+        'indicator': [np.nan] * 4 + ['Interop (2026)'],
+        'parent_id': [np.nan] * 4 + ['EVT_INTEROP'],
+        'value_numeric': [22, 35, 46, 49, np.nan],
+        'observation_date': ['2014-12-31', '2017-12-31', '2021-12-31', '2024-11-29', '2026-03-01'],
+    })
+    matrix = pd.DataFrame({'ACC_OWNERSHIP': [0.04]}, index=['Interop (2026)'])
+    service = ForecastService(df, matrix, cache_path=None)
+
+    base = service.forecast('ACC_OWNERSHIP', 1.0)
+    doubled = service.forecast('ACC_OWNERSHIP', 2.0)
+    lift = doubled['Predicted_Value'] - base['Predicted_Value']
+    assert list(lift.round(2)) == [0.0, 4.0, 4.0]
+
+    # Slider values are quantized onto the cache grid
+    service.forecast('ACC_OWNERSHIP', 2.01)
+    assert service.cache_info()['size'] == 2
+
+    optimistic = service.forecast('ACC_OWNERSHIP', 1.2, 'Optimistic')
+    assert np.isclose(optimistic['Predicted_Value'][2] - base['Predicted_Value'][2], 0.2 * 4.0 + 3.0)
+
+    with pytest.raises(KeyError):
+        service.forecast('UNKNOWN')
+
+def test_forecast_service_uses_the_selected_models():
+    years = np.arange(2011, 2025)
+    df = pd.DataFrame({
+        'record_type': 'observation',
+        'indicator_code': 'ACC_OWNERSHIP',
+        'value_numeric': 100 / (1 + np.exp(-0.6 * (years - 2018))),
+        'observation_date': [f'{year}-12-31' for year in years],
+    })
+    service = ForecastService(df, pd.DataFrame(), cache_path=None)
+    baselines = fit_national_baselines(df, service.future_years, models=list(MODELS), workers=1, cache_path=None)
+    # A saturating series: a straight line would overshoot the cap
+    assert list(service.models) == list(baselines['model']) == ['logistic']
+    predicted = service.forecast('ACC_OWNERSHIP')['Predicted_Value']
+    assert np.allclose(predicted, baselines['base_pred'][0].round(2))
+    assert (predicted < 100).all()
+
+def test_impact_matrix_matches_pivot_and_round_trips(tmp_path):
+    links = pd.DataFrame({
+        'parent_id': ['E1', 'E1', 'E1', 'E2'],
+        'event_display_name': ['Launch', 'Launch', 'Launch', 'Reform'],
+        'event_date': pd.to_datetime(['2025-03-01'] * 3 + ['2026-06-01']),
+        'indicator_code': ['ACC_OWNERSHIP', 'ACC_OWNERSHIP', 'USG_P2P', 'USG_P2P'],
+        'impact_magnitude': [0.02, 0.03, 4.0, -1.0],
+        'lag_months': [6, 6, 12, 0],
+        'confidence': ['high', 'medium', 'low', 'high'],
+        'impact_direction': ['positive', 'positive', 'positive', 'negative'],
+    })
+    matrix = ImpactMatrix.from_links(links)
+
+    expected = links.pivot_table(index='event_display_name', columns='indicator_code',
+                                 values='impact_magnitude', aggfunc='sum').fillna(0)
+    pd.testing.assert_frame_equal(matrix.to_frame(), expected, check_names=False)
+    assert matrix.matrix.nnz == 3
+    assert len(matrix.links) == 4
+
+    loaded = ImpactMatrix.load(matrix.save(str(tmp_path / 'matrix.npz')))
+    pd.testing.assert_frame_equal(loaded.to_frame(), matrix.to_frame())
+    assert list(loaded.event_dates) == list(matrix.event_dates)
+    assert list(loaded.links['confidence']) == ['high', 'medium', 'low', 'high']
+    assert list(loaded.links['lag_months']) == [6, 6, 12, 0]
+
+    # Event dates travel with the matrix, no event records needed
+    index = ShockIndex.build(loaded)
+    assert index.shock(2025, 'ACC_OWNERSHIP') == 5.0
+    assert index.shock(2026, 'USG_P2P') == -1.0
+    assert np.allclose(index.cumulative([2025, 2026, 2027], indicators=['USG_P2P', 'NONE']),
+                       [[4.0, 0.0], [3.0, 0.0], [3.0, 0.0]])
+
+def test_arima_matches_statsmodels_yule_walker():
+    import warnings
+    from statsmodels.tsa.arima.model import ARIMA
+    from src.task4_forecasting import fit_arima
+
+    rng = np.random.default_rng(3)
+    x = np.array([2011, 2012, 2014, 2015, 2017, 2018, 2019, 2021, 2022, 2024], dtype=float)
+    y = 20 + np.cumsum(1 + rng.normal(size=len(x)))
+    fit = fit_arima(x, y, np.array([2025.0, 2027.0]))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        result = ARIMA(np.interp(np.arange(2011, 2025), x, y), order=(1, 1, 0), trend='t').fit(method='yule_walker')
+    # statsmodels estimates the drift by GLS, the closed form by the mean change
+    assert np.isclose(fit['params']['drift'], result.params[0], atol=0.01)
+    assert np.isclose(fit['params']['ar.L1'], result.params[1], atol=1e-3)
+    assert np.allclose(fit['forecast'], result.forecast(3)[[0, 2]], atol=0.02)
+
+def test_select_model_picks_saturating_curve():
+    rng = np.random.default_rng(0)
+    x = np.arange(2000, 2021)
+    y = 100 / (1 + np.exp(-0.3 * (x - 2012))) + rng.normal(0, 1, len(x))
+
+    for selection in ['aic', 'backtest']:
+        fit = select_model(x, y, [2025, 2030], cap=100.0, selection=selection, holdout=3)
+        assert fit['model'] == 'logistic'
+        assert set(fit['scores']) == {'linear', 'logistic', 'gompertz', 'holt_damped', 'arima'}
+        # Bounded by the cap, unlike the straight line
+        assert 95 < fit['forecast'][0] < fit['forecast'][1] < 100
+
+    # Too short for anything but a line
+    assert select_model([2021, 2024], [46, 49], [2025])['model'] == 'linear'
+
+    with pytest.raises(ValueError):
+        select_model(x, y, [2025], selection='bic')
+
+def test_fit_models_in_parallel_with_disk_cache(tmp_path, capsys, monkeypatch):
+    years = [2011, 2014, 2017, 2021, 2024]
+    points = pd.DataFrame({
+        'indicator_code': np.repeat(['A', 'B', 'C'], 5),
+        'year': years * 3,
+        'value_numeric': [14, 22, 35, 46, 49] + [1, 2, 4, 8, 16] + [5, 5, 5, 5, np.nan],
+    }).dropna()
+    cache = str(tmp_path / 'fits.json')
+    candidates = ['linear', 'logistic', 'gompertz']
+
+    monkeypatch.setattr('src.task4_forecasting.MIN_PARALLEL_SERIES', 2)
+    fit = fit_models(points, [2025, 2027], candidates, caps={'A': 100.0}, workers=2, cache_path=cache)
+    assert list(fit['series']) == ['A', 'B', 'C'] and fit['projections'].shape == (3, 2)
+    assert 'Fitting 3 models to 3 series' in capsys.readouterr().out
+    # Exponential growth is not capped at 100 and needs a free ceiling
+    assert fit['model'][1] != 'linear'
+
+    # Re-runs read the cache; changed data refits only that series
+    again = fit_models(points, [2025, 2027], candidates, caps={'A': 100.0}, workers=2, cache_path=cache)
+    np.testing.assert_allclose(again['projections'], fit['projections'])
+    assert 'Fitting' not in capsys.readouterr().out
+    points.loc[points['indicator_code'] == 'C', 'value_numeric'] = [5, 6, 7, 8]
+    fit_models(points, [2025, 2027], candidates, caps={'A': 100.0}, workers=1, cache_path=cache)
+    assert '(2 cached)' in capsys.readouterr().out
+
+    df = points.assign(record_type='observation', unit=np.where(points['indicator_code'] == 'A', '%', 'count'))
+    baselines = fit_national_baselines(df, [2025], models=candidates, workers=1, cache_path=None)
+    assert list(baselines['indicators']) == ['A', 'B', 'C'] and len(baselines['model']) == 3
+
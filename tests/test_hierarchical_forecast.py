@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.hierarchical_forecast import constraint_matrix, hierarchical_forecast, reconcile
+from src.impact_matrix import ImpactMatrix
+from src.task4_forecasting import MODELS, fit_national_baselines
+
+def test_reconcile_projects_onto_constraints():
+    nodes = pd.MultiIndex.from_tuples(
+        [('ACC', 'total', 'all'), ('ACC', 'gender', 'female'), ('ACC', 'gender', 'male'),
+         ('USERS', 'total', 'all'), ('USERS', 'gender', 'male'), ('GAP', 'total', 'all')],
+        names=['indicator_code', 'dimension', 'member'])
+    units = pd.Series({'ACC': '%', 'USERS': 'people', 'GAP': 'pp'})
+    C = constraint_matrix(nodes, units)
+    # USERS lacks its female series, so only ACC's gender split is constrained
+    assert C.shape == (1, 6)
+    assert C.toarray()[0, :3].tolist() == [1.0, -0.5, -0.5]
+
+    base = np.array([[50.0, 40.0], [40.0, 30.0], [50.0, 40.0], [10.0, 10.0], [6.0, 6.0], [np.nan, 3.0]])
+    ols = reconcile(base, C)
+    assert np.allclose(C @ np.nan_to_num(ols), 0)
+    np.testing.assert_allclose(ols[3:5], base[3:5])
+    assert np.isnan(ols[5, 0]) and ols[5, 1] == 3.0
+
+    # Coherent forecasts are left alone
+    coherent = base.copy()
+    coherent[0] = 0.5 * (base[1] + base[2])
+    np.testing.assert_allclose(reconcile(coherent, C)[:3], coherent[:3])
+
+    # A noisy total absorbs most of the correction
+    wls = reconcile(base, C, variances=[100.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+    assert abs(wls[0, 0] - base[0, 0]) > abs(ols[0, 0] - base[0, 0])
+    assert np.allclose(C @ np.nan_to_num(wls), 0)
+
+@pytest.fixture
+def breakdowns():
+    years = [2014, 2017, 2021, 2024]
+    rows = []
+    for gender, location, values in [('all', 'national', [22, 35, 46, 50]),
+                                     ('male', 'national', [29, 41, 56, 60]),
+                                     ('female', 'national', [17, 29, 36, 38]),
+                                     ('all', 'urban', [50, 60, 70, 75]),
+                                     ('all', 'rural', [15, 28, 40, 41])]:
+        rows += [{'record_type': 'observation', 'indicator_code': 'ACC_OWNERSHIP', 'unit': '%',
+                  'gender': gender, 'location': location, 'value_numeric': v,
+                  'observation_date': f'{y}-12-31'} for y, v in zip(years, values)]
+    return pd.DataFrame(rows)
+
+def test_hierarchical_forecast_is_coherent_across_scenarios(breakdowns):
+    links = pd.DataFrame({'event_display_name': ['Launch'], 'event_date': pd.to_datetime(['2025-03-01']),
+                          'indicator_code': ['ACC_OWNERSHIP'], 'impact_magnitude': [0.05],
+                          'lag_months': [0], 'confidence': ['high']})
+    out = hierarchical_forecast(breakdowns, ImpactMatrix.from_links(links), [2025, 2026], cache_path=None)
+    assert len(out) == 3 * 5 * 2
+
+    wide = out.pivot_table(index=['Scenario', 'Year'], columns=['Dimension', 'Member'], values='Predicted_Value')
+    total = wide[('total', 'all')]
+    assert np.allclose(total, 0.5 * wide[('gender', 'male')] + 0.5 * wide[('gender', 'female')], atol=0.01)
+    assert np.allclose(total, 0.22 * wide[('location', 'urban')] + 0.78 * wide[('location', 'rural')], atol=0.01)
+    # Scenario adjustments survive reconciliation
+    assert (total.loc['Optimistic'] > total.loc['Pessimistic']).all()
+
+    with pytest.raises(ValueError):
+        hierarchical_forecast(breakdowns, ImpactMatrix.from_links(links), [2025], method='mint_full', cache_path=None)
+
+def test_total_node_uses_the_selected_national_model(breakdowns):
+    out = hierarchical_forecast(breakdowns, pd.DataFrame(), [2025, 2026], scenarios=['Base'], cache_path=None)
+    total = out[out['Dimension'] == 'total']
+    national = fit_national_baselines(breakdowns, [2025, 2026], models=list(MODELS), cache_path=None)
+
+    assert total['Model'].iloc[0] == national['model'][0]
+    assert np.allclose(total['Base_Value'], national['base_pred'][0], atol=0.01)
@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.impact_modeling import calculate_lag_effect, calculate_lag_effects, lag_kernel
+
+def test_batched_lag_effects_match_single_event():
+    starts = ['2021-05-17', '2024-03-01', '2022-08-01']
+    impacts = [0.20, 0.05, -2.0]
+    durations = [36, 6, 12]
+    types = ['sigmoid', 'linear', 'decay']
+
+    months, effects = calculate_lag_effects(starts, impacts, durations, types)
+
+    assert months[0] == pd.Timestamp('2021-05-01')
+    assert months[-1] == pd.Timestamp('2024-08-01')
+    assert effects.shape == (3, len(months))
+    assert np.allclose(effects.sum(axis=1), impacts)
+
+    for i in range(3):
+        single = calculate_lag_effect(starts[i], impacts[i], durations[i], types[i])
+        offset = months.get_loc(pd.Timestamp(starts[i]).to_period('M').to_timestamp())
+        assert np.allclose(effects[i, offset:offset + durations[i]], single['incremental_impact'])
+
+def test_lag_effects_axis_clipping_and_kernel_cache():
+    lag_kernel.cache_clear()
+    months, effects = calculate_lag_effects(['2020-01-01', '2020-06-01'], 1.0, 12, 'linear',
+                                            axis_start='2020-03-01', axis_end='2020-12-31')
+    assert len(months) == 10
+    # Months before the axis are folded into its first month, later months dropped
+    assert np.isclose(effects[0, 0], 3 / 12)
+    assert np.isclose(effects[0].sum(), 1.0)
+    assert np.isclose(effects[1].sum(), 7 / 12)
+
+    calculate_lag_effects(['2021-01-01'], 0.5, 12, 'linear')
+    assert lag_kernel.cache_info().misses == 1
+
+    with pytest.raises(ValueError):
+        lag_kernel('unknown', 12)
+
+def test_lag_effects_skip_undated_events():
+    months, effects = calculate_lag_effects(['2024-01-01', None, 'not a date'], [1.0, 2.0, 3.0], 12)
+    assert months[0] == pd.Timestamp('2024-01-01') and len(months) == 12
+    assert np.isclose(effects[0].sum(), 1.0)
+    assert not effects[1:].any()
@@ -0,0 +1,31 @@
+import os
+import pandas as pd
+from unittest.mock import patch
+from src.ingest_cache import read_workbook
+
+def write_workbook(path, value):
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({'indicator_code': ['ACC_OWNERSHIP'], 'value_numeric': [value]}).to_excel(
+            writer, sheet_name='data', index=False)
+        pd.DataFrame({'fiscal_year': [2014, 'FY2022/23']}).to_excel(writer, sheet_name='mixed', index=False)
+
+def test_read_workbook_caches_and_invalidates(tmp_path):
+    path = str(tmp_path / 'unified.xlsx')
+    cache_dir = str(tmp_path / 'cache')
+    write_workbook(path, 46.0)
+
+    first = read_workbook(path, cache_dir=cache_dir)
+    assert first['value_numeric'].tolist() == [46.0]
+    assert read_workbook(path, 'mixed', cache_dir=cache_dir)['fiscal_year'].tolist() == ['2014', 'FY2022/23']
+    assert list(read_workbook(path, None, cache_dir=cache_dir)) == ['data', 'mixed']
+
+    # Unchanged workbook: served from the cache without touching Excel
+    with patch('src.ingest_cache.pd.read_excel') as mock_read_excel:
+        read_workbook(path, cache_dir=cache_dir)
+        mock_read_excel.assert_not_called()
+
+    # Changed content invalidates the entry and drops the stale conversion
+    write_workbook(path, 49.0)
+    os.utime(path, ns=(1, 1))
+    assert read_workbook(path, cache_dir=cache_dir)['value_numeric'].tolist() == [49.0]
+    assert len([d for d in os.listdir(cache_dir) if not d.startswith('_')]) == 1
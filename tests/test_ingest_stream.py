@@ -0,0 +1,149 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src import processed_store
+from src.ingest_stream import ingest_incoming
+from src.processed_store import (append_processed, load_manifest, read_appended, read_processed,
+                                 write_processed)
+
+def make_base():
+    return pd.DataFrame({
+        'record_id': ['REC_1', 'REC_2', 'EVT_1'],
+        'record_type': ['observation', 'observation', 'event'],
+        'indicator_code': ['ACC_OWNERSHIP', 'ACC_OWNERSHIP', np.nan],
+        'gender': ['all', 'female', np.nan],
+        'value_numeric': [46.0, 36.0, np.nan],
+        'observation_date': ['2021-12-31', '2021-12-31', '2021-05-01'],
+        'notes': [np.nan, np.nan, np.nan],
+    })
+
+def test_append_is_deduplicated_and_widens_schema(tmp_path):
+    path = str(tmp_path / 'store')
+    write_processed(make_base(), path)
+
+    batch = pd.DataFrame({
+        'record_id': ['REC_1', np.nan, np.nan],
+        'record_type': ['observation', 'observation', 'impact_link'],
+        'parent_id': [np.nan, np.nan, 'EVT_1'],
+        'indicator_code': ['ACC_OWNERSHIP', 'USG_MM_VOL', np.nan],
+        'gender': ['all', np.nan, np.nan],
+        'value_numeric': [46.0, 4800.0, np.nan],
+        # Same day as REC_1, written differently
+        'observation_date': ['2021-12-31 00:00:00', '2024-06-30', np.nan],
+        'notes': [np.nan, 'NBE annual report', np.nan],
+        'impact_magnitude': [np.nan, np.nan, 0.05],
+    })
+    added = append_processed(batch, path)
+    assert list(added['indicator_code'].fillna('link')) == ['USG_MM_VOL', 'link']
+
+    # Re-appending changes nothing
+    assert append_processed(batch, path).empty
+    manifest = load_manifest(path)
+    assert manifest['rows'] == 5 and manifest['batches'] == 1
+    assert manifest['record_types'] == {'observation': 3, 'event': 1, 'impact_link': 1}
+
+    df = read_processed(path=path)
+    assert len(df) == 5
+    assert df.loc[df['record_type'] == 'impact_link', 'parent_id'].tolist() == ['EVT_1']
+    assert df.loc[df['indicator_code'] == 'USG_MM_VOL', 'year'].tolist() == [2024]
+    assert len(read_appended(path)) == 2
+
+    # Existing files are never rewritten
+    assert sorted(os.listdir(os.path.join(path, 'record_type=observation'))) == \
+        ['batch-000001.parquet', 'part-0.parquet']
+
+def test_append_keeps_records_that_differ_only_in_id_link_or_region(tmp_path):
+    path = str(tmp_path / 'store')
+    write_processed(make_base(), path)
+
+    # Two links of one event, appended one at a time and together
+    links = pd.DataFrame({
+        'record_type': 'impact_link',
+        'parent_id': 'EVT_X',
+        'indicator_code': np.nan,
+        'related_indicator': ['ACC_OWNERSHIP', 'USG_P2P_COUNT'],
+    })
+    assert len(append_processed(links.iloc[:1], path)) == 1
+    assert len(append_processed(links, path)) == 1
+
+    # Two events on one date, told apart by their record_id
+    events = pd.DataFrame({
+        'record_id': ['EVT_A', 'EVT_B'],
+        'record_type': 'event',
+        'observation_date': '2024-03-01',
+    })
+    assert len(append_processed(events, path)) == 2
+
+    # One indicator and date in two regions
+    regions = pd.DataFrame({
+        'record_type': 'observation',
+        'indicator_code': 'ACC_OWNERSHIP',
+        'observation_date': '2024-06-30',
+        'region': ['Amhara', 'Oromia'],
+        'value_numeric': [40.0, 44.0],
+    })
+    assert len(append_processed(regions, path)) == 2
+
+    assert load_manifest(path)['rows'] == 3 + 2 + 2 + 2
+    for batch in (links, events, regions):
+        assert append_processed(batch, path).empty
+
+def test_appended_records_carry_over_into_a_rebuild(tmp_path):
+    path = str(tmp_path / 'store')
+    write_processed(make_base(), path)
+    append_processed(pd.DataFrame({'record_type': ['event', 'event'], 'record_id': ['EVT_2', 'EVT_3'],
+                                   'category': ['policy', np.nan],
+                                   'observation_date': ['2024-03-01', '2024-09-01']}), path)
+
+    # A rebuild from the starter data re-appends what was streamed in (read back typed)
+    streamed = read_appended(path)
+    write_processed(make_base(), path)
+    assert len(append_processed(streamed, path)) == 2
+    assert load_manifest(path)['rows'] == 5
+
+def test_index_is_rebuilt_when_key_columns_change(tmp_path, monkeypatch):
+    path = str(tmp_path / 'store')
+    monkeypatch.setattr(processed_store, 'KEY_COLUMNS', ['record_type', 'indicator_code', 'observation_date'])
+    write_processed(make_base(), path)
+    monkeypatch.undo()
+
+    # Stored records are found under the new key, not appended again
+    assert append_processed(make_base(), path).empty
+    manifest = load_manifest(path)
+    assert manifest['key_columns'] == processed_store.KEY_COLUMNS and manifest['rows'] == 3
+
+def test_ingest_incoming_validates_and_archives(tmp_path):
+    path, incoming = str(tmp_path / 'store'), tmp_path / 'incoming'
+    write_processed(make_base(), path)
+    incoming.mkdir()
+
+    records = [
+        {'record_type': 'event', 'parent_id': 'EVT_2', 'observation_date': '2024-03-01'},
+        {'record_type': 'impact_link', 'parent_id': 'EVT_2', 'related_indicator': 'ACC_OWNERSHIP'},
+        {'record_type': 'impact_link', 'parent_id': 'EVT_9', 'related_indicator': 'ACC_OWNERSHIP'},
+        {'record_type': 'observation', 'indicator_code': 'ACC_FAYDA', 'observation_date': '2024-06-30'},
+    ]
+    with open(incoming / 'batch.jsonl', 'w') as f:
+        f.write('\n'.join(json.dumps(r) for r in records))
+    pd.DataFrame({'record_type': ['impact_link'], 'parent_id': ['EVT_1'],
+                  'related_indicator': ['ACC_OWNERSHIP']}).to_csv(incoming / 'links.csv', index=False)
+
+    summaries = ingest_incoming(str(incoming), path, csv_path=None, chunksize=2)
+    by_file = {os.path.basename(s['file']): s for s in summaries}
+    # Unknown parent event and missing value_numeric are rejected
+    assert by_file['batch.jsonl']['appended'] == 2
+    assert by_file['batch.jsonl']['rejected'] == 2
+    assert by_file['links.csv']['appended'] == 1
+
+    rejected = pd.read_csv(incoming / 'rejected' / 'batch.jsonl.rejected.csv')
+    assert sorted(rejected['rejected_by']) == ['missing_value_numeric', 'referential_integrity']
+    assert sorted(os.listdir(incoming / 'done')) == ['batch.jsonl', 'links.csv']
+    assert ingest_incoming(str(incoming), path, csv_path=None) == []
+
+    # Dropping the same file again is a no-op
+    os.replace(incoming / 'done' / 'links.csv', incoming / 'links.csv')
+    assert ingest_incoming(str(incoming), path, csv_path=None)[0]['duplicates'] == 1
+    assert load_manifest(path)['rows'] == 6
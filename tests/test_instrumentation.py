@@ -0,0 +1,67 @@
+import functools
+
+import numpy as np
+import pytest
+
+from src.instrumentation import (count_cache, instrumented, load_metrics, new_run, record_size,
+                                 register_cache, stage)
+
+def test_nested_stages_record_time_memory_and_caches(metrics_log, monkeypatch):
+    monkeypatch.setenv('FI_METRICS', 'full')
+
+    @functools.lru_cache(maxsize=None)
+    def square(x):
+        return x * x
+    register_cache('square', square)
+
+    @instrumented('inner')
+    def inner(n):
+        for x in [1, 2, 1, 1]:
+            square(x)
+        count_cache('lookup', False)
+        return np.ones(n)
+
+    run = new_run()
+    with stage('outer'):
+        count_cache('lookup', True)
+        data = bytearray(5_000_000)
+        inner(1_000_000)
+        record_size(10, 3)
+        del data
+
+    with pytest.raises(KeyError):
+        with stage('failing'):
+            raise KeyError('boom')
+
+    df = load_metrics(metrics_log).set_index('stage')
+    assert set(df['run_id']) == {run}
+    assert df.loc['inner', 'parent'] == 'outer' and df.loc['outer', 'status'] == 'ok'
+    assert df.loc['failing', 'status'] == 'error'
+    assert df.loc['outer', 'rows'] == 10 and df.loc['outer', 'columns'] == 3
+    # Size defaults to the stage's result
+    assert df.loc['inner', 'rows'] == 1_000_000
+    # The child's peak (an 8 MB array) is part of the parent's
+    assert df.loc['inner', 'peak_mb'] >= 7.5
+    assert df.loc['outer', 'peak_mb'] >= df.loc['inner', 'peak_mb'] + 4.5
+
+    assert (df.loc['inner', 'square_hits'], df.loc['inner', 'square_misses']) == (2, 2)
+    assert df.loc['inner', 'square_hit_rate'] == 0.5
+    assert (df.loc['outer', 'lookup_hits'], df.loc['outer', 'lookup_misses']) == (1, 1)
+    assert df.loc['inner', 'lookup_hits'] == 0
+
+def test_metrics_modes(metrics_log, monkeypatch):
+    monkeypatch.setenv('FI_METRICS', 'time')
+    with stage('timed'):
+        pass
+    monkeypatch.setenv('FI_METRICS', 'off')
+    with stage('silent'):
+        pass
+
+    df = load_metrics(metrics_log)
+    assert df['stage'].tolist() == ['timed']
+    assert df['peak_mb'].isna().all() and df['seconds'].iloc[0] >= 0
+
+    # A truncated last line is skipped
+    with open(metrics_log, 'a') as f:
+        f.write('{"run_id": "x", "sta')
+    assert len(load_metrics(metrics_log)) == 1
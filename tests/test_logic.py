@@ -1,14 +1,38 @@
 import pandas as pd
 import os
 
-def test_data_files_exist():
+import pytest
+
+from src.generate_matrix import generate_matrix
+from src.synthetic_data import generate_unified_dataset, write_synthetic_workspace
+from src.task1_enrichment import run_enrichment
+from src.task4_forecasting import FORECAST_PATH, cached_forecast_results, run_forecasting_scenarios
+
+@pytest.fixture(scope='module')
+def workspace(tmp_path_factory):
+    """A synthetic project tree in a temporary directory, run through enrichment, matrix and forecast."""
+    root = tmp_path_factory.mktemp('workspace')
+    write_synthetic_workspace(str(root), generate_unified_dataset(n_observations=300, n_events=6,
+                                                                  n_indicators=4, seed=0))
+    # Every stage reads and writes relative 'data/...' paths
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(root)
+        run_enrichment()
+        generate_matrix()
+        run_forecasting_scenarios(workers=1)
+        yield root
+
+def test_data_files_exist(workspace):
     """Check if the necessary processed files were generated."""
     assert os.path.exists("data/processed/ethiopia_fi_enriched.csv")
     assert os.path.exists("data/processed/event_indicator_matrix.csv")
-    assert os.path.exists("data/processed/final_forecasts_2027.csv")
+    assert os.path.exists(FORECAST_PATH)
 
-def test_forecast_logic():
+def test_forecast_logic(workspace, capsys):
     """Verify that the forecast output has the correct scenarios."""
-    df = pd.read_csv("data/processed/final_forecasts_2027.csv")
+    # Same result store the CLI and dashboard use: computed once per data / matrix version
+    df = cached_forecast_results()
+    assert 'Using cached forecast results' in capsys.readouterr().out
     expected_scenarios = ['Base', 'Optimistic', 'Pessimistic']
-    assert all(scen in df['Scenario'].unique() for scen in expected_scenarios)
\ No newline at end of file
+    assert all(scen in df['Scenario'].unique() for scen in expected_scenarios)
+    pd.testing.assert_frame_equal(df, pd.read_csv(FORECAST_PATH), check_dtype=False)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.impact_matrix import ImpactMatrix
+from src.matrix_view import heatmap_layout, heatmap_tile, n_pages, top_k
+
+def make_matrix():
+    # Two groups of events hitting two groups of indicators, plus weak noise
+    dense = np.zeros((6, 4))
+    dense[[0, 2, 4], :2] = [[5.0, 4.0], [6.0, 5.0], [5.0, 5.0]]
+    dense[[1, 3], 2:] = [[-3.0, -2.0], [-3.0, -3.0]]
+    dense[5, 3] = 0.1
+    return ImpactMatrix(sparse.csr_matrix(dense), [f'E{i}' for i in range(6)], ['A', 'B', 'C', 'D'])
+
+def test_top_k_and_cluster_order():
+    matrix = make_matrix()
+    rows, cols = top_k(matrix, k_events=2, k_indicators=3)
+    assert rows.tolist() == [2, 4] and cols.tolist() == [0, 1, 2]
+
+    rows, cols = heatmap_layout(matrix, k_events=5, cluster=True)
+    assert sorted(rows.tolist()) == [0, 1, 2, 3, 4]
+    # Events of the same group are adjacent
+    groups = ['pos' if r in (0, 2, 4) else 'neg' for r in rows]
+    assert groups in (['pos'] * 3 + ['neg'] * 2, ['neg'] * 2 + ['pos'] * 3)
+    assert {frozenset(cols[:2]), frozenset(cols[2:])} == {frozenset([0, 1]), frozenset([2, 3])}
+
+def test_heatmap_tile_pages_and_aggregates():
+    matrix = make_matrix()
+    rows, cols = np.arange(6), np.arange(4)
+    tile = heatmap_tile(matrix, rows, cols, row_page=1, col_page=0, page_size=4)
+    assert list(tile.index) == ['E4', 'E5'] and list(tile.columns) == ['A', 'B', 'C', 'D']
+    assert n_pages(6, 4) == 2 and n_pages(0, 4) == 1
+
+    # Zoomed out: blocks keep their strongest (signed) impact
+    tile = heatmap_tile(matrix, rows, cols, page_size=6, max_tile=2)
+    assert tile.shape == (2, 2)
+    assert list(tile.index) == ['E0 … E2 (3)', 'E3 … E5 (3)']
+    assert tile.to_numpy().tolist() == [[6.0, -3.0], [5.0, -3.0]]
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.impact_matrix import ImpactMatrix
+from src.monthly_forecast import link_impulses, monthly_forecast, rollout
+from src.task4_forecasting import MODELS, fit_national_baselines
+
+@pytest.fixture
+def history():
+    return pd.DataFrame({
+        'record_type': 'observation',
+        'indicator_code': ['ACC_OWNERSHIP'] * 4 + ['USG_P2P'] * 3,
+        'value_numeric': [22, 35, 46, 49, 10, 20, 30],
+        'observation_date': ['2014-12-31', '2017-12-31', '2021-12-31', '2024-12-15',
+                             '2022-06-30', '2023-06-30', '2024-06-30'],
+    })
+
+def _matrix(event_date, lag_months, magnitude=0.06, indicator='ACC_OWNERSHIP'):
+    links = pd.DataFrame({
+        'event_display_name': ['Launch'], 'event_date': pd.to_datetime([event_date]),
+        'indicator_code': [indicator], 'impact_magnitude': [magnitude],
+        'lag_months': [lag_months], 'confidence': ['high'],
+    })
+    return ImpactMatrix.from_links(links)
+
+def test_no_events_matches_annual_trend_at_survey_month(history):
+    monthly, annual = monthly_forecast(history, ImpactMatrix.from_frame(pd.DataFrame()), [2025, 2026], ['Base'],
+                                       cache_path=None)
+    # The same model selection as the annual scenario forecast
+    baselines = fit_national_baselines(history, [2025, 2026], models=list(MODELS), cache_path=None)
+
+    expected = pd.DataFrame(baselines['base_pred'], index=baselines['indicators'], columns=[2025, 2026])
+    for _, row in annual.iterrows():
+        assert row['Predicted_Value'] == pytest.approx(expected.loc[row['Indicator'], row['Year']], abs=0.01)
+
+    # USG_P2P is surveyed in June, so its June value is the annual one
+    june = monthly[(monthly['Indicator'] == 'USG_P2P') & (monthly['Month'] == '2025-06-01')]
+    assert june['Predicted_Value'].iloc[0] == pytest.approx(expected.loc['USG_P2P', 2025], abs=0.01)
+    assert len(monthly) == 2 * 24
+
+def test_linear_trend_is_the_fitted_line_between_surveys(history):
+    monthly = monthly_forecast(history, ImpactMatrix.from_frame(pd.DataFrame()), [2025], ['Base'],
+                               models=['linear'], cache_path=None)[0]
+    line = fit_national_baselines(history, [2025])
+    slope = pd.Series(line['slope'], index=line['indicators'])
+    intercept = pd.Series(line['intercept'], index=line['indicators'])
+
+    # USG_P2P is surveyed in June: March 2025 lies a quarter year before it
+    march = monthly[(monthly['Indicator'] == 'USG_P2P') & (monthly['Month'] == '2025-03-01')]
+    expected = intercept['USG_P2P'] + slope['USG_P2P'] * (2025 - 0.25)
+    assert march['Predicted_Value'].iloc[0] == pytest.approx(expected, abs=0.01)
+
+def test_lagged_event_builds_up_over_rollout(history):
+    no_event = monthly_forecast(history, ImpactMatrix.from_frame(pd.DataFrame()), [2025], ['Base'], cache_path=None)[0]
+    monthly, annual = monthly_forecast(history, _matrix('2024-10-01', 6), [2025], ['Base'],
+                                       effect_type='linear', rollout_months=6, cache_path=None)
+
+    acc = monthly[monthly['Indicator'] == 'ACC_OWNERSHIP'].set_index('Month')['Predicted_Value']
+    base = no_event[no_event['Indicator'] == 'ACC_OWNERSHIP'].set_index('Month')['Predicted_Value']
+    lift = (acc - base).round(2)
+
+    # Impact starts at 2025-04 (event + 6 months) and reaches 6pp after 6 months
+    assert (lift[:'2025-03-01'] == 0).all()
+    assert lift['2025-04-01'] == pytest.approx(1.0, abs=0.01)
+    assert np.allclose(lift['2025-09-01':], 6.0, atol=0.01)
+    assert monthly[monthly['Indicator'] == 'USG_P2P']['Predicted_Value'].equals(
+        no_event[no_event['Indicator'] == 'USG_P2P']['Predicted_Value'])
+
+def test_rollout_before_horizon_only_adds_remaining_increments(history):
+    # Starts 2024-10 with a 6-month linear rollout: half is history, half is forecast
+    monthly = monthly_forecast(history, _matrix('2024-10-01', 0), [2025], ['Base'],
+                               effect_type='linear', rollout_months=6, cache_path=None)[0]
+    no_event = monthly_forecast(history, ImpactMatrix.from_frame(pd.DataFrame()), [2025], ['Base'], cache_path=None)[0]
+    lift = monthly['Predicted_Value'] - no_event['Predicted_Value']
+    assert lift.max() == pytest.approx(3.0, abs=0.01)
+
+def test_rollout_matches_direct_convolution():
+    rng = np.random.default_rng(0)
+    impulses = np.where(rng.random((40, 3)) < 0.1, rng.normal(size=(40, 3)), 0.0)
+    increments = rollout(impulses, 'decay', 12)
+
+    from src.impact_modeling import lag_kernel
+    kernel = lag_kernel('decay', 12)
+    expected = np.stack([np.convolve(impulses[:, j], kernel)[:40] for j in range(3)], axis=1)
+    assert np.allclose(increments, expected)
+
+def test_link_impulses_skips_other_indicators():
+    matrix = _matrix('2025-01-15', 3, indicator='OTHER')
+    impulses = link_impulses(matrix, pd.Index(['ACC_OWNERSHIP']), 2025 * 12, 12)
+    assert not impulses.any()
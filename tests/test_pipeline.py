@@ -0,0 +1,51 @@
+import pytest
+from src.pipeline import PIPELINE, Stage, module_sources, run_pipeline, select_stages
+
+def make_stages(tmp_path):
+    raw, mid, out = (str(tmp_path / name) for name in ('raw.txt', 'mid.txt', 'out.txt'))
+    return raw, out, [
+        Stage('first', 'shutil:copyfile', inputs=[raw], outputs=[mid], params={'src': raw, 'dst': mid}),
+        Stage('second', 'shutil:copyfile', inputs=[mid], outputs=[out], deps=['first'],
+              params={'src': mid, 'dst': out}),
+        Stage('other', 'os:getcwd', inputs=[], outputs=[]),
+    ]
+
+def test_pipeline_skips_unchanged_stages(tmp_path):
+    raw, out, stages = make_stages(tmp_path)
+    state_path = str(tmp_path / 'state.json')
+    with open(raw, 'w') as f:
+        f.write('v1')
+
+    statuses = lambda report: {row['stage']: row['status'] for row in report}
+
+    first_run = run_pipeline(stages, jobs=2, state_path=state_path)
+    assert statuses(first_run) == {'first': 'ran', 'second': 'ran', 'other': 'ran'}
+    assert open(out).read() == 'v1'
+
+    assert set(statuses(run_pipeline(stages, jobs=2, state_path=state_path)).values()) == {'skipped'}
+
+    with open(raw, 'w') as f:
+        f.write('v2')
+    report = statuses(run_pipeline(stages, jobs=2, state_path=state_path))
+    assert report == {'first': 'ran', 'second': 'ran', 'other': 'skipped'}
+    assert open(out).read() == 'v2'
+
+def test_pipeline_blocks_dependents_of_failed_stage(tmp_path):
+    raw, out, stages = make_stages(tmp_path)
+    # raw.txt is missing, so 'first' fails and 'second' never runs
+    report = run_pipeline(stages, targets=['second'], state_path=str(tmp_path / 'state.json'))
+    assert [(row['stage'], row['status']) for row in report] == [('first', 'failed'), ('second', 'blocked')]
+
+    with pytest.raises(ValueError):
+        select_stages(stages, ['missing'])
+
+def test_stage_inputs_cover_imported_modules():
+    sources = module_sources('src.task4_forecasting')
+    assert {'src/result_store.py', 'src/impact_matrix.py', 'src/processed_store.py'} <= set(sources)
+    assert 'src/pipeline.py' not in sources
+
+    stages = {stage.name: stage for stage in PIPELINE}
+    assert 'src/task4_forecasting.py' in stages['lead_lag'].sources()
+    assert stages['forecast'].sources() == sources
+    # Stages outside src/ have no source files to track
+    assert Stage('other', 'os:getcwd', inputs=[], outputs=[]).sources() == []
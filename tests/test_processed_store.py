@@ -0,0 +1,45 @@
+import pandas as pd
+import numpy as np
+from src.processed_store import append_csv, write_processed, read_processed, has_store
+
+def test_store_roundtrip_with_projection_and_pushdown(tmp_path):
+    df = pd.DataFrame({
+        'record_type': ['observation', 'observation', 'event', 'impact_link'],
+        'indicator_code': ['ACC_OWNERSHIP', 'ACC_OWNERSHIP', np.nan, np.nan],
+        'value_numeric': [35.0, 46.0, np.nan, np.nan],
+        'observation_date': ['2017-12-31', '2021-12-31 00:00:00', '2024-03-01', np.nan],
+        'impact_magnitude': [np.nan, np.nan, np.nan, 0.05],
+        'collected_by': [pd.Timestamp('2025-01-20'), 'Data Scientist', 'Data Scientist', np.nan],
+    })
+    path = str(tmp_path / 'store')
+    write_processed(df, path)
+    assert has_store(path)
+
+    obs = read_processed(columns=['indicator_code', 'year', 'value_numeric'],
+                         record_types=['observation'], path=path)
+    assert list(obs.columns) == ['indicator_code', 'year', 'value_numeric']
+    assert list(obs['year']) == [2017, 2021]
+    assert isinstance(obs['indicator_code'].dtype, pd.CategoricalDtype)
+
+    recent = read_processed(columns=['record_type', 'year'], filters=[('year', '>=', 2021)], path=path)
+    assert sorted(recent['record_type'].astype(str)) == ['event', 'observation']
+
+    # Rewriting replaces the previous contents
+    write_processed(df.iloc[:1], path)
+    assert len(read_processed(path=path)) == 1
+
+def test_append_csv_widens_the_header_for_new_columns(tmp_path):
+    path = str(tmp_path / 'enriched.csv')
+    pd.DataFrame({'record_id': ['REC_1'], 'record_type': ['observation'], 'value_numeric': [46.0],
+                  'notes': ['0012']}).to_csv(path, index=False)
+
+    append_csv(pd.DataFrame({'record_type': ['observation'], 'value_numeric': [49.0]}), path)
+    append_csv(pd.DataFrame({'record_type': ['impact_link'], 'parent_id': ['EVT_FAYDA'],
+                             'event_name': ['Fayda rollout']}), path)
+
+    df = pd.read_csv(path, dtype={'notes': str})
+    assert list(df.columns) == ['record_id', 'record_type', 'value_numeric', 'notes', 'parent_id', 'event_name']
+    assert df['value_numeric'].tolist()[:2] == [46.0, 49.0]
+    # Older rows keep their values, text included
+    assert df.loc[0, 'notes'] == '0012'
+    assert df.loc[2, 'parent_id'] == 'EVT_FAYDA' and df.loc[2, 'event_name'] == 'Fayda rollout'
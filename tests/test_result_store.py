@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+
+from src.result_store import cached, get_result, list_results, load_index, put_result, result_key
+
+def test_result_key_is_content_addressed():
+    params = {'future_years': [2025, 2026], 'scenarios': ['Base'], 'selection': 'aic'}
+    key = result_key('data-v1', 'matrix-v1', params)
+    assert key == result_key('data-v1', 'matrix-v1', dict(reversed(list(params.items()))))
+    assert key != result_key('data-v2', 'matrix-v1', params)
+    assert key != result_key('data-v1', 'matrix-v2', params)
+    assert key != result_key('data-v1', 'matrix-v1', {**params, 'selection': 'backtest'})
+
+def test_store_hits_and_evicts_least_recently_used(tmp_path):
+    results_dir = str(tmp_path / 'forecasts')
+    calls = []
+
+    def compute(value):
+        def run():
+            calls.append(value)
+            return pd.DataFrame({'Scenario': ['Base'] * 50, 'Predicted_Value': [float(value)] * 50})
+        return run
+
+    first, hit = cached('a', compute(1), meta={'kind': 'test'}, results_dir=results_dir)
+    assert not hit and calls == [1]
+    again, hit = cached('a', compute(99), results_dir=results_dir)
+    assert hit and calls == [1]
+    pd.testing.assert_frame_equal(again, first)
+
+    size = load_index(results_dir)['a']['bytes']
+    put_result('b', compute(2)(), results_dir=results_dir)
+    # Reading 'a' makes 'b' the least recently used
+    get_result('a', results_dir)
+    put_result('c', compute(3)(), results_dir=results_dir, max_bytes=2 * size)
+    assert sorted(load_index(results_dir)) == ['a', 'c']
+    assert not os.path.exists(os.path.join(results_dir, 'b.parquet'))
+    assert get_result('b', results_dir) is None
+
+    listing = list_results(results_dir)
+    assert list(listing['key']) == ['c', 'a'] and listing.loc[1, 'kind'] == 'test'
+
+    # Files deleted by hand drop out of the index
+    os.remove(os.path.join(results_dir, 'c.parquet'))
+    assert list(load_index(results_dir)) == ['a']
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from src.series_index import SeriesIndex, lttb
+
+def test_series_index_slices_sorted_series():
+    df = pd.DataFrame({
+        'indicator_code': ['B', 'A', 'B', 'A', 'A', 'C'],
+        'pillar': ['usage', 'access', 'usage', 'access', 'access', None],
+        'year': [2021, 2024, 2014, 2014, 2021, 2021],
+        'value_numeric': [5.0, 49.0, 1.0, 22.0, 46.0, np.nan],
+    })
+    index = SeriesIndex.build(df)
+    assert list(index.keys) == ['A', 'B'] and index.shape == (5, 2)
+    x, y = index.series('A')
+    assert x.tolist() == [2014, 2021, 2024] and y.tolist() == [22.0, 46.0, 49.0]
+    assert index.latest('B').tolist() == [1.0, 5.0]
+    assert len(index.series('MISSING')[0]) == 0 and 'C' not in index
+
+    pillars = SeriesIndex.build(df, key='pillar')
+    assert pillars.latest('usage', n=1).tolist() == [5.0]
+
+    chart = index.frame(['B', 'A'])
+    assert chart['indicator_code'].tolist() == ['B', 'B', 'A', 'A', 'A']
+    assert chart['year'].tolist() == [2014, 2021, 2014, 2021, 2024]
+
+def test_lttb_keeps_extremes_and_endpoints():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500.0)
+    y[4321] = 10.0
+    kept = lttb(x, y, 200)
+    assert len(kept) == 200 and kept[0] == 0 and kept[-1] == 9_999
+    assert (np.diff(kept) > 0).all()
+    # The spike and the troughs of the wave survive
+    assert 4321 in kept
+    assert y[kept].min() < -0.99
+    # Short series are returned whole
+    assert lttb(x[:50], y[:50], 200).tolist() == list(range(50))
+
+    index = SeriesIndex.build(pd.DataFrame({'indicator_code': 'X', 'year': x, 'value_numeric': y}))
+    assert len(index.series('X', max_points=500)[0]) == 500
@@ -0,0 +1,46 @@
+import json
+import pandas as pd
+import numpy as np
+from src.validate_data import validate_dataset, validate_files, main
+
+def make_records():
+    return pd.DataFrame({
+        'record_id': ['REC_1', 'REC_2', 'EVT_1', 'EVT_2', 'IMP_1', 'IMP_2'],
+        'record_type': ['observation', 'observation', 'event', 'event', 'impact_link', 'impact_link'],
+        'parent_id': [np.nan, np.nan, np.nan, np.nan, 'EVT_2', 'EVT_9'],
+        'pillar': ['ACCESS', 'ACCESS', np.nan, 'USAGE', 'ACCESS', 'ACCESS'],
+        'value_numeric': [22.0, np.nan, np.nan, np.nan, 15.0, 5.0],
+        'year': [2014, 2030, np.nan, np.nan, np.nan, np.nan],
+    })
+
+def test_validate_dataset_chunked_rules(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    make_records().to_csv(path, index=False)
+
+    # chunksize=2 forces the event (row 3) and its links (rows 4-5) into different chunks
+    report = validate_dataset(path, chunksize=2, verbose=False)
+    rules = report['rules']
+
+    assert report['rows'] == 6
+    assert not report['passed']
+    assert rules['missing_value_numeric']['offenders'] == [1]
+    assert rules['event_pillar_neutral']['offenders'] == [3]
+    assert rules['temporal_range']['offenders'] == [1]
+    assert rules['referential_integrity']['offenders'] == [5]
+
+def test_validate_formats_agree_and_json_report(tmp_path):
+    df = make_records()
+    csv_path, parquet_path = str(tmp_path / 'data.csv'), str(tmp_path / 'data.parquet')
+    df.to_csv(csv_path, index=False)
+    df.to_parquet(parquet_path, index=False)
+
+    csv_report, parquet_report = validate_files([csv_path, parquet_path], chunksize=4, workers=2)
+    assert csv_report['rules'] == parquet_report['rules']
+
+    # Missing columns skip a rule instead of failing it
+    df[['record_type', 'value_numeric']].iloc[:1].to_csv(csv_path, index=False)
+    output = str(tmp_path / 'report.json')
+    assert main([csv_path, '--output', output]) == 0
+    with open(output) as f:
+        saved = json.load(f)
+    assert saved[0]['rules']['temporal_range']['status'] == 'skipped'